@@ -0,0 +1,76 @@
+"""
+Measure the construction time of the Electrolyzer component for max. powers from 10 kW to 20 MW.
+
+Most of the construction time is spent on finding the number of cells (Electrolyzer.get_z_cell).
+With --compare, the number of cells is also searched by counting up from one cell (the former
+way), to check that both give the same result and to show the speed up.
+
+Usage: python benchmarks/electrolyzer_construction.py [--runs N] [--compare]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from smooth.components.component_electrolyzer import Electrolyzer  # noqa: E402
+from smooth.framework.simulation_parameters import SimulationParameters  # noqa: E402
+
+# Max. powers of the benchmark [W].
+POWERS_MAX = [1e4, 3e4, 1e5, 3e5, 1e6, 2e6, 5e6, 1e7, 2e7]
+
+
+def create_electrolyzer(power_max):
+    return Electrolyzer({'name': 'ely', 'bus_el': 'bel', 'bus_h2': 'bh2',
+                         'power_max': power_max, 'sim_params': SimulationParameters({})})
+
+
+def get_z_cell_by_counting(ely):
+    # Find the number of cells by counting up from one cell.
+    ely.z_cell = 1
+    while True:
+        this_curr_den = ely.get_electricity_by_power(ely.power_max / 1000, ely.temp_max)
+        if this_curr_den is not None and this_curr_den < ely.cur_dens_max:
+            return ely.z_cell
+        ely.z_cell += 1
+
+
+def measure(function, runs):
+    # Get the median run time of the function [s] and its result.
+    times = []
+    for _ in range(runs):
+        time_start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - time_start)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='number of measurements')
+    parser.add_argument('--compare', action='store_true',
+                        help='also search the number of cells by counting up')
+    args = parser.parse_args()
+
+    header = '{:>12} {:>8} {:>16}'.format('power_max', 'z_cell', 'construction')
+    if args.compare:
+        header += ' {:>16} {:>8}'.format('counting', 'speed up')
+    print(header)
+    for power_max in POWERS_MAX:
+        construction_time, ely = measure(lambda: create_electrolyzer(power_max), args.runs)
+        line = '{:>10.0f} W {:>8} {:>14.2f} ms'.format(
+            power_max, ely.z_cell, construction_time * 1000)
+        if args.compare:
+            z_cell = ely.z_cell
+            counting_time, z_cell_counted = measure(lambda: get_z_cell_by_counting(ely), 1)
+            line += ' {:>14.2f} ms {:>7.0f}x'.format(
+                counting_time * 1000, counting_time / construction_time)
+            if z_cell_counted != z_cell:
+                line += '  (counting found {} cells)'.format(z_cell_counted)
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
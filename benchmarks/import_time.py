@@ -0,0 +1,99 @@
+"""
+Measure the cold start time of "from smooth import run_smooth".
+
+Each measurement runs in a new Python process, so no module is cached from an earlier run. The
+script prints the median import time, the modules with the largest cumulative import time
+(from python -X importtime) and which heavy optional packages were loaded by the import.
+
+Usage: python benchmarks/import_time.py [--runs N] [--statement STATEMENT]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Packages that are only needed for plotting or the optimization and should not be loaded by
+# the import of run_smooth.
+HEAVY_PACKAGES = ['matplotlib', 'tkinter', 'bokeh', 'seaborn', 'plotly', 'dill']
+
+# Code run in the new process: time the statement and list the loaded heavy packages.
+MEASURE_CODE = """
+import sys, time
+time_start = time.perf_counter()
+{statement}
+print(time.perf_counter() - time_start)
+print(','.join(name for name in {heavy_packages!r} if name in sys.modules))
+"""
+
+
+def get_environment():
+    # Run the benchmark with the smooth package of this repository.
+    repo_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [repo_path, env.get('PYTHONPATH')]))
+    return env
+
+
+def run_python(args):
+    # Run Python in a new process and stop the benchmark if the statement fails.
+    # Returns the finished process (subprocess.CompletedProcess).
+    process = subprocess.run([sys.executable] + args, env=get_environment(),
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             universal_newlines=True)
+    if process.returncode != 0:
+        sys.exit(process.stderr)
+    return process
+
+
+def measure_import(statement):
+    # Run the import statement in a new process.
+    # Returns the import time [s] and the list of loaded heavy packages.
+    code = MEASURE_CODE.format(statement=statement, heavy_packages=HEAVY_PACKAGES)
+    output = run_python(['-c', code]).stdout.splitlines()
+    return float(output[-2]), [name for name in output[-1].split(',') if name]
+
+
+def get_slowest_modules(statement, n_modules=15):
+    # Get the modules with the largest cumulative import time of the statement.
+    # Returns a list of (cumulative import time [s], module name) tuples.
+    stderr = run_python(['-X', 'importtime', '-c', statement]).stderr
+    modules = []
+    for line in stderr.splitlines():
+        # Lines look like "import time:  self [us] | cumulative | imported package".
+        parts = line.split('|')
+        if not line.startswith('import time:') or len(parts) != 3:
+            continue
+        try:
+            cumulative_time = int(parts[1]) / 1e6
+        except ValueError:
+            # Header line.
+            continue
+        modules.append((cumulative_time, parts[2].strip()))
+    return sorted(modules, reverse=True)[:n_modules]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='number of measurements')
+    parser.add_argument('--statement', default='from smooth import run_smooth',
+                        help='import statement to measure')
+    args = parser.parse_args()
+
+    times = []
+    heavy_packages = []
+    for _ in range(args.runs):
+        import_time, heavy_packages = measure_import(args.statement)
+        times.append(import_time)
+
+    print('"{}": median {:.3f} s, min {:.3f} s, max {:.3f} s ({} runs)'.format(
+        args.statement, statistics.median(times), min(times), max(times), args.runs))
+    print('Loaded heavy packages: {}'.format(', '.join(heavy_packages) or 'none'))
+    print('Slowest imports (cumulative):')
+    for cumulative_time, module_name in get_slowest_modules(args.statement):
+        print('  {:8.3f} s  {}'.format(cumulative_time, module_name))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,48 @@
 # Define which functions should be directly accessible when smooth is installed with pip.
-from .framework.run_smooth import run_smooth
-from .optimization.run_optimization import run_optimization
-from .framework.functions.load_results import load_results
-from .framework.functions.save_results import save_results
-from .framework.functions.print_results import print_smooth_results
-from .framework.functions.plot_results import plot_smooth_results
+import importlib
+
+# Module of each of these functions. The modules are only imported when the function is called
+# for the first time, so that "import smooth" does not load e.g. matplotlib or the optimization
+# in every batch job or worker process.
+_function_modules = {
+    'run_smooth': '.framework.run_smooth',
+    'run_smooth_batch': '.framework.run_smooth_batch',
+    'replay_interval': '.framework.run_smooth',
+    'run_optimization': '.optimization.run_optimization',
+    'load_results': '.framework.functions.load_results',
+    'save_results': '.framework.functions.save_results',
+    'print_smooth_results': '.framework.functions.print_results',
+    'plot_smooth_results': '.framework.functions.plot_results',
+}
 
 __all__ = [
     'run_smooth',
+    'run_smooth_batch',
+    'replay_interval',
     'run_optimization',
     'load_results',
     'save_results',
     'print_smooth_results',
     'plot_smooth_results',
 ]
+
+
+def _create_lazy_function(name):
+    # Create a function that imports the function with this name from its module on the first
+    # call and passes all arguments on (this works with all Python versions, unlike a module
+    # __getattr__, which needs Python 3.7).
+    module_name = _function_modules[name]
+
+    def lazy_function(*args, **kwargs):
+        function = getattr(importlib.import_module(module_name, __name__), name)
+        return function(*args, **kwargs)
+
+    lazy_function.__name__ = name
+    lazy_function.__qualname__ = name
+    lazy_function.__doc__ = 'See smooth{}.{}'.format(module_name, name)
+    return lazy_function
+
+
+for _name in __all__:
+    globals()[_name] = _create_lazy_function(_name)
+del _name
@@ -1,7 +1,15 @@
-from oemof.outputlib import views
+import numpy as np
 from smooth.framework.functions.update_fitted_cost import update_financials, update_emissions
 from smooth.framework.functions.update_annuities import update_annuities
 
+# Attributes of the components that are not written to checkpoints: the simulation parameters,
+# the precomputed time series, the bound foreign states and the oemof node of the current
+# model. They are created again when a simulation is resumed.
+CHECKPOINT_EXCLUDED_ATTRIBUTES = ['sim_params', 'time_series', 'foreign_states', 'model']
+# Packages whose objects are never written to checkpoints (e.g. other live oemof or pyomo
+# objects, which can't be restored if these packages change).
+CHECKPOINT_EXCLUDED_PACKAGES = ['oemof', 'pyomo', 'pandas']
+
 
 class Component:
 
@@ -21,6 +29,13 @@ class Component:
         # Initializing results and states as empty dicts.
         self.results = {}
         self.states = {}
+        # Names of the attributes with the states carried from one interval to the next (e.g.
+        # the storage level). With typical periods, each period starts from their initial
+        # values again (see typical_periods.py).
+        self.carried_states = []
+        # State independent inputs with one value per interval (e.g. csv data), as float64
+        # arrays filled before the simulation starts (see precompute).
+        self.time_series = {}
 
         # VARIABLE COSTS
         # Initializing variable cost and art. cost values [EUR/*].
@@ -44,6 +59,34 @@ class Component:
         # both need to be strings.
         self.fs_component_name = None
         self.fs_attribute_name = None
+        # The foreign states resolved when the model is created, as (component object,
+        # attribute name) pairs or (None, fixed value) (see bind_foreign_states).
+        self.foreign_states = None
+
+        # PIECEWISE LINEAR CURVES
+        # Max. error of the piecewise linear curves of the component, relative to the range of
+        # their values [-]. If it is set, the breakpoints are chosen from densely sampled curves
+        # (see component_functions/breakpoints.py), otherwise the fixed breakpoints are used.
+        self.pwl_tolerance = None
+        # Decide if the curves may be modelled as an LP without binaries when they are concave
+        # (see component_functions/piecewise_transformer.py). The outputs can then be lower
+        # than their curve if the optimizer does not benefit from them (e.g. the input is taken
+        # without producing the outputs), so only switch it on if the objective always drives
+        # the outputs to their curve.
+        self.pwl_allow_lp = False
+        # Representation of the piecewise linear constraints if they can not be modelled as an
+        # LP: 'CC', 'SOS2', 'DCC', 'LOG' or 'MC' (see PiecewiseTransformerBlock), or 'auto' to
+        # use the fastest one in the first intervals (sim_params.pw_repn_calibration_intervals).
+        self.pw_repn = 'CC'
+        # Representation used with pw_repn 'auto', chosen by the calibration.
+        self.pw_repn_auto = 'CC'
+        # Number of breakpoints and error of the simplified curves (see simplify_breakpoints).
+        self.pwl_report = None
+
+        # OEMOF MODEL
+        # The oemof node of this component, saved when it is created so that it
+        # can be updated in place if the oemof model is persistent.
+        self.model = None
 
     def set_parameters(self, params):
         for this_param in params:
@@ -67,27 +110,58 @@ class Component:
     # ------------------- UPDATE THE FLOWS FOR EACH COMPONENT -------------------
 
     def update_flows(self, results, sim_params, comp_name=None):
-        # Check if the component has an attribute 'flows', if not, create it as an empty dict.
-        if not hasattr(self, 'flows'):
-            self.flows = {}
-
         # While components can generate more than one oemof model, they
         # sometimes need to give a custom name.
         if comp_name is None:
             comp_name = self.name
 
-        this_comp_node = views.node(results, comp_name)
-        this_df = this_comp_node['sequences']
-        for i_result in this_df:
-            # Check if this result is a flow
-            if i_result[1] == 'flow':
-                this_flow_name = i_result[0][:]
-                # Check if there already is an array to store the flow
-                # information, if not, create one.
-                if this_flow_name not in self.flows:
-                    self.flows[this_flow_name] = [None] * sim_params.n_intervals
-                # Saving this flow value to the results file
-                self.flows[this_flow_name][sim_params.i_interval] = this_df[i_result][0]
+        # Save all flows going in or out of this node.
+        self.save_flows(results.get_flows(comp_name), sim_params)
+
+    def save_flows(self, flows, sim_params):
+        # Save the flow values of the current interval.
+        # Parameters:
+        #  flows: Flow values by the labels of their start and end node [dict].
+        #  sim_params: Simulation parameters defined by the user [object].
+
+        # Check if the component has an attribute 'flows', if not, create it as an empty dict.
+        if not hasattr(self, 'flows'):
+            self.flows = {}
+
+        for this_flow_name, this_flow_value in flows.items():
+            # Check if there already is an array to store the flow
+            # information, if not, create one.
+            if this_flow_name not in self.flows:
+                self.flows[this_flow_name] = [None] * sim_params.n_intervals
+            # Saving this flow value to the results file
+            self.flows[this_flow_name][sim_params.i_interval] = this_flow_value
+
+    # ------------------- PRECOMPUTE STATE INDEPENDENT INPUTS -------------------
+
+    def precompute(self, sim_params):
+        # Called once before the simulation starts. Components whose inputs
+        # don't depend on the simulation state (e.g. csv data) overwrite this
+        # function and save them with add_time_series, so that each interval
+        # only has to index an array.
+        # Parameters:
+        #  sim_params: Simulation parameters defined by the user.
+        pass
+
+    def add_time_series(self, name, values):
+        # Save a time series with one value per interval to self.time_series
+        # as contiguous float64 array.
+        # Parameters:
+        #  name: Name of the time series [str].
+        #  values: Values of the time series, either as list, array, series
+        #  or as data frame with the values in the first column.
+        if hasattr(values, 'iloc') and values.ndim == 2:
+            values = values.iloc[:, 0]
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        if len(values) < self.sim_params.n_intervals:
+            raise ValueError(
+                'The time series "{}" of component {} has {} values, but {} intervals are '
+                'simulated'.format(name, self.name, len(values), self.sim_params.n_intervals))
+        self.time_series[name] = values
 
     # ------------------- PREPARE CREATING THE OEMOF MODEL -------------------
 
@@ -96,6 +170,30 @@ class Component:
         # function is overwritten in that component
         pass
 
+    def get_interval_key(self):
+        # Return all parameters of this component that enter the oemof model
+        # of the current interval and change between intervals (e.g. fixed
+        # flows, variable costs, storage levels or breakpoints). It is called
+        # after prepare_simulation and used as part of the key of the interval
+        # solution cache (sim_params.interval_cache_size), so components whose
+        # oemof model is not constant have to overwrite this function.
+        return ()
+
+    # ------------------- UPDATE THE PERSISTENT OEMOF MODEL -------------------
+
+    def update_oemof_model(self, busses, model):
+        # If the oemof model is persistent (sim_params.persistent_model), it is
+        # only created in the first interval. In all following intervals, this
+        # function is called instead of create_oemof_model. Components whose
+        # oemof parameters change from interval to interval (e.g. fixed flows,
+        # variable costs, storage levels or breakpoints) overwrite this
+        # function and update these parameters in the given model (see
+        # smooth/framework/functions/update_oemof_model.py).
+        # Parameters:
+        #  busses: Dict containing the oemof busses.
+        #  model: The persistent oemof model (solph.Model).
+        pass
+
     # ------ UPDATE STATES (PLACEHOLDER FOR COMPONENTS WITHOUT STATES) ------
 
     def update_states(self, results, sim_params):
@@ -167,44 +265,131 @@ class Component:
 
         return variable_costs_total
 
+    def get_horizon_values(self, data, aggregation='sum'):
+        # Get the values of a time series for all intervals that are optimized in the current
+        # solve (sim_params.n_solve_intervals intervals, starting at sim_params.i_interval).
+        # If several intervals are merged into one step (sim_params.step_length > 1), the
+        # values of the merged intervals are aggregated to one value.
+        # Parameters:
+        #  data: Time series with one value per interval, either as array (see
+        #  add_time_series), list or data frame with the values in the first column.
+        #  aggregation: Aggregation of merged intervals, 'sum' for quantities per interval
+        #  (e.g. energies) or 'mean' for rates (e.g. COPs) [str].
+        i_start = self.sim_params.i_interval
+        i_end = i_start + self.sim_params.n_solve_intervals
+        if self.sim_params.step_length > 1:
+            step_values = np.asarray(self.get_horizon_values_of_step(data), dtype=np.float64)
+            return [step_values.sum() if aggregation == 'sum' else step_values.mean()]
+        if isinstance(data, np.ndarray):
+            return data[i_start:i_end]
+        if hasattr(data, 'iloc'):
+            return data.iloc[i_start:i_end, 0].tolist()
+        return list(data[i_start:i_end])
+
+    def get_horizon_values_of_step(self, data):
+        # Get the values of a time series for all intervals merged into the current step.
+        # Parameters:
+        #  data: Time series with one value per interval (see get_horizon_values).
+        i_start = self.sim_params.i_interval
+        i_end = i_start + self.sim_params.step_length
+        if hasattr(data, 'iloc'):
+            return data.iloc[i_start:i_end, 0].tolist()
+        return data[i_start:i_end]
+
+    def scale_to_step(self, values):
+        # Scale values per interval (e.g. max. energies or breakpoints) to the length of the
+        # current step, which is sim_params.step_length intervals long if intervals are merged.
+        # Parameters:
+        #  values: Value or list of values per interval.
+        step_length = self.sim_params.step_length
+        if step_length == 1 or values is None:
+            return values
+        if isinstance(values, list):
+            return [this_value * step_length for this_value in values]
+        return values * step_length
+
+    def get_pw_repn(self):
+        # Get the representation of the piecewise linear constraints of this component (see
+        # pw_repn).
+        return self.pw_repn_auto if self.pw_repn == 'auto' else self.pw_repn
+
+    def get_foreign_state_pairs(self):
+        # Get the (component name, attribute name) pair of each foreign state,
+        # whether it is a single foreign state or a list of them.
+        if isinstance(self.fs_component_name, (list, tuple)):
+            return list(zip(self.fs_component_name, self.fs_attribute_name))
+        if self.fs_component_name is None and self.fs_attribute_name is None:
+            return []
+        return [(self.fs_component_name, self.fs_attribute_name)]
+
+    def bind_foreign_states(self, components_by_name):
+        # Resolve the foreign states of this component once when the model is
+        # created, so that their values can be read directly in each interval.
+        # Parameters:
+        #  components_by_name: Dict containing each component object by its
+        #  name.
+        self.foreign_states = []
+        for fs_component_name, fs_attribute_name in self.get_foreign_state_pairs():
+            # Fixed values also can be used as foreign states. To do that the
+            # component name needs to be None and the attribute name needs to
+            # be a numeric value (integer of float).
+            if fs_component_name is None and isinstance(fs_attribute_name, (int, float)):
+                self.foreign_states.append((None, fs_attribute_name))
+                continue
+            fs_component = components_by_name.get(fs_component_name)
+            if fs_component is None or not isinstance(fs_attribute_name, str) \
+                    or not hasattr(fs_component, fs_attribute_name):
+                raise ValueError(
+                    'In component {} the foreign state "{}" of the component "{}" couldn\'t be '
+                    'found, please check the fs names.'.format(
+                        self.name, fs_attribute_name, fs_component_name))
+            self.foreign_states.append((fs_component, fs_attribute_name))
+
+    def get_foreign_state_components(self):
+        # Get the names of the components whose states this component reads
+        # (the foreign states have to be bound).
+        return set(fs_component.name for fs_component, _ in self.foreign_states
+                   if fs_component is not None and fs_component is not self)
+
     def get_foreign_state_value(self, components, index=None):
         # Get a foreign state attribute value with the name fs_attribute_name
         # of the component fs_component_name. If the fs_component_name is None
         # and the fs_attribute_name set to a number, the number is given back
         # instead.
         # Parameters:
-        #  components: List containing each component object.
+        #  components: List containing each component object (only used if
+        #  the foreign states were not bound when the model was created).
         #  index: Index of the foreign state (should be None if there is only
         #  one foreign state) [-].
+        if self.foreign_states is None:
+            self.bind_foreign_states({this_comp.name: this_comp for this_comp in components})
 
-        if index is None:
-            fs_component_name = self.fs_component_name
-            fs_attribute_name = self.fs_attribute_name
-        else:
-            fs_component_name = self.fs_component_name[index]
-            fs_attribute_name = self.fs_attribute_name[index]
-
-        # Fixed values also can be used as foreign states. To do that the
-        # component name needs to be None and the attribute name needs to be a
-        # numeric value (integer of float). This is checked here, and if so,
-        # the numeric value is given back.
-        if fs_component_name is None and isinstance(fs_attribute_name, (int, float)):
+        fs_component, fs_attribute_name = self.foreign_states[0 if index is None else index]
+        if fs_component is None:
+            # Fixed value.
             return fs_attribute_name
-
-        is_fs_found = False
-        foreign_state_value = None
-        # Loop through all components and find the one containing the foreign state.
-        for this_comp in components:
-            if this_comp.name is fs_component_name:
-                # Get the foreign state value.
-                foreign_state_value = this_comp.__getattribute__(fs_attribute_name)
-                is_fs_found = True
-
-        if not is_fs_found:
-            raise ValueError('Foreign state couldn\'t be found,'
-                             'please check the fs names of the supply component.')
-
-        return foreign_state_value
+        return getattr(fs_component, fs_attribute_name)
+
+    # ------------------- CHECKPOINTS -------------------
+
+    def get_checkpoint_state(self):
+        # Get the attributes of this component that are written to a
+        # checkpoint (states, recorded flows and results, current costs, ...).
+        # The attributes in CHECKPOINT_EXCLUDED_ATTRIBUTES and the objects of
+        # the packages in CHECKPOINT_EXCLUDED_PACKAGES (e.g. the input data)
+        # are not saved.
+        return {key: value for key, value in vars(self).items()
+                if key not in CHECKPOINT_EXCLUDED_ATTRIBUTES and
+                type(value).__module__.split('.')[0] not in CHECKPOINT_EXCLUDED_PACKAGES}
+
+    def set_checkpoint_state(self, state):
+        # Restore the attributes of this component from a checkpoint.
+        # Parameters:
+        #  state: Attributes by name (see get_checkpoint_state) [dict].
+        for key, value in state.items():
+            # Checkpoints written before may still contain the oemof node.
+            if key not in CHECKPOINT_EXCLUDED_ATTRIBUTES:
+                setattr(self, key, value)
 
     def generate_results(self):
         # Generate the results after the simulation.
@@ -34,7 +34,7 @@ class ACDCConverter(Component):
             inputs={busses[self.bus_el_ac]: solph.Flow(
                 variable_costs=0)},
             outputs={busses[self.bus_el_dc]: solph.Flow(
-                nominal_value=self.output_power_max
+                nominal_value=self.scale_to_step(self.output_power_max)
             )},
             conversion_factors={busses[self.bus_el_dc]: self.efficiency})
         return ac_dc_converter
@@ -4,6 +4,9 @@ from .component import Component
 import oemof.thermal.compression_heatpumps_and_chillers as cmpr_hp_chiller
 import smooth.framework.functions.functions as func
 import pandas as pd
+from oemof.solph.plumbing import sequence
+from smooth.framework.functions.update_oemof_model import \
+    is_sequence_changed, mark_block_outdated
 
 
 class AirSourceHeatPump(Component):
@@ -78,13 +81,32 @@ class AirSourceHeatPump(Component):
             # self.consider_icing,
             self.factor_icing)
 
+    def precompute(self, sim_params):
+        # The COP of each interval [-].
+        self.add_time_series('cops', self.cops)
+
     def create_oemof_model(self, busses, _):
         air_source_heat_pump = solph.Transformer(
             label=self.name,
             inputs={busses[self.bus_el]: solph.Flow(variable_costs=0)},
             outputs={busses[self.bus_th]: solph.Flow(
-                nominal_value=self.power_max,
+                nominal_value=self.scale_to_step(self.power_max),
                 variable_costs=0)},
-            conversion_factors={busses[self.bus_th]: self.cops[self.sim_params.i_interval]}
+            conversion_factors={
+                busses[self.bus_th]: self.get_horizon_values(self.time_series['cops'], 'mean')}
         )
+        self.model = air_source_heat_pump
         return air_source_heat_pump
+
+    def get_interval_key(self):
+        # The COPs of the optimized intervals.
+        return self.get_horizon_values(self.time_series['cops'], 'mean')
+
+    def update_oemof_model(self, busses, model):
+        # The COPs of this solve are part of the transformer constraints, so the transformer
+        # block has to be rebuilt if they changed.
+        cops = self.get_horizon_values(self.time_series['cops'], 'mean')
+        conversion_factors = self.model.conversion_factors
+        if is_sequence_changed(model, conversion_factors[busses[self.bus_th]], cops):
+            conversion_factors[busses[self.bus_th]] = sequence(cops)
+            mark_block_outdated(model, self.model)
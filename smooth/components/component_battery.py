@@ -1,6 +1,7 @@
 import oemof.solph as solph
 from .component import Component
-from oemof.outputlib import views
+from smooth.framework.functions.update_oemof_model import \
+    set_variable_costs, set_nominal_value, set_initial_storage_level
 
 
 class Battery(Component):
@@ -68,6 +69,7 @@ class Battery(Component):
         # ------------------- STATES -------------------
         # State of charge [%]
         self.soc = self.soc_init
+        self.carried_states = ['soc']
 
         # Initialize max. chargeable or dischargeable energy [Wh].
         self.e_in_max = None
@@ -104,13 +106,22 @@ class Battery(Component):
         # Therefore we need to divide by the efficiency_charge.  Due to the
         # inflow_conversion_factor (in "create oemof model") the battery will
         # then receive right amount.
+        # If intervals are merged, the c-rate limits the energy of the whole step.
+        step_time = self.sim_params.interval_time * self.sim_params.step_length
         self.e_in_max = min(
-            self.c_rate_charge * self.battery_capacity * self.sim_params.interval_time / 60,
+            self.c_rate_charge * self.battery_capacity * step_time / 60,
             self.battery_capacity - self.soc * self.battery_capacity) / \
             self.efficiency_charge
         self.e_out_max = min(
-            self.c_rate_discharge * self.battery_capacity * self.sim_params.interval_time / 60,
+            self.c_rate_discharge * self.battery_capacity * step_time / 60,
             self.soc * self.battery_capacity)
+        if self.sim_params.n_solve_intervals > 1:
+            # If several intervals are optimized at once, the SoC changes within the solve and
+            # is limited by the storage balance, so only the c-rate limits the flows.
+            self.e_in_max = self.c_rate_charge * self.battery_capacity * \
+                self.sim_params.interval_time / 60 / self.efficiency_charge
+            self.e_out_max = \
+                self.c_rate_discharge * self.battery_capacity * self.sim_params.interval_time / 60
 
     def create_oemof_model(self, busses, _):
         """ Create oemof model """
@@ -122,7 +133,8 @@ class Battery(Component):
             outputs={busses[self.bus_in_and_out]: solph.Flow(
                 nominal_value=self.e_out_max, variable_costs=self.current_vac[1])
             },
-            loss_rate=self.loss_rate,
+            # The relative losses per interval compound over merged intervals.
+            loss_rate=1 - (1 - self.loss_rate) ** self.sim_params.step_length,
             initial_storage_level=self.soc,
             nominal_storage_capacity=self.battery_capacity,
             min_storage_level=self.dod,
@@ -130,19 +142,29 @@ class Battery(Component):
             outflow_conversion_factor=self.efficiency_discharge,
             balanced=False,
         )
+        self.model = storage
         return storage
 
+    def get_interval_key(self):
+        """ Key of the parameters of the oemof model """
+        # The var. art. costs, the max. (dis)chargeable energy and the SoC.
+        return self.current_vac, self.e_in_max, self.e_out_max, self.soc
+
+    def update_oemof_model(self, busses, model):
+        """ Update the persistent oemof model """
+        bus = busses[self.bus_in_and_out]
+        # Update the var. art. costs, the max. (dis)chargeable energy and the SoC.
+        set_variable_costs(model, bus, self.model, self.current_vac[0])
+        set_variable_costs(model, self.model, bus, self.current_vac[1])
+        set_nominal_value(model, bus, self.model, self.e_in_max)
+        set_nominal_value(model, self.model, bus, self.e_out_max)
+        set_initial_storage_level(model, self.model, self.soc)
+
     def update_states(self, results, sim_params):
         """ Update states """
-        data_storage = views.node(results, self.name)
-        df_storage = data_storage["sequences"]
-
-        # Loop Through the data frame values and update states accordingly.
-        for i_result in df_storage:
-            if i_result[1] == "capacity":
-                if "soc" not in self.states:
-                    # Initialize a.n array that tracks the state SoC
-                    self.states["soc"] = [None] * sim_params.n_intervals
-                # Check if this result is the state of charge.
-                self.soc = df_storage[i_result][0] / self.battery_capacity
-                self.states["soc"][sim_params.i_interval] = self.soc
+        if "soc" not in self.states:
+            # Initialize an array that tracks the state SoC
+            self.states["soc"] = [None] * sim_params.n_intervals
+        # Update the state of charge.
+        self.soc = results.get_storage_level(self.name) / self.battery_capacity
+        self.states["soc"][sim_params.i_interval] = self.soc
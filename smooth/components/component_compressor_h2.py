@@ -1,7 +1,10 @@
 import oemof.solph as solph
 from .component import Component
-from .component_functions.all_component_functions import calculate_compressibility_factor
+from .component_functions.component_functions import calculate_compressibility_factor
 from math import log
+from oemof.solph.plumbing import sequence
+from smooth.framework.functions.update_oemof_model import \
+    is_sequence_changed, mark_block_outdated
 
 
 class CompressorH2(Component):
@@ -46,12 +49,19 @@ class CompressorH2(Component):
         # Overall efficiency of the compressor (value taken from MATLAB) [-]
         self.efficiency = 0.88829
 
+        # Resolution of the pressures the specific compression energy is calculated with [bar].
+        # The energies are saved by the rounded pressures, so intervals with the same pressures
+        # (e.g. of fixed pressure storages) reuse them.
+        self.pressure_resolution = 0.001
+
         # ------------------- UPDATE PARAMETER DEFAULT VALUES -------------------
         self.set_parameters(params)
 
         # ------------------- ENERGY NEED FOR COMPRESSION -------------------
         # Specific compression energy (electrical energy needed per kg H2) [Wh/kg].
         self.spec_compression_energy = None
+        # Specific compression energies by the rounded inlet and outlet pressure [Wh/kg].
+        self.spec_compression_energies = {}
 
         # ------------------- CONSTANT PARAMETERS -------------------
         # Mr_H2 = Molar mass of H2 [kg/mol], R = the gas constant (R) [J/(K*mol)]
@@ -64,7 +74,8 @@ class CompressorH2(Component):
             label=self.name,
             inputs={
                 busses[self.bus_h2_in]: solph.Flow(
-                    nominal_value=self.m_flow_max * self.sim_params.interval_time / 60),
+                    nominal_value=self.scale_to_step(
+                        self.m_flow_max * self.sim_params.interval_time / 60)),
                 busses[self.bus_el]: solph.Flow()},
             outputs={busses[self.bus_h2_out]: solph.Flow()},
             conversion_factors={
@@ -72,8 +83,23 @@ class CompressorH2(Component):
                 busses[self.bus_el]: self.spec_compression_energy,
                 busses[self.bus_h2_out]: 1})
 
+        self.model = compressor
         return compressor
 
+    def get_interval_key(self):
+        # The specific compression energy of this time step.
+        return self.spec_compression_energy
+
+    def update_oemof_model(self, busses, model):
+        # The specific compression energy depends on the current pressures and is part of the
+        # transformer constraints, so the transformer block has to be rebuilt if it changed
+        # (e.g. not with fixed pressures).
+        conversion_factors = self.model.conversion_factors
+        if is_sequence_changed(
+                model, conversion_factors[busses[self.bus_el]], self.spec_compression_energy):
+            conversion_factors[busses[self.bus_el]] = sequence(self.spec_compression_energy)
+            mark_block_outdated(model, self.model)
+
     def prepare_simulation(self, components):
         # The compressor has two foreign states, the inlet pressure and the
         # outlet pressure. Usually this is the storage pressure of the storage
@@ -84,6 +110,24 @@ class CompressorH2(Component):
         # Get the outlet pressure [bar].
         p_out = self.get_foreign_state_value(components, 1)
 
+        # Round the pressures to the resolution and reuse the energy of these pressures if it
+        # was already calculated.
+        key = (round(p_in / self.pressure_resolution), round(p_out / self.pressure_resolution))
+        spec_compression_energy = self.spec_compression_energies.get(key)
+        if spec_compression_energy is None:
+            spec_compression_energy = self.get_spec_compression_energy(
+                key[0] * self.pressure_resolution, key[1] * self.pressure_resolution)
+            self.spec_compression_energies[key] = spec_compression_energy
+        self.spec_compression_energy = spec_compression_energy
+
+    def get_spec_compression_energy(self, p_in, p_out):
+        # Calculate the electrical energy needed to compress one kg of hydrogen with a
+        # polytropic compression.
+        # Parameters:
+        #  p_in: Inlet pressure [bar].
+        #  p_out: Outlet pressure [bar].
+        # Returns the specific compression energy [Wh/kg].
+
         # If the pressure difference is lower than 0.01 [bar], the specific
         # compression energy is zero
         if p_out - p_in < 0.01:
@@ -116,7 +160,7 @@ class CompressorH2(Component):
                 real_gas) / 1000
 
         # Convert specific compression work into electrical energy needed per kg H2 [Wh]
-        self.spec_compression_energy = float(spec_compression_work / 3.6)
+        return float(spec_compression_work / 3.6)
 
     def update_states(self, results, sim_params):
         # Update the states of the compressor
@@ -28,7 +28,7 @@ class DCACInverter(Component):
             inputs={busses[self.bus_el_dc]: solph.Flow(
                 variable_costs=0)},
             outputs={busses[self.bus_el_ac]: solph.Flow(
-                nominal_value=self.output_power_max
+                nominal_value=self.scale_to_step(self.output_power_max)
             )},
             conversion_factors={busses[self.bus_el_ac]: self.efficiency})
         return dc_ac_inverter
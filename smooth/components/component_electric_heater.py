@@ -34,7 +34,7 @@ class ElectricHeater(Component):
             label=self.name,
             inputs={busses[self.bus_el]: solph.Flow()},
             outputs={busses[self.bus_th]: solph.Flow(
-                nominal_value=self.power_max)},
+                nominal_value=self.scale_to_step(self.power_max))},
             conversion_factors={busses[self.bus_th]: self.efficiency})
 
         return electric_heater
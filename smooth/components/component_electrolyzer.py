@@ -1,9 +1,12 @@
-from oemof.outputlib import views
 import oemof.solph as solph
 from .component import Component
-import math
 import numpy as np
 import warnings
+from smooth.framework.functions.update_oemof_model import mark_block_outdated
+from .component_functions.electrolyzer_surface import \
+    get_electrolyzer_surface, interpolate_surface
+from .component_functions.breakpoints import N_SAMPLES, simplify_breakpoints
+from .component_functions.piecewise_transformer import PiecewiseTransformer
 
 
 class Electrolyzer (Component):
@@ -58,6 +61,10 @@ class Electrolyzer (Component):
         self.cur_dens_max_temp = 0.35
         # size of cell surface [cm²].
         self.area_cell = 1500
+        # Directory the current densities over load and temperature are cached in, so that
+        # they are only calculated once for each configuration (only kept in memory if None,
+        # see component_functions/electrolyzer_surface.py).
+        self.surface_cache_dir = None
 
         # ------------------- UPDATE PARAMETER DEFAULT VALUES -------------------
         self.set_parameters(params)
@@ -88,15 +95,7 @@ class Electrolyzer (Component):
         # TO MAKE IT POSSIBLE TO DEFINE A MAX. POWER OF THE ELECTROLYZER, THE
         # NUMBER OF CELLS ARE ADJUSTED ACCORDINGLY. THIS IS DONE BY CHECKING
         # HOW MANY CELLS LEAD TO THE MAX. POWER AT HIGHEST TEMPERATURE.
-        self.z_cell = 1
-        is_z_cell_found = False
-        while not is_z_cell_found:
-            this_curr_den = self.get_electricity_by_power(self.power_max/1000, self.temp_max)
-
-            if this_curr_den is not None and this_curr_den < self.cur_dens_max:
-                is_z_cell_found = True
-            else:
-                self.z_cell += 1
+        self.z_cell = self.get_z_cell()
 
         # Max. hydrogen that can be produced in one time step [kg].
         self.max_production_per_step = \
@@ -109,67 +108,143 @@ class Electrolyzer (Component):
         # Tracking supporting points to calculate temperature later on.
         self.supporting_points = {}
 
-    def conversion_fun_ely(self, ely_energy):
-        # Create a function that will give out the mass values for the energy
-        # values at the breakpoints.
+    def get_z_cell(self):
+        # Get the smallest number of cells with which the current density at max. power and
+        # highest temperature is below the max. current density. The power at a given current
+        # density is proportional to the number of cells, so the number is estimated from the
+        # cell voltage at the max. current density and then corrected with the iteration of
+        # get_electricity_by_power.
 
-        # Check the index of this ely_energy entry.
-        this_index = self.supporting_points['energy'].index(ely_energy)
-        # Return the according hydrogen production value [kg].
-        return self.supporting_points['h2_produced'][this_index]
-
-    def create_oemof_model(self, busses, _):
-        # Get the non-linear behaviour.
+        def is_z_cell_valid(z_cell):
+            # Check if the current density with this number of cells is below the max. value.
+            self.z_cell = z_cell
+            this_curr_den = self.get_electricity_by_power(self.power_max/1000, self.temp_max)
+            return this_curr_den is not None and this_curr_den < self.cur_dens_max
+
+        # Power of one cell at the max. current density and highest temperature [kW].
+        cell_voltage = self.ely_voltage_u_rev(self.temp_max) + \
+            self.ely_voltage_u_act(self.cur_dens_max, self.temp_max) + \
+            self.ely_voltage_u_ohm(self.cur_dens_max, self.temp_max)
+        cell_power = cell_voltage * self.cur_dens_max * self.area_cell / 1000
+        # With more cells than the max. power needs at the max. current density, the current
+        # density is below its max. value.
+        z_cell = max(1, int(self.power_max / 1000 // cell_power) + 1)
+
+        # Local correction: the smallest valid number of cells.
+        while not is_z_cell_valid(z_cell):
+            z_cell += 1
+        while z_cell > 1 and is_z_cell_valid(z_cell - 1):
+            z_cell -= 1
+        return z_cell
+
+    def prepare_simulation(self, components):
+        # Get the non-linear behaviour for the current temperature.
         self.update_nonlinear_behaviour()
 
-        # Create the non-linear oemof component.
-        electrolyzer = solph.custom.PiecewiseLinearTransformer(
+    def get_interval_key(self):
+        # The breakpoints only depend on the current temperature.
+        return self.temperature
+
+    def get_out_breakpoints(self, busses):
+        # Get the hydrogen production at the breakpoints [kg], by the output bus.
+        return {busses[self.bus_h2]: self.scale_to_step(self.supporting_points['h2_produced'])}
+
+    def create_oemof_model(self, busses, _):
+        # Create the non-linear oemof component with an output for each curve.
+        out_breakpoints = self.get_out_breakpoints(busses)
+        electrolyzer = PiecewiseTransformer(
             label=self.name,
             inputs={busses[self.bus_el]: solph.Flow(
-                nominal_value=self.energy_max,
+                nominal_value=self.scale_to_step(self.energy_max),
                 variable_costs=0)},
-            outputs={busses[self.bus_h2]: solph.Flow()},
-            in_breakpoints=self.supporting_points['energy'],
-            conversion_function=self.conversion_fun_ely,
-            pw_repn='CC')
+            outputs={bus: solph.Flow() for bus in out_breakpoints},
+            in_breakpoints=self.scale_to_step(self.supporting_points['energy']),
+            out_breakpoints=out_breakpoints,
+            allow_lp=self.pwl_allow_lp, pw_repn=self.get_pw_repn())
+        self.model = electrolyzer
         return electrolyzer
 
+    def update_oemof_model(self, busses, model):
+        # The hydrogen production at the breakpoints depends on the current temperature (with a
+        # pwl_tolerance the energies of the breakpoints as well). The breakpoints (see
+        # prepare_simulation) are part of the piecewise linear constraints, so that block is
+        # rebuilt if they changed.
+        in_breakpoints = self.scale_to_step(self.supporting_points['energy'])
+        out_breakpoints = self.get_out_breakpoints(busses)
+        if not self.model.has_breakpoints(in_breakpoints, out_breakpoints):
+            self.model.set_breakpoints(in_breakpoints, out_breakpoints)
+            mark_block_outdated(model, self.model)
+
     def update_nonlinear_behaviour(self):
         # Set up the breakpoints for the electrolyzer conversion of electricity to hydrogen.
-        n_supporting_point = 10
-        # Get the breakpoint values for electric energy [Wh] and produced hydrogen [kg].
-        bp_ely_energy = []
-        bp_ely_h2 = []
-        bp_ely_temp = []
-        for i_supporting_point in range(n_supporting_point + 1):
-            # Calculate the energy for this breakpoint [Wh].
-            this_energy = i_supporting_point / n_supporting_point * self.energy_max
-            bp_ely_energy.append(this_energy)
-            # Calculate the hydrogen produced [kg] and resulting temperature
-            # [K] with the energy of this breakpoint and at the current
-            # temperature.
-            [this_mass, this_temp] = self.get_mass_and_temp(this_energy / 1000)
-            bp_ely_h2.append(this_mass)
-            bp_ely_temp.append(this_temp)
-
-        self.supporting_points['temperature'] = bp_ely_temp
-        self.supporting_points['h2_produced'] = bp_ely_h2
-        self.supporting_points['energy'] = bp_ely_energy
+        n_supporting_point = self.get_n_supporting_point()
+        # Get the breakpoint values for electric energy [Wh].
+        bp_ely_energy = np.arange(n_supporting_point + 1) / n_supporting_point * self.energy_max
+        # Calculate the hydrogen produced [kg] and resulting temperature [K] with the energy of
+        # all breakpoints at once and at the current temperature.
+        bp_ely_h2, bp_ely_temp = self.get_mass_and_temp_by_cur_dens(
+            self.get_breakpoint_cur_dens(n_supporting_point))
+
+        self.set_supporting_points(
+            {'temperature': bp_ely_temp, 'h2_produced': bp_ely_h2, 'energy': bp_ely_energy},
+            ['h2_produced'])
+
+    def get_n_supporting_point(self):
+        # Get the number of load steps between zero and max. power the breakpoints are
+        # calculated for. With a pwl_tolerance, these are the samples the breakpoints are
+        # chosen from.
+        return 10 if self.pwl_tolerance is None else N_SAMPLES
+
+    def set_supporting_points(self, supporting_points, curve_names):
+        # Save the values at the breakpoints. With a pwl_tolerance, only the breakpoints needed
+        # to keep the curves of the oemof component within the tolerance are kept.
+        # Parameters:
+        #  supporting_points: Values at each load step by their name, including the
+        #  electric energy 'energy' [dict].
+        #  curve_names: Names of the values that are outputs of the oemof component [list].
+        if self.pwl_tolerance is not None:
+            indices, self.pwl_report = simplify_breakpoints(
+                supporting_points['energy'],
+                {name: supporting_points[name] for name in curve_names}, self.pwl_tolerance)
+            supporting_points = {name: values[indices]
+                                 for name, values in supporting_points.items()}
+        for name, values in supporting_points.items():
+            self.supporting_points[name] = values.tolist()
+
+    def get_breakpoint_cur_dens(self, n_supporting_point):
+        # Get the current density of each breakpoint at the current temperature. It is
+        # interpolated from the surface of current densities over load and temperature, which
+        # is only calculated once for the parameters of this electrolyzer.
+        # Parameters:
+        #  n_supporting_point: Number of load steps between zero and max. power [-].
+        surface = get_electrolyzer_surface(self, n_supporting_point, self.surface_cache_dir)
+        cur_dens = interpolate_surface(surface, self.temperature)
+        if cur_dens is None:
+            # The temperature is outside of the surface.
+            cur_dens = self.get_cur_dens_by_power(surface['load_fractions'] * self.power_max / 1000)
+        return cur_dens
 
     def get_mass_and_temp(self, energy_used):
         # Calculate the mass produced and the resulting electrolyzer for a certain energy.
         # Parameter:
-        #  energy_used: Energy value for the next time step [kWh].
+        #  energy_used: Energy value for the next time step, a single value or an array [kWh].
 
         # Convert energy to power [kW]
         power = energy_used / (self.interval_time / 60)
-        # Update voltage, current, current density and power in an iterative process.
-        cur_dens = self.get_electricity_by_power(power)
+        # Get the current density for this power (Newton's method).
+        return self.get_mass_and_temp_by_cur_dens(self.get_cur_dens_by_power(power))
+
+    def get_mass_and_temp_by_cur_dens(self, cur_dens):
+        # Calculate the mass produced and the resulting electrolyzer for a certain current
+        # density.
+        # Parameter:
+        #  cur_dens: Current density, a single value or an array [A/cm²].
+
         # Check if the current density is above the max. allowed value.
-        if cur_dens > self.cur_dens_max:
+        if np.any(cur_dens > self.cur_dens_max):
             warnings.warn("Electrolyzer bought more electricity than it can use.")
             # Update current density to max. allowed value
-            cur_dens = self.cur_dens_max
+            cur_dens = np.minimum(cur_dens, self.cur_dens_max)
 
         # Calculate the resulting temperature [K]
         new_ely_temp = self.get_cell_temp(cur_dens)
@@ -198,11 +273,8 @@ class Electrolyzer (Component):
 
         # Check if current density is higher than the given density at the
         # highest possible temperature. If so, set the current density to its
-        # maximum.
-        if cur_dens > self.cur_dens_max_temp:
-            cur_dens_now = self.cur_dens_max_temp
-        else:
-            cur_dens_now = cur_dens
+        # maximum (works for single values and arrays).
+        cur_dens_now = np.minimum(cur_dens, self.cur_dens_max_temp)
 
         # Save the temperature calculated one step before.
         temp_before = self.temperature
@@ -214,7 +286,7 @@ class Electrolyzer (Component):
         # Calculate the new temperature of the electrolyzer by Newtons law of
         # cooling. The exponent (-t[s]/2310) was parameterized such that the 98 %
         # of the temperature change are reached after 2.5 hours.
-        temp_new = temp_aim + (temp_before - temp_aim) * math.exp(-self.interval_time*60 / 2310)
+        temp_new = temp_aim + (temp_before - temp_aim) * np.exp(-self.interval_time*60 / 2310)
         # Return the new electrolyzer temperature [K].
         return temp_new
 
@@ -254,11 +326,13 @@ class Electrolyzer (Component):
             # Calculate the voltage existing of three different parts [V].
             v_rev = (self.ely_voltage_u_rev(this_temp))
             v_act = (self.ely_voltage_u_act(cur_dens_iteration, this_temp))
-            v_ohm = (self.ely_voltage_u_ohm(cur_dens_iteration, this_temp))
+            with np.errstate(invalid='ignore'):
+                v_ohm = (self.ely_voltage_u_ohm(cur_dens_iteration, this_temp))
             # Get the voltage for this iteration step [V].
             voltage_iteration = (v_rev + v_act + v_ohm) * self.z_cell
-            # For bad initial guesses, here a non-real number might appear.
-            if not np.isreal(voltage_iteration) or i_run > 1000:
+            # For bad initial guesses, here a non-real number (NaN for numpy values) might
+            # appear.
+            if not np.isreal(voltage_iteration) or np.isnan(voltage_iteration) or i_run > 1000:
                 return None
 
             # Get the power for this iteration step [kW].
@@ -275,6 +349,113 @@ class Electrolyzer (Component):
         # Return the current density [A/cm²].
         return cur_dens_iteration
 
+    def get_cur_dens_by_power(self, power, this_temp=None):
+        # Calculate the current density for a given power with Newton's method. Unlike
+        # get_electricity_by_power, this works for an array of powers at once. It starts at the
+        # same initial guess and finds the same current density within the tolerance of
+        # get_electricity_by_power.
+        # Parameters:
+        #  power: Current power the electrolyzer is operated with, a single value or an
+        #  array [kW].
+        #  this_temp: Temperature of the electrolyzer, a single value or an array of the
+        #  shape of power [K].
+        # Returns the current density (single value or array) [A/cm²]. Raises a ValueError if
+        # no solution was found for a power (see check_cur_dens).
+
+        if this_temp is None:
+            this_temp = self.temperature
+        is_single_value = np.ndim(power) == 0 and np.ndim(this_temp) == 0
+        power, this_temp = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(power, dtype=float)), np.asarray(this_temp, dtype=float))
+        # Max. relative change of the current density at which the iteration stops and max.
+        # number of iterations.
+        relative_tolerance = 1e-12
+        max_iterations = 50
+
+        # Estimate the current density through the chemical power to start the iteration
+        # (initial guess of 65 % efficiency) [A/cm²].
+        cur_dens = (power * 0.65 * 2.0 * self.faraday) / (
+            self.area_cell * self.z_cell * self.molarity * self.upp_heat_val)
+        # Without power there is no current.
+        is_active = power > 0
+        # Factor from the cell voltage times the current density to the power [kW cm²/A].
+        power_factor = self.z_cell * self.area_cell / 1000
+        u_rev = self.ely_voltage_u_rev(this_temp)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for _ in range(max_iterations):
+                if not np.any(is_active):
+                    break
+                j = cur_dens[is_active]
+                temp = this_temp[is_active]
+                # Power deviation and its derivative with respect to the current density.
+                voltage = u_rev[is_active] + self.ely_voltage_u_act(j, temp) + \
+                    self.ely_voltage_u_ohm(j, temp)
+                power_deviation = power_factor * voltage * j - power[is_active]
+                slope = power_factor * (voltage + j * self.get_voltage_slope(j, temp))
+                j_new = j - power_deviation / slope
+                # Don't step to or below zero, where the voltage is not defined.
+                j_new = np.where(j_new > 0, j_new, j / 2)
+                cur_dens[is_active] = j_new
+                is_converged = np.abs(j_new - j) <= relative_tolerance * j_new
+                # Bad initial guesses can lead to values the model is not defined for.
+                is_failed = ~np.isfinite(j_new)
+                is_active[is_active] = ~(is_converged | is_failed)
+        # Current densities that did not converge are not a solution.
+        cur_dens[is_active] = np.nan
+        self.check_cur_dens(cur_dens, power, this_temp)
+        return cur_dens.item() if is_single_value else cur_dens
+
+    def check_cur_dens(self, cur_dens, power, this_temp):
+        # Raise a ValueError if no current density was found for a power, e.g. because Newton's
+        # method did not converge or the voltage model is not defined at the temperature.
+        # Parameters:
+        #  cur_dens: Current densities (see get_cur_dens_by_power), an array [A/cm²].
+        #  power: Power of each current density, an array that can be broadcast to the shape
+        #  of cur_dens [kW].
+        #  this_temp: Temperature of each current density, an array that can be broadcast to
+        #  the shape of cur_dens [K].
+        cur_dens, power, this_temp = np.broadcast_arrays(cur_dens, power, this_temp)
+        is_failed = ~np.isfinite(cur_dens)
+        if np.any(is_failed):
+            i_failed = np.flatnonzero(is_failed)[0]
+            raise ValueError(
+                'No current density of the electrolyzer "{}" was found for a power of {} kW at a '
+                'temperature of {} K'.format(self.name, power.flat[i_failed],
+                                             this_temp.flat[i_failed]))
+
+    def get_voltage_slope(self, cur_dens, temp):
+        # Derivative of the cell voltage (u_act + u_ohm, see ely_voltage_u_act and
+        # ely_voltage_u_ohm) with respect to the current density [V cm²/A].
+        # Parameter:
+        #  cur_dens: Current density, a single value or an array [A/cm²]
+        #  temp: Temperature [K]
+
+        # Activation voltage: d/dj (a * log10(j / j0)) = a / (j * ln(10)).
+        alpha_a = 0.0675 + 0.00095 * temp
+        alpha_c = 0.1175 + 0.00095 * temp
+        factor_act = 2.306 * (self.gas_const * temp) / (self.n * self.faraday) * \
+            (1 / alpha_a + 1 / alpha_c)
+        slope_act = factor_act / (cur_dens * np.log(10))
+
+        # Ohmic voltage: d/dj ((r_el + r_other(j)) * j).
+        conductivity_electrolyte = -2.041 * self.molarity_KOH - \
+            0.0028 * self.molarity_KOH ** 2 + \
+            0.001043 * self.molarity_KOH ** 3 + \
+            0.005332 * self.molarity_KOH * temp + \
+            207.2 * self.molarity_KOH / temp - \
+            0.0000003 * self.molarity_KOH ** 2 * temp ** 2
+        resistance_electrolyte = self.fitting_value_electrolyte_thickness / \
+            conductivity_electrolyte
+        epsilon = 0.023 * 2 / 3 * (cur_dens * 10 ** 4) ** 0.3
+        resistance_other = resistance_electrolyte * (1 - epsilon) ** -1.5
+        # d(epsilon)/dj and d(r_other)/dj.
+        slope_epsilon = 0.3 * epsilon / cur_dens
+        slope_resistance_other = resistance_electrolyte * 1.5 * (1 - epsilon) ** -2.5 * \
+            slope_epsilon
+        slope_ohm = resistance_electrolyte + resistance_other + cur_dens * slope_resistance_other
+
+        return slope_act + slope_ohm
+
     def ely_voltage_u_act(self, cur_dens, temp):
         # This voltage part describes the activity losses within the electolyser.
         # Source: 'Modeling an alkaline electrolysis cell through reduced-order
@@ -294,9 +475,9 @@ class Electrolyzer (Component):
         alpha_c = 0.1175 + 0.00095 * this_temp
         # The two parts of the activation voltage for this node[V].
         u_act_a = 2.306 * (self.gas_const * this_temp) / \
-            (self.n * self.faraday * alpha_a) * math.log10(cur_dens / j0)
+            (self.n * self.faraday * alpha_a) * np.log10(cur_dens / j0)
         u_act_c = 2.306 * (self.gas_const * this_temp) / \
-            (self.n * self.faraday * alpha_c) * math.log10(cur_dens / j0)
+            (self.n * self.faraday * alpha_c) * np.log10(cur_dens / j0)
         # The activation voltage for this node[V].
         voltage_activation = u_act_a + u_act_c
 
@@ -366,22 +547,22 @@ class Electrolyzer (Component):
         # Compute the part of the reversible cell voltage that changes due to temperature [V].
         voltage_temperature = 1.5184 - \
             1.5421e-03 * this_temp + \
-            9.526e-05 * this_temp * math.log(this_temp) + \
+            9.526e-05 * this_temp * np.log(this_temp) + \
             9.84e-08 * this_temp ** 2
         # Calculate the vapor pressure of water [bar].
-        pressure_water = math.exp(81.6179 - 7699.68 / this_temp - 10.9 *
-                                  math.log(this_temp) + 9.5891e-03 * this_temp)
+        pressure_water = np.exp(81.6179 - 7699.68 / this_temp - 10.9 *
+                                np.log(this_temp) + 9.5891e-03 * this_temp)
         # Calculate the vapor pressure of KOH solution [bar].
-        pressure_koh = math.exp(2.302 * c1 + c2 * math.log(pressure_water))
+        pressure_koh = np.exp(2.302 * c1 + c2 * np.log(pressure_water))
         # Calculate the water activity value.
-        water_activity = math.exp(
+        water_activity = np.exp(
             -0.05192 * self.molality_KOH +
             0.003302 * self.molality_KOH ** 2 +
             (3.177 * self.molality_KOH - 2.131 * self.molality_KOH ** 2) / this_temp)
         # Compute the part of the reversible cell voltage that changes due to pressure [V].
         voltage_pressure = self.gas_const * this_temp / (self.n * self.faraday) *\
-            math.log((self.pressure - pressure_koh) *
-                     (self.pressure - pressure_koh) ** 0.5 / water_activity)
+            np.log((self.pressure - pressure_koh) *
+                   (self.pressure - pressure_koh) ** 0.5 / water_activity)
         # Calculate the reversible voltage [V].
         voltage_reversible = voltage_temperature + voltage_pressure
 
@@ -396,16 +577,9 @@ class Electrolyzer (Component):
         if 'water_consumption' not in self.states:
             self.states['water_consumption'] = [None] * sim_params.n_intervals
 
-        # Get the flows of the electrolyzer for this time step.
-        data_electrolyzer = views.node(results, self.name)
-        df_electrolyzer = data_electrolyzer['sequences']
-
-        # Get the hydrogen produced this time step [kg].
-        for i_result in df_electrolyzer:
-            if i_result[0][0] == self.name and i_result[1] == 'flow':
-                # Case: This is the flow from the electrolyzer to the hydrogen
-                # bus, therefor the produced H2 [kg].
-                this_h2_produced = df_electrolyzer[i_result][0]
+        # Get the hydrogen produced this time step (the flow from the
+        # electrolyzer to the hydrogen bus) [kg].
+        this_h2_produced = results.get_flow(self.name, self.bus_h2)
 
         # With the hydrogen produced this step the according temperature can be
         # interpolated from the supporting points.
@@ -1,6 +1,6 @@
-import oemof.solph as solph
 from .component_electrolyzer import Electrolyzer
-import pyomo.environ as po
+import numpy as np
+from smooth.components.component_functions.piecewise_transformer import get_part_flows
 
 
 class ElectrolyzerWasteHeat(Electrolyzer):
@@ -58,101 +58,28 @@ class ElectrolyzerWasteHeat(Electrolyzer):
         # Dieguez et al)
         self.area_separator = 2.38 * self.area_stack
 
-        # Save the two models to set constraints later.
-        self.model_h2 = None
-        self.model_th = None
-
-    def conversion_fun_ely(self, ely_energy):
-        # Create a function that will give out the mass values for the electric energy
-        # values at the breakpoints.
-
-        # Check the index of this ely_energy entry.
-        this_index = self.supporting_points["energy_halved"].index(ely_energy)
-        # Return the according hydrogen production value [kg].
-        return self.supporting_points["h2_produced"][this_index]
-
-    def conversion_fun_thermal(self, ely_energy):
-        # Create a function that will give out the thermal energy values for the electric
-        # energy values at the breakpoints.
-        # Check the index of this ely_energy entry.
-        this_index = self.supporting_points["energy_halved"].index(ely_energy)
-        # Return the according hydrogen production value [kg].
-        return self.supporting_points["thermal_energy"][this_index]
-
-    def create_oemof_model(self, busses, model):
-        # Get the non-linear behaviour.
-        self.update_nonlinear_behaviour()
-
-        # First create the hydrogen producing oemof component
-        electrolyzer = solph.custom.PiecewiseLinearTransformer(
-            label=self.name,
-            inputs={
-                busses[self.bus_el]: solph.Flow(
-                    nominal_value=self.energy_max / 2, variable_costs=0
-                )
-            },
-            outputs={busses[self.bus_h2]: solph.Flow()},
-            in_breakpoints=self.supporting_points["energy_halved"],
-            conversion_function=self.conversion_fun_ely,
-            pw_repn="CC",
-        )
-
-        # Then create the thermal oemof component.
-        electrolyzer_thermal = solph.custom.PiecewiseLinearTransformer(
-            label=self.name + "_thermal",
-            inputs={
-                busses[self.bus_el]: solph.Flow(
-                    nominal_value=self.energy_max / 2, variable_costs=0
-                )
-            },
-            outputs={busses[self.bus_th]: solph.Flow()},
-            in_breakpoints=self.supporting_points["energy_halved"],
-            conversion_function=self.conversion_fun_thermal,
-            pw_repn="CC",
-        )
-
-        # Add the two components to the model.
-        model.add(electrolyzer, electrolyzer_thermal)
-
-        self.model_h2 = electrolyzer
-        self.model_th = electrolyzer_thermal
-
-        return None
+    def get_out_breakpoints(self, busses):
+        # Get the hydrogen production [kg] and waste heat [Wh] at the breakpoints, by the
+        # output bus (the oemof component is created by the Electrolyzer).
+        return {busses[self.bus_h2]: self.scale_to_step(self.supporting_points["h2_produced"]),
+                busses[self.bus_th]: self.scale_to_step(self.supporting_points["thermal_energy"])}
 
     def update_nonlinear_behaviour(self):
         # Set up the breakpoints for the electrolyzer conversion of electricity to hydrogen.
-        n_supporting_point = 10
-        # Get the breakpoint values for electric energy [Wh] and produced hydrogen [kg].
-        bp_ely_energy = []
-        bp_ely_h2 = []
-        bp_ely_temp = []
-        bp_ely_thermal = []
-        for i_supporting_point in range(n_supporting_point + 1):
-            # Calculate the energy for this breakpoint [Wh].
-            this_energy = (
-                i_supporting_point / n_supporting_point * self.energy_max
-            )
-            bp_ely_energy.append(this_energy)
-            # Calculate the hydrogen produced [kg] and resulting temperature [K] with the
-            # energy of this breakpoint and at the current temperature.
-            [this_mass, this_temp] = self.get_mass_and_temp(this_energy / 1000)
-            bp_ely_h2.append(this_mass)
-            bp_ely_temp.append(this_temp)
-            # Calculate the waste heat [Wh] with the energy, hydrogen produced and resulting
-            # temperature of this breakpoint at the current temperature.
-            this_waste_heat = (
-                self.get_waste_heat(this_energy / 1000, this_mass, this_temp)
-                * 1000
-            )  # [Wh]
-            bp_ely_thermal.append(this_waste_heat)
-
-        self.supporting_points["temperature"] = bp_ely_temp
-        self.supporting_points["h2_produced"] = bp_ely_h2
-        self.supporting_points["energy"] = bp_ely_energy
-        self.supporting_points["thermal_energy"] = bp_ely_thermal
-        self.supporting_points["energy_halved"] = [
-            this_bp / 2 for this_bp in bp_ely_energy
-        ]
+        n_supporting_point = self.get_n_supporting_point()
+        # Get the breakpoint values for electric energy [Wh].
+        bp_ely_energy = np.arange(n_supporting_point + 1) / n_supporting_point * self.energy_max
+        # Calculate the hydrogen produced [kg] and resulting temperature [K] with the energy of
+        # all breakpoints at once and at the current temperature.
+        bp_ely_h2, bp_ely_temp = self.get_mass_and_temp_by_cur_dens(
+            self.get_breakpoint_cur_dens(n_supporting_point))
+        # Calculate the waste heat [Wh] with the energy, hydrogen produced and resulting
+        # temperature of the breakpoints at the current temperature.
+        bp_ely_thermal = self.get_waste_heat(bp_ely_energy / 1000, bp_ely_h2, bp_ely_temp) * 1000
+
+        self.set_supporting_points(
+            {"temperature": bp_ely_temp, "h2_produced": bp_ely_h2, "energy": bp_ely_energy,
+             "thermal_energy": bp_ely_thermal}, ["h2_produced", "thermal_energy"])
 
     def get_waste_heat(self, energy_used, h2_produced, new_ely_temp):
         # source: Dieguez et al., 'Thermal Performance of a commercial alkaline
@@ -175,11 +102,11 @@ class ElectrolyzerWasteHeat(Electrolyzer):
         [sensible_heat, latent_heat] = self.sensible_and_latent_heats(
             h2_produced, new_ely_temp
         )  # [kWh]
-        if new_ely_temp >= (0.999 * self.temp_max):
-            waste_heat = internal_heat_generation - heat_losses + sensible_heat
-        else:
-            waste_heat = 0
-        return waste_heat
+        # Waste heat is only available at the max. temperature (works for single values and
+        # arrays).
+        waste_heat = np.where(new_ely_temp >= (0.999 * self.temp_max),
+                              internal_heat_generation - heat_losses + sensible_heat, 0)
+        return waste_heat if np.ndim(waste_heat) > 0 else waste_heat.item()
 
     def sensible_and_latent_heats(self, mass_H2, new_ely_temp):
         # mass of H2, O2 and H2O is related by the water decomposition stoichiometry
@@ -200,26 +127,8 @@ class ElectrolyzerWasteHeat(Electrolyzer):
         latent_heat = 0
         return [sensible_heat, latent_heat]
 
-    def update_constraints(self, busses, model_to_solve):
-        # Set a constraint so that the electric inflow of the hydrogen producing and the
-        # thermal part are always the same (which is necessary while the piecewise linear
-        # transformer cannot have two outputs yet and therefore the two parts need to be
-        # separate components).
-        def electrolyzer_ratio_rule(model, t):
-            # Inverter flow
-            expr = 0
-            expr += model.flow[busses[self.bus_el], self.model_th, t]
-            # force discharge to zero when grid available
-            expr += -model.flow[busses[self.bus_el], self.model_h2, t]
-            return expr == 0
-
-        model_to_solve.electrolyzer_flow_ratio_fix = po.Constraint(
-            model_to_solve.TIMESTEPS, rule=electrolyzer_ratio_rule
-        )
-
     def update_flows(self, results, sim_params):
-        # Check if the component has an attribute 'flows', if not, create it as an empty dict.
-        Electrolyzer.update_flows(self, results, sim_params, self.name)
-        Electrolyzer.update_flows(
-            self, results, sim_params, self.name + "_thermal"
-        )
+        # The flows are saved under the names of the former separate hydrogen and thermal oemof
+        # components.
+        self.save_flows(get_part_flows(results.get_flows(self.name), self.name, {
+            self.bus_h2: self.name, self.bus_th: self.name + "_thermal"}), sim_params)
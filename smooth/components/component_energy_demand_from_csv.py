@@ -2,6 +2,7 @@ import os
 import oemof.solph as solph
 from smooth.components.component import Component
 import smooth.framework.functions.functions as func
+from smooth.framework.functions.update_oemof_model import set_fixed_flow
 
 
 class EnergyDemandFromCsv(Component):
@@ -29,11 +30,26 @@ class EnergyDemandFromCsv(Component):
         self.data = func.read_data_file(self.path, self.csv_filename,
                                         self.csv_separator, self.column_title)
 
+    def precompute(self, sim_params):
+        # The csv data is the actual value of the flow in each interval.
+        self.add_time_series('actual_value', self.data)
+
     def create_oemof_model(self, busses, _):
         energy_demand_from_csv = solph.Sink(
             label=self.name,
             inputs={busses[self.bus_in]: solph.Flow(
-                actual_value=self.data.iloc[self.sim_params.i_interval],
+                actual_value=self.get_horizon_values(self.time_series['actual_value']),
                 nominal_value=self.nominal_value,
                 fixed=True)})
+        self.model = energy_demand_from_csv
         return energy_demand_from_csv
+
+    def get_interval_key(self):
+        # The fixed demand of the optimized intervals.
+        return self.get_horizon_values(self.time_series['actual_value'])
+
+    def update_oemof_model(self, busses, model):
+        # Fix the input flow to the demand of this solve.
+        set_fixed_flow(model, busses[self.bus_in], self.model,
+                       self.get_horizon_values(self.time_series['actual_value']) *
+                       self.nominal_value)
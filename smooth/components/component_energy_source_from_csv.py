@@ -2,6 +2,7 @@ import os
 import oemof.solph as solph
 from smooth.components.component import Component
 import smooth.framework.functions.functions as func
+from smooth.framework.functions.update_oemof_model import set_fixed_flow
 
 
 class EnergySourceFromCsv (Component):
@@ -30,11 +31,26 @@ class EnergySourceFromCsv (Component):
         self.data = func.read_data_file(self.path, self.csv_filename,
                                         self.csv_separator, self.column_title)
 
+    def precompute(self, sim_params):
+        # The csv data is the actual value of the flow in each interval.
+        self.add_time_series('actual_value', self.data)
+
     def create_oemof_model(self, busses, _):
         energy_source_from_csv = solph.Source(
             label=self.name,
             outputs={busses[self.bus_out]: solph.Flow(
-                actual_value=self.data.iloc[self.sim_params.i_interval],
+                actual_value=self.get_horizon_values(self.time_series['actual_value']),
                 nominal_value=self.nominal_value,
                 fixed=True)})
+        self.model = energy_source_from_csv
         return energy_source_from_csv
+
+    def get_interval_key(self):
+        # The fixed output of the optimized intervals.
+        return self.get_horizon_values(self.time_series['actual_value'])
+
+    def update_oemof_model(self, busses, model):
+        # Fix the output flow to the values of this solve.
+        set_fixed_flow(model, self.model, busses[self.bus_out],
+                       self.get_horizon_values(self.time_series['actual_value']) *
+                       self.nominal_value)
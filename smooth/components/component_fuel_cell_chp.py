@@ -1,6 +1,8 @@
 from smooth.components.component import Component
+from smooth.components.component_functions.piecewise_transformer import \
+    PiecewiseTransformer, get_common_breakpoints, get_part_flows
+from smooth.components.component_functions.breakpoints import apply_tolerance
 import oemof.solph as solph
-import pyomo.environ as po
 
 
 class FuelCellChp(Component):
@@ -78,97 +80,38 @@ class FuelCellChp(Component):
                 self.bp_eff_thermal[i_bp] * self.heating_value * 1000
             self.bp_energy_thermal.append(this_energy_thermal)
 
-        # While we will create two oemof components, one for thermal energy and
-        # one for electrical energy, and make a constraint that both inflows of
-        # hydrogen have to be the same, each component will get only half the
-        # amount of hydrogen. Therefore we need to make a list of hydrogen
-        # consumed that is halfed [kg]
-        self.bp_h2_consumed_electric_half = [
-            this_bp / 2 for this_bp in self.bp_h2_consumed_electric]
-        self.bp_h2_consumed_thermal_half = [this_bp / 2 for this_bp in self.bp_h2_consumed_thermal]
-
-        # Save the two models to set constraints later.
-        self.model_el = None
-        self.model_th = None
-
-    def get_electrical_energy_by_h2(self, h2_consumption):
-        # Check the index of this load point.
-        this_index = self.bp_h2_consumed_electric_half.index(h2_consumption)
-        # Return the according hydrogen production value [kg].
-        return self.bp_energy_electric[this_index]
-
-    def get_thermal_energy_by_h2(self, h2_consumption):
-        # Check the index of this load point.
-        this_index = self.bp_h2_consumed_thermal_half.index(h2_consumption)
-        # Return the according hydrogen production value [kg].
-        return self.bp_energy_thermal[this_index]
+        # Both outputs are modelled by one piecewise transformer, so they need breakpoints at
+        # the same hydrogen consumptions [kg] (electrical and thermal energy [Wh]).
+        bp_h2_consumed, bp_energy = get_common_breakpoints(
+            {'electric': self.bp_h2_consumed_electric, 'thermal': self.bp_h2_consumed_thermal},
+            {'electric': self.bp_energy_electric, 'thermal': self.bp_energy_thermal})
+        # With a pwl_tolerance, only the breakpoints needed to stay within it are kept.
+        self.bp_h2_consumed, bp_energy, self.pwl_report = apply_tolerance(
+            bp_h2_consumed, bp_energy, self.pwl_tolerance)
+        self.bp_energy_electric_common = bp_energy['electric']
+        self.bp_energy_thermal_common = bp_energy['thermal']
+
+        # Save the oemof model.
+        self.model = None
 
     def create_oemof_model(self, busses, model):
-        # Create the non-linear oemof component. The CHP has to be modelled as
-        # two components, while the piecewise linear transformer does not
-        # accept 2 outputs yet.
-
-        flow_electric = solph.Flow(
-            nominal_value=self.bp_h2_consumed_electric_half[-1],
-            variable_costs=0)
-        flow_thermal = solph.Flow(nominal_value=self.bp_h2_consumed_electric_half[-1])
-
-        # First create the electrical oemof component.
-        fuel_cell_chp_electric = solph.custom.PiecewiseLinearTransformer(
-            label=self.name+'_electric',
-            inputs={busses[self.bus_h2]: flow_electric},
-            outputs={busses[self.bus_el]: solph.Flow()},
-            in_breakpoints=self.bp_h2_consumed_electric_half,
-            conversion_function=self.get_electrical_energy_by_h2,
-            pw_repn='CC')
-
-        # Then create the thermal oemof component.
-        fuel_cell_chp_thermal = solph.custom.PiecewiseLinearTransformer(
-            label=self.name+'_thermal',
-            inputs={busses[self.bus_h2]: flow_thermal},
-            outputs={busses[self.bus_th]: solph.Flow()},
-            in_breakpoints=self.bp_h2_consumed_thermal_half,
-            conversion_function=self.get_thermal_energy_by_h2,
-            pw_repn='CC')
-
-        # Add the two components to the model.
-        model.add(fuel_cell_chp_electric, fuel_cell_chp_thermal)
-
-        self.model_el = fuel_cell_chp_electric
-        self.model_th = fuel_cell_chp_thermal
-
-        """
-        # Get the input H2 flows of both oemof components that need to be set equal.
-        flow_electric = model.nodes[len(model.nodes)-2].inputs[busses[self.bus_h2]]
-        flow_thermal = model.nodes[len(model.nodes) - 1].inputs[busses[self.bus_h2]]
-
-        # Get
-        fl_el = model.groups[self.name + '_electric'].inputs[busses[self.bus_h2]]
-        fl_th = model.groups[self.name + '_thermal'].inputs[busses[self.bus_h2]]
-        """
-        # Now set the two inflows of H2 in the electrical in the thermal CHP
-        # component to be the same.
-        # solph.constraints.equate_variables(model, flow_electric, flow_thermal)
-
-        return None
-
-    def update_constraints(self, busses, model_to_solve):
-        # Set a constraint so that the hydrogen inflow of the electrical and
-        # the thermal part are always the same (which is necessary while the
-        # piecewise linear transformer cannot have two outputs yet and
-        # therefore the two parts need to be separate components).
-        def chp_ratio_rule(model, t):
-            # Inverter flow
-            expr = 0
-            expr += model.flow[busses[self.bus_h2], self.model_th, t]
-            # force discharge to zero when grid available
-            expr += - model.flow[busses[self.bus_h2], self.model_el, t]
-            return (expr == 0)
-
-        model_to_solve.chp_flow_ratio_fix = po.Constraint(
-            model_to_solve.TIMESTEPS, rule=chp_ratio_rule)
+        # Create the non-linear oemof component with one hydrogen input and the electrical and
+        # thermal output.
+        fuel_cell_chp = PiecewiseTransformer(
+            label=self.name,
+            inputs={busses[self.bus_h2]: solph.Flow(
+                nominal_value=self.scale_to_step(self.h2_input_max), variable_costs=0)},
+            outputs={busses[self.bus_el]: solph.Flow(), busses[self.bus_th]: solph.Flow()},
+            in_breakpoints=self.scale_to_step(self.bp_h2_consumed),
+            out_breakpoints={
+                busses[self.bus_el]: self.scale_to_step(self.bp_energy_electric_common),
+                busses[self.bus_th]: self.scale_to_step(self.bp_energy_thermal_common)},
+            allow_lp=self.pwl_allow_lp, pw_repn=self.get_pw_repn())
+        self.model = fuel_cell_chp
+        return fuel_cell_chp
 
     def update_flows(self, results, sim_params):
-        # Check if the component has an attribute 'flows', if not, create it as an empty dict.
-        Component.update_flows(self, results, sim_params, self.name + '_electric')
-        Component.update_flows(self, results, sim_params, self.name + '_thermal')
+        # The flows are saved under the names of the former separate electrical and thermal
+        # oemof components, which are used e.g. for dependency flows.
+        self.save_flows(get_part_flows(results.get_flows(self.name), self.name, {
+            self.bus_el: self.name + '_electric', self.bus_th: self.name + '_thermal'}), sim_params)
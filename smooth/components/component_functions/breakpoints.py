@@ -0,0 +1,89 @@
+import numpy as np
+
+# Number of load steps between zero and max. load the curves computed by a component (e.g. the
+# Electrolyzer) are sampled with before they are simplified.
+N_SAMPLES = 100
+
+
+def simplify_breakpoints(in_values, out_values, tolerance):
+    # Choose the breakpoints of piecewise linear curves from densely sampled points (in the
+    # style of the Douglas-Peucker algorithm): starting with the first and last point, the point
+    # with the largest error between two breakpoints becomes a breakpoint as well, until no
+    # error exceeds the tolerance. All curves share the same breakpoints, so the error of a
+    # point is the largest error of all curves.
+    # Parameters:
+    #  in_values: Input values of the samples (ascending).
+    #  out_values: Output values of each curve at the samples, by the name of the curve [dict].
+    #  tolerance: Max. error of each curve, relative to the range of its output values [-].
+    # Returns the indices of the samples that are kept as breakpoints [list] and a report of
+    # the resulting model size and error [dict].
+    x = np.asarray(in_values, dtype=float)
+    # Scale each curve to its range, so that the tolerance is the same for all units.
+    ys = []
+    for values in out_values.values():
+        y = np.asarray(values, dtype=float)
+        y_range = np.ptp(y)
+        ys.append(y / y_range if y_range > 0 else y)
+    ys = np.array(ys)
+
+    is_kept = np.zeros(len(x), dtype=bool)
+    is_kept[[0, -1]] = True
+    sections = [(0, len(x) - 1)]
+    while sections:
+        i_start, i_end = sections.pop()
+        if i_end - i_start < 2:
+            continue
+        errors = get_errors(x[i_start:i_end + 1], ys[:, i_start:i_end + 1])
+        i_max = int(np.argmax(errors))
+        if errors[i_max] > tolerance:
+            # The errors are the ones of the inner samples.
+            i_max += i_start + 1
+            is_kept[i_max] = True
+            sections += [(i_start, i_max), (i_max, i_end)]
+
+    indices = np.flatnonzero(is_kept)
+    max_error = 0.0
+    for i_start, i_end in zip(indices[:-1], indices[1:]):
+        max_error = max(max_error, float(np.max(
+            get_errors(x[i_start:i_end + 1], ys[:, i_start:i_end + 1]), initial=0)))
+    n_breakpoints = len(indices)
+    report = {
+        'n_samples': len(x),
+        'n_breakpoints': n_breakpoints,
+        'max_error': max_error,
+        # Size of the convex combination formulation per time step.
+        'n_weights': n_breakpoints,
+        'n_binaries': n_breakpoints - 1,
+    }
+    return indices.tolist(), report
+
+
+def apply_tolerance(in_values, out_values, tolerance):
+    # Keep only the breakpoints of piecewise linear curves that are needed to stay within the
+    # tolerance (see simplify_breakpoints). The curves are linear between their breakpoints, so
+    # the error is exact.
+    # Parameters:
+    #  in_values: Input values of the breakpoints (ascending).
+    #  out_values: Output values of each curve at the breakpoints, by the name of the curve
+    #  [dict].
+    #  tolerance: Max. error of each curve, relative to the range of its output values [-], all
+    #  breakpoints are kept if it is None.
+    # Returns the input values [list], the output values by name [dict] and the report [dict]
+    # (None if the tolerance is None) of the kept breakpoints.
+    if tolerance is None:
+        return list(in_values), {name: list(values) for name, values in out_values.items()}, None
+    indices, report = simplify_breakpoints(in_values, out_values, tolerance)
+    return [in_values[i] for i in indices], \
+        {name: [values[i] for i in indices] for name, values in out_values.items()}, report
+
+
+def get_errors(x, ys):
+    # Get the error of the inner samples when the curves are linear between the first and last
+    # sample.
+    # Parameters:
+    #  x: Input values of the samples [array].
+    #  ys: Output values of each curve (rows) at the samples [array].
+    # Returns the largest error of all curves at each inner sample [array].
+    share = (x[1:-1] - x[0]) / (x[-1] - x[0])
+    y_linear = ys[:, :1] + np.outer(ys[:, -1] - ys[:, 0], share)
+    return np.max(np.abs(ys[:, 1:-1] - y_linear), axis=0)
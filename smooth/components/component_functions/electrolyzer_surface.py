@@ -0,0 +1,117 @@
+import hashlib
+import os
+import numpy as np
+
+# Version of the surface, surfaces of other versions in the disk cache are not used.
+SURFACE_VERSION = 1
+# Distance of the temperatures of the surface [K].
+TEMPERATURE_STEP = 0.1
+# Surfaces by their key, shared by all electrolyzers of this process.
+surfaces = {}
+
+
+def get_surface_key(ely, n_supporting_point):
+    # Get the key of the surface of an electrolyzer. It is a hash of all parameters the current
+    # densities depend on, so electrolyzers with the same configuration (e.g. individuals of
+    # the genetic algorithm) share their surface. It is the same for the Electrolyzer and the
+    # ElectrolyzerWasteHeat.
+    # Parameters:
+    #  ely: Electrolyzer object [object].
+    #  n_supporting_point: Number of load steps between zero and max. power [-].
+    parameters = [SURFACE_VERSION, TEMPERATURE_STEP, n_supporting_point] + [
+        getattr(ely, name) for name in [
+            'power_max', 'z_cell', 'area_cell', 'pressure', 'temp_init', 'temp_min', 'temp_max',
+            'fitting_value_exchange_current_density', 'fitting_value_electrolyte_thickness',
+            'molarity_KOH', 'molality_KOH', 'faraday', 'gas_const', 'n', 'molarity',
+            'upp_heat_val']]
+    return hashlib.sha1(repr(parameters).encode()).hexdigest()
+
+
+def get_electrolyzer_surface(ely, n_supporting_point, cache_dir=None):
+    # Get the current densities of an electrolyzer over its load steps and temperatures. The
+    # surface is built once per parameter set and then taken from the memory of this process
+    # or from the cache directory.
+    # Parameters:
+    #  ely: Electrolyzer object [object].
+    #  n_supporting_point: Number of load steps between zero and max. power [-].
+    #  cache_dir: Directory the surfaces are saved in (only kept in memory if None) [str].
+    # Returns the surface with the load fractions [-], the temperatures [K] and the current
+    # density for each load fraction (rows) and temperature (columns) [A/cm²] [dict].
+    key = get_surface_key(ely, n_supporting_point)
+    surface = surfaces.get(key)
+    if surface is not None:
+        return surface
+
+    file_path = None
+    if cache_dir is not None:
+        file_path = os.path.join(cache_dir, 'electrolyzer_surface_{}.npz'.format(key))
+        if os.path.isfile(file_path):
+            with np.load(file_path) as surface_file:
+                surface = {name: surface_file[name] for name in surface_file.files}
+            if not np.all(np.isfinite(surface['cur_dens'])):
+                # The surface was cached before the current densities were checked, it is
+                # built again.
+                surface = None
+
+    if surface is None:
+        surface = build_surface(ely, n_supporting_point)
+        # Surfaces with current densities that were not found are never cached.
+        check_surface(ely, surface)
+        if file_path is not None:
+            # Write to a temporary file first, so that other processes never read a partly
+            # written surface.
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_file_path = '{}.{}.tmp'.format(file_path, os.getpid())
+            with open(tmp_file_path, 'wb') as surface_file:
+                np.savez(surface_file, **surface)
+            os.replace(tmp_file_path, file_path)
+
+    surfaces[key] = surface
+    return surface
+
+
+def build_surface(ely, n_supporting_point):
+    # Calculate the current densities of an electrolyzer for all load steps and temperatures
+    # (see get_electrolyzer_surface) in one call of Newton's method.
+    # Parameters:
+    #  ely: Electrolyzer object [object].
+    #  n_supporting_point: Number of load steps between zero and max. power [-].
+    load_fractions = np.arange(n_supporting_point + 1) / n_supporting_point
+    # The temperature of the electrolyzer stays between these values.
+    temp_low = min(ely.temp_min, ely.temp_init)
+    temp_high = max(ely.temp_max, ely.temp_init)
+    n_temperatures = int(np.ceil((temp_high - temp_low) / TEMPERATURE_STEP)) + 1
+    temperatures = np.linspace(temp_low, temp_low + (n_temperatures - 1) * TEMPERATURE_STEP,
+                               n_temperatures)
+    power = np.outer(load_fractions, np.ones(n_temperatures)) * ely.power_max / 1000
+    cur_dens = ely.get_cur_dens_by_power(power, temperatures[np.newaxis, :])
+    return {'load_fractions': load_fractions, 'temperatures': temperatures, 'cur_dens': cur_dens}
+
+
+def check_surface(ely, surface):
+    # Raise a ValueError if a current density of the surface was not found (see
+    # Electrolyzer.check_cur_dens).
+    # Parameters:
+    #  ely: Electrolyzer object [object].
+    #  surface: Surface of the electrolyzer (see get_electrolyzer_surface) [dict].
+    ely.check_cur_dens(surface['cur_dens'],
+                       surface['load_fractions'][:, np.newaxis] * ely.power_max / 1000,
+                       surface['temperatures'][np.newaxis, :])
+
+
+def interpolate_surface(surface, temperature):
+    # Get the current densities of all load steps at a temperature by linear interpolation.
+    # Parameters:
+    #  surface: Surface of the electrolyzer (see get_electrolyzer_surface) [dict].
+    #  temperature: Temperature of the electrolyzer [K].
+    # Returns the current density of each load step [A/cm²], or None if the temperature is
+    # outside of the surface.
+    temperatures = surface['temperatures']
+    if not temperatures[0] <= temperature <= temperatures[-1]:
+        return None
+    i_temp = min(np.searchsorted(temperatures, temperature, side='right') - 1,
+                 len(temperatures) - 2)
+    weight = (temperature - temperatures[i_temp]) / \
+        (temperatures[i_temp + 1] - temperatures[i_temp])
+    cur_dens = surface['cur_dens']
+    return cur_dens[:, i_temp] * (1 - weight) + cur_dens[:, i_temp + 1] * weight
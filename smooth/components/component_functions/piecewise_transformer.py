@@ -0,0 +1,370 @@
+import numpy as np
+import oemof.solph as solph
+import pyomo.environ as po
+try:
+    from pyomo.core.base.block import ScalarBlock
+except ImportError:
+    # Older pyomo versions.
+    from pyomo.core.base.block import SimpleBlock as ScalarBlock
+
+
+# Representations of the piecewise linear constraints of curves that are not concave (see
+# PiecewiseTransformerBlock), named like the ones of pyomo's Piecewise.
+PW_REPNS = ['CC', 'SOS2', 'DCC', 'LOG', 'MC']
+
+
+class PiecewiseTransformer(solph.Transformer):
+    # oemof transformer with one input and several outputs, each of them a piecewise linear
+    # function of the input. All outputs are modelled with the same convex combination weights
+    # and segment binaries (see PiecewiseTransformerBlock), so e.g. the electric and thermal
+    # output of a CHP need no separate oemof components that are coupled by an extra constraint.
+
+    def __init__(self, *args, in_breakpoints=None, out_breakpoints=None, allow_lp=False,
+                 pw_repn='CC', **kwargs):
+        # Parameters:
+        #  in_breakpoints: Values of the input flow at the breakpoints (ascending).
+        #  out_breakpoints: Values of each output flow at the breakpoints, by the output bus
+        #  [dict].
+        #  allow_lp: Decide if the LP formulation is used when all outputs are concave
+        #  functions of the input (see get_formulation) [bool].
+        #  pw_repn: Representation of the constraints otherwise, one of PW_REPNS [str].
+        super().__init__(*args, **kwargs)
+        if len(self.inputs) != 1:
+            raise ValueError('The piecewise transformer {} needs exactly one input, not {}'.format(
+                self.label, len(self.inputs)))
+        self.input_bus = list(self.inputs)[0]
+        self.allow_lp = allow_lp
+        self.pw_repn = None
+        self.in_breakpoints = None
+        self.out_breakpoints = None
+        # Formulation of the constraints, 'LP' or the pw_repn (see PiecewiseTransformerBlock).
+        self.formulation = None
+        self.set_pw_repn(pw_repn)
+        self.set_breakpoints(in_breakpoints, out_breakpoints)
+
+    def set_pw_repn(self, pw_repn):
+        # Set the representation of the constraints if the curves are not concave. In a built
+        # model, the block has to be rebuilt afterwards.
+        # Parameters:
+        #  pw_repn: Representation, one of PW_REPNS [str].
+        if pw_repn not in PW_REPNS:
+            raise ValueError('The piecewise representation of {} has to be one of {}, not '
+                             '"{}"'.format(self.label, ', '.join(PW_REPNS), pw_repn))
+        self.pw_repn = pw_repn
+        if self.in_breakpoints is not None:
+            self.formulation = self.get_formulation()
+
+    def set_breakpoints(self, in_breakpoints, out_breakpoints):
+        # Set new breakpoints, e.g. if they depend on a state of the component. In a persistent
+        # model, the block has to be rebuilt afterwards (see mark_block_outdated).
+        # Parameters:
+        #  in_breakpoints: Values of the input flow at the breakpoints (ascending).
+        #  out_breakpoints: Values of each output flow at the breakpoints, by the output bus
+        #  [dict].
+        if len(in_breakpoints) < 2:
+            raise ValueError('The piecewise transformer {} needs at least two breakpoints'.format(
+                self.label))
+        if set(out_breakpoints) != set(self.outputs):
+            raise ValueError('The piecewise transformer {} needs breakpoints for exactly its '
+                             'outputs'.format(self.label))
+        for bus, values in out_breakpoints.items():
+            if len(values) != len(in_breakpoints):
+                raise ValueError('The piecewise transformer {} has {} input breakpoints but {} '
+                                 'breakpoints for the output to {}'.format(
+                                     self.label, len(in_breakpoints), len(values), bus))
+        self.in_breakpoints = list(in_breakpoints)
+        self.out_breakpoints = {bus: list(values) for bus, values in out_breakpoints.items()}
+        self.formulation = self.get_formulation()
+
+    def has_breakpoints(self, in_breakpoints, out_breakpoints):
+        # Check if the node already has these breakpoints (see set_breakpoints).
+        return np.array_equal(self.in_breakpoints, in_breakpoints) and \
+            set(out_breakpoints) == set(self.out_breakpoints) and \
+            all(np.array_equal(self.out_breakpoints[bus], values)
+                for bus, values in out_breakpoints.items())
+
+    def get_formulation(self):
+        # Get the formulation of the constraints with the current breakpoints.
+        if not self.allow_lp:
+            return self.pw_repn
+        return get_formulation(self.in_breakpoints, self.out_breakpoints, self.pw_repn)
+
+    def constraint_group(self):
+        return PiecewiseTransformerBlock
+
+
+class PiecewiseTransformerBlock(ScalarBlock):
+    # Constraints of all piecewise transformers. For each breakpoint k, segment s (between
+    # breakpoints s and s + 1), output o and time step t of a node, the formulations are:
+    #  LP (if all outputs are concave functions of the input, no binaries):
+    #   in_breakpoint(0) <= input flow(t) <= in_breakpoint(-1)
+    #   output flow(o, t) <= out_breakpoint(o, s) + slope(o, s) * (input flow(t)
+    #   - in_breakpoint(s)), the optimizer keeps the outputs on the curve as long as it
+    #   benefits from them.
+    #  CC, SOS2, LOG (convex combination of the breakpoints):
+    #   input flow(t) = sum_k weight(k, t) * in_breakpoint(k)
+    #   output flow(o, t) = sum_k weight(k, t) * out_breakpoint(o, k)
+    #   sum_k weight(k, t) = 1
+    #   Only two neighbouring weights can be positive, which is ensured
+    #   with CC by a binary per segment: weight(k, t) <= segment(k - 1, t) + segment(k, t),
+    #   with SOS2 by an SOS2 constraint of the weights (the solver has to support it),
+    #   with LOG by log2(number of segments) binaries, the segments are numbered by a Gray code.
+    #  DCC (disaggregated convex combination), with a binary per segment:
+    #   input flow(t) = sum_s weight(s, 0, t) * in_breakpoint(s)
+    #   + weight(s, 1, t) * in_breakpoint(s + 1), the outputs alike
+    #   weight(s, 0, t) + weight(s, 1, t) = segment(s, t)
+    #  MC (multiple choice), with a binary and the input of each segment:
+    #   segment(s, t) * in_breakpoint(s) <= segment input(s, t)
+    #   <= segment(s, t) * in_breakpoint(s + 1)
+    #   input flow(t) = sum_s segment input(s, t)
+    #   output flow(o, t) = sum_s slope(o, s) * segment input(s, t) + (out_breakpoint(o, s)
+    #   - slope(o, s) * in_breakpoint(s)) * segment(s, t)
+    #  For all formulations with segment binaries: sum_s segment(s, t) = 1.
+    CONSTRAINT_GROUP = True
+
+    def _create(self, group=None):
+        # Parameters:
+        #  group: List of the PiecewiseTransformer nodes of the model.
+        if group is None:
+            return None
+
+        m = self.parent_block()
+        nodes = {formulation: [n for n in group if n.formulation == formulation]
+                 for formulation in ['LP'] + PW_REPNS}
+        weight_nodes = nodes['CC'] + nodes['SOS2'] + nodes['LOG']
+        segment_nodes = nodes['CC'] + nodes['DCC'] + nodes['MC']
+
+        # ------------------- SETS -------------------
+        self.BREAKPOINTS = po.Set(dimen=2, initialize=[
+            (n, k) for n in weight_nodes for k in range(len(n.in_breakpoints))])
+        self.WEIGHT_OUTPUTS = po.Set(dimen=2, initialize=[
+            (n, o) for n in weight_nodes for o in n.outputs])
+        self.SEGMENT_NODES = po.Set(initialize=segment_nodes)
+        self.SEGMENTS = po.Set(dimen=2, initialize=[
+            (n, s) for n in segment_nodes for s in range(len(n.in_breakpoints) - 1)])
+
+        # ------------------- VARIABLES -------------------
+        self.weight = po.Var(self.BREAKPOINTS, m.TIMESTEPS, within=po.NonNegativeReals)
+        self.segment = po.Var(self.SEGMENTS, m.TIMESTEPS, within=po.Binary)
+
+        # ------------------- CONSTRAINTS OF ALL FORMULATIONS WITH WEIGHTS -------------------
+        def _input_rule(block, n, t):
+            return m.flow[n.input_bus, n, t] == sum(
+                block.weight[n, k, t] * value for k, value in enumerate(n.in_breakpoints))
+        self.input_relation = po.Constraint(weight_nodes, m.TIMESTEPS, rule=_input_rule)
+
+        def _output_rule(block, n, o, t):
+            return m.flow[n, o, t] == sum(
+                block.weight[n, k, t] * value for k, value in enumerate(n.out_breakpoints[o]))
+        self.output_relation = po.Constraint(
+            self.WEIGHT_OUTPUTS, m.TIMESTEPS, rule=_output_rule)
+
+        def _weight_sum_rule(block, n, t):
+            return sum(block.weight[n, k, t] for k in range(len(n.in_breakpoints))) == 1
+        self.weight_sum = po.Constraint(weight_nodes, m.TIMESTEPS, rule=_weight_sum_rule)
+
+        # ------------------- CONSTRAINTS OF ALL FORMULATIONS WITH SEGMENTS -------------------
+        def _segment_sum_rule(block, n, t):
+            return sum(block.segment[n, s, t] for s in range(len(n.in_breakpoints) - 1)) == 1
+        self.segment_sum = po.Constraint(
+            self.SEGMENT_NODES, m.TIMESTEPS, rule=_segment_sum_rule)
+
+        self._create_cc(nodes['CC'])
+        self._create_sos2(nodes['SOS2'])
+        self._create_log(nodes['LOG'])
+        self._create_dcc(nodes['DCC'])
+        self._create_mc(nodes['MC'])
+        self._create_lp(nodes['LP'])
+
+    def _create_cc(self, nodes):
+        # Only the two weights at the ends of the chosen segment can be positive.
+        m = self.parent_block()
+        self.CC_BREAKPOINTS = po.Set(dimen=2, initialize=[
+            (n, k) for n in nodes for k in range(len(n.in_breakpoints))])
+
+        def _adjacency_rule(block, n, k, t):
+            expr = 0
+            if k > 0:
+                expr += block.segment[n, k - 1, t]
+            if k < len(n.in_breakpoints) - 1:
+                expr += block.segment[n, k, t]
+            return block.weight[n, k, t] <= expr
+        self.adjacency = po.Constraint(self.CC_BREAKPOINTS, m.TIMESTEPS, rule=_adjacency_rule)
+
+    def _create_sos2(self, nodes):
+        m = self.parent_block()
+
+        def _sos2_rule(block, n, t):
+            return [block.weight[n, k, t] for k in range(len(n.in_breakpoints))]
+        self.sos2 = po.SOSConstraint(nodes, m.TIMESTEPS, rule=_sos2_rule, sos=2)
+
+    def _create_log(self, nodes):
+        # Each bit of the Gray code of the chosen segment excludes the weights of all
+        # breakpoints whose segments have the other value of this bit.
+        m = self.parent_block()
+        self.LOG_BITS = po.Set(dimen=2, initialize=[
+            (n, i_bit) for n in nodes for i_bit in range(get_n_bits(len(n.in_breakpoints) - 1))])
+        self.bit = po.Var(self.LOG_BITS, m.TIMESTEPS, within=po.Binary)
+
+        def get_breakpoints_with_bit(n, i_bit, value):
+            # Get the breakpoints whose segments all have the value at this bit.
+            n_segments = len(n.in_breakpoints) - 1
+            codes = [s ^ (s >> 1) for s in range(n_segments)]
+            return [k for k in range(n_segments + 1)
+                    if all((codes[s] >> i_bit) & 1 == value
+                           for s in [k - 1, k] if 0 <= s < n_segments)]
+
+        def _bit_one_rule(block, n, i_bit, t):
+            return sum(block.weight[n, k, t] for k in get_breakpoints_with_bit(n, i_bit, 1)) \
+                <= block.bit[n, i_bit, t]
+        self.log_bit_one = po.Constraint(self.LOG_BITS, m.TIMESTEPS, rule=_bit_one_rule)
+
+        def _bit_zero_rule(block, n, i_bit, t):
+            return sum(block.weight[n, k, t] for k in get_breakpoints_with_bit(n, i_bit, 0)) \
+                <= 1 - block.bit[n, i_bit, t]
+        self.log_bit_zero = po.Constraint(self.LOG_BITS, m.TIMESTEPS, rule=_bit_zero_rule)
+
+    def _create_dcc(self, nodes):
+        m = self.parent_block()
+        self.DCC_SEGMENT_ENDS = po.Set(dimen=3, initialize=[
+            (n, s, i_end) for n in nodes for s in range(len(n.in_breakpoints) - 1)
+            for i_end in [0, 1]])
+        self.DCC_OUTPUTS = po.Set(dimen=2, initialize=[(n, o) for n in nodes for o in n.outputs])
+        self.DCC_SEGMENTS = po.Set(dimen=2, initialize=[
+            (n, s) for n in nodes for s in range(len(n.in_breakpoints) - 1)])
+        self.segment_weight = po.Var(
+            self.DCC_SEGMENT_ENDS, m.TIMESTEPS, within=po.NonNegativeReals)
+
+        def get_sum(block, n, values, t):
+            return sum(block.segment_weight[n, s, i_end, t] * values[s + i_end]
+                       for s in range(len(values) - 1) for i_end in [0, 1])
+
+        def _input_rule(block, n, t):
+            return m.flow[n.input_bus, n, t] == get_sum(block, n, n.in_breakpoints, t)
+        self.dcc_input_relation = po.Constraint(nodes, m.TIMESTEPS, rule=_input_rule)
+
+        def _output_rule(block, n, o, t):
+            return m.flow[n, o, t] == get_sum(block, n, n.out_breakpoints[o], t)
+        self.dcc_output_relation = po.Constraint(
+            self.DCC_OUTPUTS, m.TIMESTEPS, rule=_output_rule)
+
+        def _segment_weight_rule(block, n, s, t):
+            return block.segment_weight[n, s, 0, t] + block.segment_weight[n, s, 1, t] == \
+                block.segment[n, s, t]
+        self.dcc_segment_weight = po.Constraint(
+            self.DCC_SEGMENTS, m.TIMESTEPS, rule=_segment_weight_rule)
+
+    def _create_mc(self, nodes):
+        m = self.parent_block()
+        self.MC_SEGMENTS = po.Set(dimen=2, initialize=[
+            (n, s) for n in nodes for s in range(len(n.in_breakpoints) - 1)])
+        self.MC_OUTPUTS = po.Set(dimen=2, initialize=[(n, o) for n in nodes for o in n.outputs])
+        self.segment_input = po.Var(self.MC_SEGMENTS, m.TIMESTEPS, within=po.NonNegativeReals)
+
+        def _segment_input_min_rule(block, n, s, t):
+            return block.segment[n, s, t] * n.in_breakpoints[s] <= block.segment_input[n, s, t]
+        self.mc_segment_input_min = po.Constraint(
+            self.MC_SEGMENTS, m.TIMESTEPS, rule=_segment_input_min_rule)
+
+        def _segment_input_max_rule(block, n, s, t):
+            return block.segment_input[n, s, t] <= block.segment[n, s, t] * n.in_breakpoints[s + 1]
+        self.mc_segment_input_max = po.Constraint(
+            self.MC_SEGMENTS, m.TIMESTEPS, rule=_segment_input_max_rule)
+
+        def _input_rule(block, n, t):
+            return m.flow[n.input_bus, n, t] == sum(
+                block.segment_input[n, s, t] for s in range(len(n.in_breakpoints) - 1))
+        self.mc_input_relation = po.Constraint(nodes, m.TIMESTEPS, rule=_input_rule)
+
+        def _output_rule(block, n, o, t):
+            x = n.in_breakpoints
+            y = n.out_breakpoints[o]
+            expr = 0
+            for s in range(len(x) - 1):
+                slope = (y[s + 1] - y[s]) / (x[s + 1] - x[s])
+                expr += slope * block.segment_input[n, s, t] + \
+                    (y[s] - slope * x[s]) * block.segment[n, s, t]
+            return m.flow[n, o, t] == expr
+        self.mc_output_relation = po.Constraint(self.MC_OUTPUTS, m.TIMESTEPS, rule=_output_rule)
+
+    def _create_lp(self, nodes):
+        m = self.parent_block()
+        self.LP_OUTPUT_SEGMENTS = po.Set(dimen=3, initialize=[
+            (n, o, s) for n in nodes for o in n.outputs
+            for s in range(len(n.in_breakpoints) - 1)])
+
+        def _input_range_rule(block, n, t):
+            return po.inequality(
+                n.in_breakpoints[0], m.flow[n.input_bus, n, t], n.in_breakpoints[-1])
+        self.input_range = po.Constraint(nodes, m.TIMESTEPS, rule=_input_range_rule)
+
+        def _output_limit_rule(block, n, o, s, t):
+            x = n.in_breakpoints
+            y = n.out_breakpoints[o]
+            slope = (y[s + 1] - y[s]) / (x[s + 1] - x[s])
+            return m.flow[n, o, t] <= y[s] + slope * (m.flow[n.input_bus, n, t] - x[s])
+        self.output_limit = po.Constraint(
+            self.LP_OUTPUT_SEGMENTS, m.TIMESTEPS, rule=_output_limit_rule)
+
+
+def get_n_bits(n_segments):
+    # Get the number of bits needed to number the segments (at least one).
+    return max(1, int(np.ceil(np.log2(n_segments))))
+
+
+def get_formulation(in_breakpoints, out_breakpoints, pw_repn='CC'):
+    # Choose the formulation of a piecewise transformer: 'LP' if all outputs are concave
+    # functions of the input (their slopes never increase), otherwise the given representation.
+    # Parameters:
+    #  in_breakpoints: Values of the input flow at the breakpoints (ascending).
+    #  out_breakpoints: Values of each output flow at the breakpoints, by the output bus
+    #  [dict].
+    #  pw_repn: Representation if the curves are not concave, one of PW_REPNS [str].
+    x = np.asarray(in_breakpoints, dtype=float)
+    for values in out_breakpoints.values():
+        slopes = np.diff(np.asarray(values, dtype=float)) / np.diff(x)
+        # Allow for rounding errors of the breakpoints.
+        tolerance = 1e-9 * max(np.max(np.abs(slopes)), 1e-300)
+        if np.any(np.diff(slopes) > tolerance):
+            return pw_repn
+    return 'LP'
+
+
+def get_common_breakpoints(in_breakpoints, out_breakpoints):
+    # Merge piecewise linear curves with different input breakpoints into one set of input
+    # breakpoints (all breakpoints of the curves in the input range they have in common). The
+    # curves stay exactly the same in this range.
+    # Parameters:
+    #  in_breakpoints: Input breakpoints of each curve, by the name of the curve [dict].
+    #  out_breakpoints: Output breakpoints of each curve, by the name of the curve [dict].
+    # Returns the common input breakpoints [list] and the output breakpoints of each curve at
+    # them, by the name of the curve [dict].
+    in_min = max(min(values) for values in in_breakpoints.values())
+    in_max = min(max(values) for values in in_breakpoints.values())
+    if in_min > in_max:
+        raise ValueError('The input ranges of the piecewise linear curves do not overlap')
+    common_in = np.unique(np.concatenate(
+        [np.asarray(values, dtype=float) for values in in_breakpoints.values()]))
+    common_in = common_in[(common_in >= in_min) & (common_in <= in_max)]
+    common_out = {name: np.interp(common_in, in_breakpoints[name], out_breakpoints[name]).tolist()
+                  for name in in_breakpoints}
+    return common_in.tolist(), common_out
+
+
+def get_part_flows(flows, label, part_labels):
+    # Name the flows of a piecewise transformer like the flows of separate oemof components
+    # for each output (e.g. 'fuel_cell_chp_electric' and 'fuel_cell_chp_thermal'), so that
+    # results and dependency flows keep their names. Each part gets the same share of the input.
+    # Parameters:
+    #  flows: Flow values of the transformer by (label_from, label_to) [dict].
+    #  label: Label of the transformer [str].
+    #  part_labels: Label of the part of each output, by the label of the output bus [dict].
+    # Returns the flow values of the parts by (label_from, label_to) [dict].
+    part_flows = {}
+    for (label_from, label_to), value in flows.items():
+        if label_to == label:
+            for part_label in part_labels.values():
+                part_flows[(label_from, part_label)] = value / len(part_labels)
+        else:
+            part_flows[(part_labels[label_to], label_to)] = value
+    return part_flows
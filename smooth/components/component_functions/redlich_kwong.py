@@ -0,0 +1,91 @@
+import numpy as np
+
+# The gas constant [J/(K*mol)].
+GAS_CONSTANT = 8.314
+# Max. pressure [bar] and distance of the pressures [bar] of the tables, higher pressures are
+# solved directly.
+TABLE_PRESSURE_MAX = 1000
+TABLE_PRESSURE_STEP = 1
+# Tables by their parameters, shared by all storages of this process.
+tables = {}
+
+
+def get_pressure_rk(v_spec, temperature, rk_a, rk_b):
+    # Get the pressure of a gas by the Redlich-Kwong equation of state.
+    # Parameters:
+    #  v_spec: Molar volume [m³/mol], a number or an array.
+    #  temperature: Temperature [K].
+    #  rk_a, rk_b: Redlich-Kwong parameters of the gas.
+    # Returns the pressure [Pa].
+    v_spec = np.asarray(v_spec, dtype=float)
+    return GAS_CONSTANT * temperature / (v_spec - rk_b) - \
+        rk_a / (temperature ** 0.5 * v_spec * (v_spec + rk_b))
+
+
+def get_spec_volume_rk(pressure, temperature, rk_a, rk_b, n_iterations=50):
+    # Solve the Redlich-Kwong equation of state for the molar volume of a gas with Newton's
+    # method, starting from the ideal gas. Above its critical temperature, the pressure falls
+    # monotonically with the volume, so there is exactly one solution.
+    # Parameters:
+    #  pressure: Pressure [Pa] (> 0), a number or an array.
+    #  temperature: Temperature [K].
+    #  rk_a, rk_b: Redlich-Kwong parameters of the gas.
+    #  n_iterations: Max. number of iterations of Newton's method [-].
+    # Returns the molar volume at each pressure [m³/mol].
+    pressure = np.asarray(pressure, dtype=float)
+    rt = GAS_CONSTANT * temperature
+    a_t = rk_a / temperature ** 0.5
+    v_spec = rt / pressure + rk_b
+    for _ in range(n_iterations):
+        residual = rt / (v_spec - rk_b) - a_t / (v_spec * (v_spec + rk_b)) - pressure
+        derivative = -rt / (v_spec - rk_b) ** 2 + \
+            a_t * (2 * v_spec + rk_b) / (v_spec * (v_spec + rk_b)) ** 2
+        step = residual / derivative
+        v_spec = v_spec - step
+        if np.all(np.abs(step) <= 1e-13 * v_spec):
+            break
+    return v_spec
+
+
+def get_rk_table(temperature, rk_a, rk_b):
+    # Get the compressibility factor of a gas at the pressures from zero to TABLE_PRESSURE_MAX.
+    # The table is built once per parameter set.
+    # Parameters:
+    #  temperature: Temperature [K].
+    #  rk_a, rk_b: Redlich-Kwong parameters of the gas.
+    # Returns the table with the pressures [bar] and the compressibility factor (p * v / (R * T))
+    # at each pressure [-] [dict].
+    key = (temperature, rk_a, rk_b)
+    table = tables.get(key)
+    if table is None:
+        pressures = np.arange(0, TABLE_PRESSURE_MAX + TABLE_PRESSURE_STEP, TABLE_PRESSURE_STEP,
+                              dtype=float)
+        # An ideal gas at zero pressure.
+        compressibility = np.ones(len(pressures))
+        v_spec = get_spec_volume_rk(pressures[1:] * 1e5, temperature, rk_a, rk_b)
+        compressibility[1:] = pressures[1:] * 1e5 * v_spec / (GAS_CONSTANT * temperature)
+        table = {'pressures': pressures, 'compressibility': compressibility}
+        tables[key] = table
+    return table
+
+
+def get_compressibility_rk(pressure, temperature, rk_a, rk_b):
+    # Get the compressibility factor of a gas by linear interpolation of its table. It is a
+    # smooth function of the pressure, so the interpolation is accurate, while the molar volume
+    # (v = z * R * T / p) tends to infinity at zero pressure.
+    # Parameters:
+    #  pressure: Pressure [bar] (>= 0), a number or an array.
+    #  temperature: Temperature [K].
+    #  rk_a, rk_b: Redlich-Kwong parameters of the gas.
+    # Returns the compressibility factor at each pressure [-] (an array of the shape of the
+    # pressure).
+    shape = np.shape(pressure)
+    pressure = np.atleast_1d(np.asarray(pressure, dtype=float))
+    table = get_rk_table(temperature, rk_a, rk_b)
+    compressibility = np.interp(pressure, table['pressures'], table['compressibility'])
+    is_outside = pressure > TABLE_PRESSURE_MAX
+    if np.any(is_outside):
+        p_outside = pressure[is_outside] * 1e5
+        compressibility[is_outside] = p_outside * get_spec_volume_rk(
+            p_outside, temperature, rk_a, rk_b) / (GAS_CONSTANT * temperature)
+    return compressibility.reshape(shape)
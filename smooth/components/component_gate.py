@@ -23,7 +23,8 @@ class Gate(Component):
     def create_oemof_model(self, busses, _):
         gate = solph.Transformer(
             label=self.name,
-            inputs={busses[self.bus_in]: solph.Flow(nominal_value=self.max_input)},
+            inputs={busses[self.bus_in]: solph.Flow(
+                nominal_value=self.scale_to_step(self.max_input))},
             outputs={busses[self.bus_out]: solph.Flow()}
           )
         return gate
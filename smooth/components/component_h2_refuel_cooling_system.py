@@ -2,6 +2,7 @@ import os
 import oemof.solph as solph
 from smooth.components.component import Component
 import smooth.framework.functions.functions as func
+from smooth.framework.functions.update_oemof_model import set_fixed_flow
 
 
 class H2RefuelCoolingSystem(Component):
@@ -46,12 +47,27 @@ class H2RefuelCoolingSystem(Component):
         self.electrical_energy = \
             (self.data*self.cool_spec_energy + self.standby_energy) / 3.6
 
+    def precompute(self, sim_params):
+        # The electrical energy needed in each interval [Wh].
+        self.add_time_series('electrical_energy', self.electrical_energy)
+
     def create_oemof_model(self, busses, _):
         h2_refuel_cooling_system = solph.Sink(
             label=self.name,
             inputs={busses[self.bus_el]: solph.Flow(
-                    actual_value=self.electrical_energy.iloc[self.sim_params.i_interval],
+                    actual_value=self.get_horizon_values(self.time_series['electrical_energy']),
                     nominal_value=self.nominal_value,
                     fixed=True
                     )})
+        self.model = h2_refuel_cooling_system
         return h2_refuel_cooling_system
+
+    def get_interval_key(self):
+        # The fixed electrical energy demand of the optimized intervals.
+        return self.get_horizon_values(self.time_series['electrical_energy'])
+
+    def update_oemof_model(self, busses, model):
+        # Fix the electricity demand to the values of this solve.
+        set_fixed_flow(model, busses[self.bus_el], self.model,
+                       self.get_horizon_values(self.time_series['electrical_energy']) *
+                       self.nominal_value)
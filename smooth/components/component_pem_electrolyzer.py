@@ -1,6 +1,8 @@
 import oemof.solph as solph
 from .component import Component
-import pyomo.environ as po
+from smooth.components.component_functions.piecewise_transformer import \
+    PiecewiseTransformer, get_common_breakpoints, get_part_flows
+from smooth.components.component_functions.breakpoints import apply_tolerance
 
 
 class PemElectrolyzer(Component):
@@ -85,88 +87,39 @@ class PemElectrolyzer(Component):
                                      * self.bp_eff_waste_heat[i_bp]
             self.bp_waste_heat_energy.append(this_waste_heat_energy)
 
-        # While we will create two oemof components, one for the e
-        # lectrolyzer producing hydrogen and one for the
-        # electrolyzer producing waste heat energy,
-        # and make a constraint that both inflows of electricity have to be
-        # the same, each component will get only half the amount of electricity.
-        # Therefore we need to make a list of
-        # electricity consumed that is halfed [Wh]
-        self.bp_elec_consumed_h2_prod_half = [this_bp / 2
-                                              for this_bp in self.bp_elec_consumed_h2_prod]
-        self.bp_elec_consumed_waste_heat_half = [this_bp / 2
-                                                 for this_bp in self.bp_elec_consumed_waste_heat]
-
-        # Save the two models to set constraints later
-        # (h2 for hydrogen production and th for waste heat energy).
-        self.model_h2 = None
-        self.model_th = None
-
-    def get_h2_production_by_electricity(self, electricity_consumption):
-        # Check the index of this load point.
-        this_index = self.bp_elec_consumed_h2_prod_half.index(electricity_consumption)
-        # Return the according hydrogen production value [kg].
-        return self.bp_h2_production[this_index]
-
-    def get_waste_heat_energy_by_electricity(self, electricity_consumption):
-        # Check the index of this load point.
-        this_index = self.bp_elec_consumed_waste_heat_half.index(electricity_consumption)
-        # Return the according waste heat energy value [Wh]
-        return self.bp_waste_heat_energy[this_index]
+        # Both outputs are modelled by one piecewise transformer, so they need breakpoints at
+        # the same electricity consumptions [Wh] (hydrogen production [kg] and waste heat [Wh]).
+        bp_elec_consumed, bp_production = get_common_breakpoints(
+            {'h2': self.bp_elec_consumed_h2_prod, 'heat': self.bp_elec_consumed_waste_heat},
+            {'h2': self.bp_h2_production, 'heat': self.bp_waste_heat_energy})
+        # With a pwl_tolerance, only the breakpoints needed to stay within it are kept.
+        self.bp_elec_consumed, bp_production, self.pwl_report = apply_tolerance(
+            bp_elec_consumed, bp_production, self.pwl_tolerance)
+        self.bp_h2_production_common = bp_production['h2']
+        self.bp_waste_heat_energy_common = bp_production['heat']
+
+        # Save the oemof model.
+        self.model = None
 
     def create_oemof_model(self, busses, model):
-        # Create the non-linear oemof component.
-        # The PEM electrolyzer has to be modelled as two components, while the
-        # piecewise linear transformer does not accept 2 outputs yet.
-
-        flow_h2 = solph.Flow(
-            nominal_value=self.bp_elec_consumed_h2_prod_half[-1],
-            variable_costs=0)
-        flow_waste_heat = solph.Flow(nominal_value=self.bp_elec_consumed_waste_heat_half[-1])
-
-        # First create the main PEM electrolyzer oemof component.
-        pem_electrolyzer_h2_prod = solph.custom.PiecewiseLinearTransformer(
-            label=self.name + '_h2_prod',
-            inputs={busses[self.bus_el]: flow_h2},
-            outputs={busses[self.bus_h2]: solph.Flow()},
-            in_breakpoints=self.bp_elec_consumed_h2_prod_half,
-            conversion_function=self.get_h2_production_by_electricity,
-            pw_repn='CC')
-
-        # Then create the waste heat PEM electrolyzer oemof component.
-        pem_electrolyzer_waste_heat = solph.custom.PiecewiseLinearTransformer(
-            label=self.name + '_waste_heat',
-            inputs={busses[self.bus_el]: flow_waste_heat},
-            outputs={busses[self.bus_th]: solph.Flow()},
-            in_breakpoints=self.bp_elec_consumed_waste_heat_half,
-            conversion_function=self.get_waste_heat_energy_by_electricity,
-            pw_repn='CC')
-
-        # Add the two components to the model
-        model.add(pem_electrolyzer_h2_prod, pem_electrolyzer_waste_heat)
-
-        self.model_h2 = pem_electrolyzer_h2_prod
-        self.model_th = pem_electrolyzer_waste_heat
-
-        return None
-
-    def update_constraints(self, busses, model_to_solve):
-        # Set a constraint so that the electricity inflow of the
-        # hydrogen production and the waste heat energy part are
-        # always the same (which is necessary while the piecewise
-        # linear transformer cannot have two outputs yet and
-        # therefore the two parts need to be separate components).
-        def electrolyzer_ratio_rule(model, t):
-            # Inverter flow
-            expr = 0
-            expr += model.flow[busses[self.bus_el], self.model_th, t]
-            expr += - model.flow[busses[self.bus_el], self.model_h2, t]
-            return (expr == 0)
-
-        model_to_solve.electrolyzer_flow_ratio_fix = \
-            po.Constraint(model_to_solve.TIMESTEPS, rule=electrolyzer_ratio_rule)
+        # Create the non-linear oemof component with one electricity input and the hydrogen
+        # and waste heat output.
+        pem_electrolyzer = PiecewiseTransformer(
+            label=self.name,
+            inputs={busses[self.bus_el]: solph.Flow(
+                nominal_value=self.scale_to_step(self.bp_elec_consumed[-1]), variable_costs=0)},
+            outputs={busses[self.bus_h2]: solph.Flow(), busses[self.bus_th]: solph.Flow()},
+            in_breakpoints=self.scale_to_step(self.bp_elec_consumed),
+            out_breakpoints={
+                busses[self.bus_h2]: self.scale_to_step(self.bp_h2_production_common),
+                busses[self.bus_th]: self.scale_to_step(self.bp_waste_heat_energy_common)},
+            allow_lp=self.pwl_allow_lp, pw_repn=self.get_pw_repn())
+        self.model = pem_electrolyzer
+        return pem_electrolyzer
 
     def update_flows(self, results, sim_params):
-        # Check if the component has an attribute 'flows', if not, create it as an empty dict.
-        Component.update_flows(self, results, sim_params, self.name + '_h2_prod')
-        Component.update_flows(self, results, sim_params, self.name + '_waste_heat')
+        # The flows are saved under the names of the former separate hydrogen production and
+        # waste heat oemof components.
+        self.save_flows(get_part_flows(results.get_flows(self.name), self.name, {
+            self.bus_h2: self.name + '_h2_prod', self.bus_th: self.name + '_waste_heat'}),
+            sim_params)
@@ -32,6 +32,6 @@ class Sink(Component):
             label=self.name,
             inputs={busses[self.bus_in]: solph.Flow(
                 variable_costs=self.commodity_costs,
-                nominal_value=self.input_max
+                nominal_value=self.scale_to_step(self.input_max)
             )})
         return sink
@@ -1,6 +1,9 @@
+import numpy as np
 import oemof.solph as solph
 from .component import Component
-from oemof.outputlib import views
+from .component_functions.redlich_kwong import get_compressibility_rk, get_pressure_rk
+from smooth.framework.functions.update_oemof_model import \
+    set_variable_costs, set_initial_storage_level
 
 
 class StorageH2 (Component):
@@ -59,6 +62,8 @@ class StorageH2 (Component):
         # Redlich Kwong EoS - Parameters
         self.rk_a = 0.1428
         self.rk_b = 1.8208e-5
+        # Storage temperature [K].
+        self.T_storage = 273.15 + 25
 
         # ----- FURTHER STORAGE VALUES DEPENDANT ON THE PRESSURE/CAPACITY -----
         # Calculate the storage volume [m³].
@@ -74,6 +79,7 @@ class StorageH2 (Component):
         self.storage_level = min(self.storage_level_init, self.storage_capacity)
         # Storage pressure [bar].
         self.pressure = self.get_pressure(self.storage_level)
+        self.carried_states = ['storage_level', 'pressure']
 
         # ------------------- VARIABLE ARTIFICIAL COSTS -------------------
         # Store the current artificial costs for input and output [EUR/kg].
@@ -106,86 +112,76 @@ class StorageH2 (Component):
             nominal_storage_capacity=self.storage_capacity,
             min_storage_level=self.storage_level_min / self.storage_capacity,
             balanced=False)
+        self.model = storage
         return storage
 
+    def get_interval_key(self):
+        # The var. art. costs and the storage level of this time step.
+        return self.current_vac, self.storage_level
+
+    def update_oemof_model(self, busses, model):
+        # Update the var. art. costs and the storage level of this time step.
+        set_variable_costs(model, busses[self.bus_in], self.model, self.current_vac[0])
+        set_variable_costs(model, self.model, busses[self.bus_out], self.current_vac[1])
+        set_initial_storage_level(model, self.model, self.storage_level / self.storage_capacity)
+
     def update_states(self, results, sim_params):
-        data_storage = views.node(results, self.name)
-        df_storage = data_storage['sequences']
-
-        # Loop Through the data frame values and update states accordingly.
-        for i_result in df_storage:
-            if i_result[1] == 'capacity':
-                if 'storage_level' not in self.states:
-                    # Initialize an array that tracks the state stored mass.
-                    self.states['storage_level'] = [None] * sim_params.n_intervals
-                    self.states['pressure'] = [None] * sim_params.n_intervals
-                # Check if this result is the storage capacity.
-                self.storage_level = df_storage[i_result][0]
-                self.states['storage_level'][sim_params.i_interval] = self.storage_level
-                # Get the storage pressure [bar].
-                self.pressure = self.get_pressure(self.storage_level)
-                self.states['pressure'][sim_params.i_interval] = self.pressure
+        if 'storage_level' not in self.states:
+            # Initialize an array that tracks the state stored mass.
+            self.states['storage_level'] = [None] * sim_params.n_intervals
+            self.states['pressure'] = [None] * sim_params.n_intervals
+        # Update the storage level [kg].
+        self.storage_level = results.get_storage_level(self.name)
+        self.states['storage_level'][sim_params.i_interval] = self.storage_level
+        # Get the storage pressure [bar].
+        self.pressure = self.get_pressure(self.storage_level)
+        self.states['pressure'][sim_params.i_interval] = self.pressure
 
     def get_mass(self, p, V=None):
         # Calculate the mass of the storage at a certain pressure.
         # Parameters:
-        #  p: pressure [bar].
+        #  p: pressure [bar], a number or an array.
         #  V: storage volume [m³].
 
         if V is None:
             V = self.V
 
-        # If p_min is set to 0, the whole capacity should be usable, thus m will be zero as well.
-        if V > 0 and p == 0:
-            return 0
-
-        # Storage temperature [K].
-        T = 273.15 + 25
-        # Convert pressure form bar to Pa [Pa].
-        p = p * 1e5
-        # The mass has to be defined in an iterative process by changing the spec. volume [m³/mol].
-        v_spec = 10
-        for i in range(10):
-            v_spec = (
-                self.R * T / (p + (self.rk_a / (T**0.5 * v_spec * (v_spec + self.rk_b))))
-            ) + self.rk_b
-
-        # Calculate the mass [kg].
-        m = V * self.Mr / v_spec
-        return m
+        # Calculate the mass [kg] with the compressibility factor of the Redlich Kwong EoS
+        # (m = p * V * Mr / (z * R * T)). At p = 0 the mass is zero as well, so if p_min is set
+        # to 0, the whole capacity is usable.
+        p = np.asarray(p, dtype=float)
+        m = p * 1e5 * V * self.Mr / (self.get_compressibility(p) * self.R * self.T_storage)
+        return float(m) if m.ndim == 0 else m
 
     def get_volume(self, p, m):
         # Calculate the volume needed to fit a certain mass at given pressure.
         # Parameters:
-        #  p: pressure [bar].
+        #  p: pressure [bar], a number or an array.
         #  m: mass [kg].
 
-        # Storage temperature [K].
-        T = 273.15 + 25
-        # Convert pressure form bar to Pa [Pa].
-        p = p * 1e5
-        # The mass has to be defined in an iterative process by changing the spec. volume [m³/mol].
-        v_spec = 10
-        for i in range(10):
-            v_spec = (
-                self.R * T / (p + (self.rk_a / (T**0.5 * v_spec * (v_spec + self.rk_b))))
-            ) + self.rk_b
-
-        # Calculate the volume [m3]
-        V = m * v_spec / self.Mr
-        return V
+        # Calculate the volume [m3] (V = m * z * R * T / (p * Mr)).
+        p = np.asarray(p, dtype=float)
+        V = m * self.get_compressibility(p) * self.R * self.T_storage / (p * 1e5 * self.Mr)
+        return float(V) if V.ndim == 0 else V
 
     def get_pressure(self, m):
         # Calculate the storage pressure for a given mass.
         # Parameters:
-        #  m: mass [kg].
-
-        # Storage volume [m³].
-        V = self.V
-        # Storage temperature [K].
-        T = 273.15 + 25
-        # Calculate the storage pressure [Pa].
-        p = self.R * T / (V * self.Mr / m - self.rk_b) - \
-            self.rk_a / (T**0.5 * V * self.Mr / m * (V * self.Mr / m + self.rk_b))
+        #  m: mass [kg], a number or an array (e.g. all storage levels of a simulation).
+
+        m = np.asarray(m, dtype=float)
+        # Molar volume of the hydrogen [m³/mol], infinite if the storage is empty.
+        with np.errstate(divide='ignore'):
+            v_spec = self.V * self.Mr / m
+        # Calculate the storage pressure [Pa] with the Redlich Kwong EoS.
+        p = np.where(m > 0, get_pressure_rk(v_spec, self.T_storage, self.rk_a, self.rk_b), 0)
         # Return pressure in bar [bar].
-        return p / 1e5
+        p = p / 1e5
+        return float(p) if p.ndim == 0 else p
+
+    def get_compressibility(self, p):
+        # Get the compressibility factor of the hydrogen in the storage, interpolated from a
+        # table that is built once for all storages (see component_functions/redlich_kwong.py).
+        # Parameters:
+        #  p: pressure [bar], a number or an array.
+        return get_compressibility_rk(p, self.T_storage, self.rk_a, self.rk_b)
@@ -1,7 +1,9 @@
 import oemof.solph as solph
 from smooth.components.component import Component
 from numpy import pi
-from oemof.outputlib import views
+from oemof.solph.plumbing import sequence
+from smooth.framework.functions.update_oemof_model import \
+    set_variable_costs, set_initial_storage_level, is_sequence_changed, mark_block_outdated
 import smooth.framework.functions.functions as func
 import os
 
@@ -92,6 +94,7 @@ class StratifiedThermalStorage (Component):
         # Storage level [kg of h2]
         self.storage_level = min(self.storage_level_init +
                                  self.storage_level_min, self.storage_capacity)
+        self.carried_states = ['storage_level']
 
         # ------------------- VARIABLE ARTIFICIAL COSTS -------------------
         # Store the current artificial costs for input and output [EUR/kg].
@@ -120,6 +123,11 @@ class StratifiedThermalStorage (Component):
             self.temp_h,
             self.temp_env)
 
+    def precompute(self, sim_params):
+        # The fixed losses of each interval depend on the environmental temperature.
+        self.add_time_series('fixed_losses_relative', self.fixed_losses_relative)
+        self.add_time_series('fixed_losses_absolute', self.fixed_losses_absolute)
+
     def prepare_simulation(self, components):
         # Set the var. art. costs.
         vac_in = self.vac_in
@@ -143,27 +151,49 @@ class StratifiedThermalStorage (Component):
             initial_storage_level=self.storage_level / self.storage_capacity,
             nominal_storage_capacity=self.storage_capacity,
             min_storage_level=self.storage_level_min / self.storage_capacity,
-            loss_rate=self.loss_rate,
-            fixed_losses_relative=self.fixed_losses_relative[self.sim_params.i_interval],
-            fixed_losses_absolute=self.fixed_losses_absolute[self.sim_params.i_interval],
+            # The relative losses per interval compound over merged intervals.
+            loss_rate=1 - (1 - self.loss_rate) ** self.sim_params.step_length,
+            fixed_losses_relative=self.get_horizon_values(
+                self.time_series['fixed_losses_relative']),
+            fixed_losses_absolute=self.get_horizon_values(
+                self.time_series['fixed_losses_absolute']),
             inflow_conversion_factor=1,
             outflow_conversion_factor=1,
             balanced=False)
+        self.model = thermal_storage
         return thermal_storage
 
+    def get_interval_key(self):
+        # The var. art. costs, the storage level and the fixed losses of the optimized intervals.
+        return (self.current_vac, self.storage_level,
+                self.get_horizon_values(self.time_series['fixed_losses_relative']),
+                self.get_horizon_values(self.time_series['fixed_losses_absolute']))
+
+    def update_oemof_model(self, busses, model):
+        # Update the var. art. costs and the storage level of this time step.
+        set_variable_costs(model, busses[self.bus_in], self.model, self.current_vac[0])
+        set_variable_costs(model, self.model, busses[self.bus_out], self.current_vac[1])
+        set_initial_storage_level(model, self.model, self.storage_level / self.storage_capacity)
+        # The fixed losses depend on the environmental temperature of this solve and are part
+        # of the storage balance, so the storage block has to be rebuilt if they changed.
+        fixed_losses_relative = self.get_horizon_values(
+            self.time_series['fixed_losses_relative'])
+        fixed_losses_absolute = self.get_horizon_values(
+            self.time_series['fixed_losses_absolute'])
+        if is_sequence_changed(model, self.model.fixed_losses_relative, fixed_losses_relative) \
+                or is_sequence_changed(
+                    model, self.model.fixed_losses_absolute, fixed_losses_absolute):
+            self.model.fixed_losses_relative = sequence(fixed_losses_relative)
+            self.model.fixed_losses_absolute = sequence(fixed_losses_absolute)
+            mark_block_outdated(model, self.model)
+
     def update_states(self, results, sim_params):
-        data_storage = views.node(results, self.name)
-        df_storage = data_storage['sequences']
-
-        # Loop Through the data frame values and update states accordingly.
-        for i_result in df_storage:
-            if i_result[1] == 'capacity':
-                if 'storage_level' not in self.states:
-                    # Initialize an array that tracks the state stored mass.
-                    self.states['storage_level'] = [None] * sim_params.n_intervals
-                # Check if this result is the storage capacity.
-                self.storage_level = df_storage[i_result][0]
-                self.states['storage_level'][sim_params.i_interval] = self.storage_level
+        if 'storage_level' not in self.states:
+            # Initialize an array that tracks the state stored heat.
+            self.states['storage_level'] = [None] * sim_params.n_intervals
+        # Update the storage level [Wh].
+        self.storage_level = results.get_storage_level(self.name)
+        self.states['storage_level'][sim_params.i_interval] = self.storage_level
 
     def get_volume(self, s_c, h_c, de, t_h, t_c):
         volume = s_c * 3600 / (h_c * de * (t_h - t_c))
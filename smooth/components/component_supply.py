@@ -1,5 +1,6 @@
 import oemof.solph as solph
 from .component import Component
+from smooth.framework.functions.update_oemof_model import set_variable_costs
 
 
 class Supply (Component):
@@ -57,7 +58,16 @@ class Supply (Component):
         from_grid = solph.Source(
             label=self.name,
             outputs={busses[self.bus_out]: solph.Flow(
-                nominal_value=self.output_max,
+                nominal_value=self.scale_to_step(self.output_max),
                 variable_costs=self.current_ac
             )})
+        self.model = from_grid
         return from_grid
+
+    def get_interval_key(self):
+        # The total costs for the commodity this time step.
+        return self.current_ac
+
+    def update_oemof_model(self, busses, model):
+        # Update the total costs for the commodity this time step.
+        set_variable_costs(model, self.model, busses[self.bus_out], self.current_ac)
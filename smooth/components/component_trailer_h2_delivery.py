@@ -1,6 +1,7 @@
 import oemof.solph as solph
 from .component import Component
-from oemof.outputlib import views
+from smooth.framework.functions.update_oemof_model import \
+    set_variable_costs, set_nominal_value
 
 
 class TrailerH2Delivery(Component):
@@ -168,27 +169,32 @@ class TrailerH2Delivery(Component):
             outputs={busses[self.bus_out]: solph.Flow(variable_costs=self.current_ac)},
             inputs={busses[self.bus_in]: solph.Flow(nominal_value=self.hydrogen_transported
                                                     )})
+        self.model = trailer
         return trailer
 
-    def update_states(self, results, sim_params):
-        data_trailer = views.node(results, self.name)
-        df_trailer = data_trailer['sequences']
-
-        for i_result in df_trailer:
-            if 'is_delivery_possible' not in self.states:
-                self.states['is_delivery_possible'] = [None] * sim_params.n_intervals
-
-            if i_result[0][1] == self.name and i_result[1] == 'flow':
-                # The amount of hydrogen entering the trailer is recorded
-                this_h2_delivered = df_trailer[i_result][0]
-                # If the trailer is used (this_h2_delivered > 0) and under the assumption that:
-                # - it takes 15 minutes for the trailer to refuel
-                # - the trailer can travel at 100 km/h so 75 km in 45 minutes
-                if this_h2_delivered > 0 and self.round_trip_distance > 75:
-                    # if the trailer is located too far away, delivery is not possible
-                    # for the next timestep
-                    self.delivery_possible = 0
-                else:
-                    self.delivery_possible = 1
+    def get_interval_key(self):
+        # The costs and the amount of hydrogen that can be transported this time step.
+        return self.current_ac, self.hydrogen_transported
 
-                self.states['is_delivery_possible'][sim_params.i_interval] = self.delivery_possible
+    def update_oemof_model(self, busses, model):
+        # Update the costs and the amount of hydrogen that can be transported this time step.
+        set_variable_costs(model, self.model, busses[self.bus_out], self.current_ac)
+        set_nominal_value(model, busses[self.bus_in], self.model, self.hydrogen_transported)
+
+    def update_states(self, results, sim_params):
+        if 'is_delivery_possible' not in self.states:
+            self.states['is_delivery_possible'] = [None] * sim_params.n_intervals
+
+        # The amount of hydrogen entering the trailer is recorded
+        this_h2_delivered = results.get_flow(self.bus_in, self.name)
+        # If the trailer is used (this_h2_delivered > 0) and under the assumption that:
+        # - it takes 15 minutes for the trailer to refuel
+        # - the trailer can travel at 100 km/h so 75 km in 45 minutes
+        if this_h2_delivered > 0 and self.round_trip_distance > 75:
+            # if the trailer is located too far away, delivery is not possible
+            # for the next timestep
+            self.delivery_possible = 0
+        else:
+            self.delivery_possible = 1
+
+        self.states['is_delivery_possible'][sim_params.i_interval] = self.delivery_possible
@@ -0,0 +1,29 @@
+import copy
+from smooth.examples.example_model import mymodel
+from smooth import run_smooth
+from smooth.framework.functions.typical_periods import get_aggregation_error
+
+if __name__ == '__main__':
+    # Simulate four weeks of the example model, once interval by interval and once with six
+    # typical days, and compare the annual results.
+    model = copy.deepcopy(mymodel)
+    model['sim_params']['n_intervals'] = 24 * 28
+    model['sim_params']['show_debug_flag'] = False
+    # The electrolyzer of the example model only covers the hydrogen demand for a few hours.
+    # The grid electricity causes emissions as in example_model_emissions.
+    for this_comp in model['components']:
+        if this_comp['name'] == 'this_ely':
+            this_comp['power_max'] = 3e6
+        elif this_comp['name'] == 'from_grid':
+            this_comp['variable_emissions'] = 0.341
+            this_comp['dependency_flow_emissions'] = ('from_grid', 'bel')
+    reference, _ = run_smooth(copy.deepcopy(model))
+
+    model['sim_params']['typical_periods'] = 6
+    model['sim_params']['period_length'] = 24
+    components, _ = run_smooth(model)
+
+    print('Simulated intervals: {} instead of {}'.format(
+        components[0].sim_params.n_intervals, 24 * 28))
+    for key, error in get_aggregation_error(reference, components).items():
+        print('Relative error of {}: {:.2%}'.format(key, error))
@@ -0,0 +1,63 @@
+import gzip
+import os
+import pickle
+
+# Version of the checkpoint format, checkpoints of other versions can't be loaded.
+CHECKPOINT_VERSION = 1
+
+
+def write_checkpoint(file_path, components, sim_params, i_interval):
+    # Write the state of a running simulation to a compressed checkpoint file. The file is
+    # written to a temporary file first, so an existing checkpoint is not lost if the
+    # simulation dies while writing.
+    # Parameters:
+    #  file_path: Path of the checkpoint file [str].
+    #  components: List containing each component object.
+    #  sim_params: Simulation parameters defined by the user [object].
+    #  i_interval: Index of the next interval that has to be simulated [-].
+    checkpoint = {
+        'version': CHECKPOINT_VERSION,
+        'i_interval': i_interval,
+        'n_intervals': sim_params.n_intervals,
+        'solver_iterations': sim_params.solver_iterations,
+        'components': {this_comp.name: this_comp.get_checkpoint_state()
+                       for this_comp in components},
+    }
+    tmp_file_path = file_path + '.tmp'
+    with gzip.open(tmp_file_path, 'wb', compresslevel=5) as checkpoint_file:
+        pickle.dump(checkpoint, checkpoint_file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file_path, file_path)
+
+
+def load_checkpoint(file_path):
+    # Load a checkpoint written by write_checkpoint.
+    # Parameters:
+    #  file_path: Path of the checkpoint file [str].
+    with gzip.open(file_path, 'rb') as checkpoint_file:
+        checkpoint = pickle.load(checkpoint_file)
+    if checkpoint.get('version') != CHECKPOINT_VERSION:
+        raise ValueError('The checkpoint "{}" has the version {}, but version {} is needed'
+                         .format(file_path, checkpoint.get('version'), CHECKPOINT_VERSION))
+    return checkpoint
+
+
+def restore_checkpoint(checkpoint, components, sim_params):
+    # Restore the states of the components and the simulation parameters from a checkpoint.
+    # The components have to be created from the same model the checkpoint was written for.
+    # Parameters:
+    #  checkpoint: Loaded checkpoint (see load_checkpoint) [dict].
+    #  components: List containing each component object.
+    #  sim_params: Simulation parameters defined by the user [object].
+    # Returns the index of the next interval that has to be simulated [-].
+    if checkpoint['n_intervals'] != sim_params.n_intervals:
+        raise ValueError('The checkpoint was written for {} intervals, but {} intervals are '
+                         'simulated'.format(checkpoint['n_intervals'], sim_params.n_intervals))
+    component_names = set(this_comp.name for this_comp in components)
+    if component_names != set(checkpoint['components']):
+        raise ValueError('The components of the checkpoint do not match the components of '
+                         'the model')
+    for this_comp in components:
+        this_comp.set_checkpoint_state(checkpoint['components'][this_comp.name])
+    sim_params.solver_iterations = list(checkpoint['solver_iterations'])
+    sim_params.i_interval = checkpoint['i_interval']
+    return checkpoint['i_interval']
@@ -0,0 +1,34 @@
+import numpy as np
+
+
+def get_step_lengths(components, sim_params):
+    # Get the number of intervals that can be merged into one step, starting at each interval.
+    # Intervals are merged as long as every time series of every component stays within
+    # sim_params.merge_tolerance (relative to the range of that time series) of its value in the
+    # first interval of the step, and the step is at most sim_params.max_step_length intervals
+    # long. If typical periods are simulated, steps don't reach into the next period.
+    # Parameters:
+    #  components: List containing each component object (after precompute).
+    #  sim_params: Simulation parameters defined by the user [object].
+    # Returns the max. step length for each start interval [int array].
+    n_intervals = sim_params.n_intervals
+    max_step_length = max(1, sim_params.max_step_length)
+    # Intervals that can be merged with the interval k intervals earlier.
+    is_mergeable = np.ones((max_step_length, n_intervals), dtype=bool)
+    for this_comp in components:
+        for values in this_comp.time_series.values():
+            values = values[:n_intervals]
+            tolerance = sim_params.merge_tolerance * (values.max() - values.min())
+            for k in range(1, max_step_length):
+                is_mergeable[k, :n_intervals - k] &= \
+                    np.abs(values[k:] - values[:n_intervals - k]) <= tolerance
+    # Intervals after the end of the simulation can't be merged.
+    for k in range(1, max_step_length):
+        is_mergeable[k, n_intervals - k:] = False
+    if sim_params.interval_weights is not None:
+        # Intervals of different typical periods have different weights.
+        i_in_period = np.arange(n_intervals) % sim_params.period_length
+        for k in range(1, max_step_length):
+            is_mergeable[k] &= i_in_period + k < sim_params.period_length
+    # A step ends before the first interval that can't be merged.
+    return np.cumprod(is_mergeable, axis=0).sum(axis=0)
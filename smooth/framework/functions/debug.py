@@ -2,47 +2,23 @@ import pandas as pd
 from smooth.framework.functions.plot_results import plot_smooth_results
 
 
-def get_df_debug(df_results, results_dict, new_df_results):
+def get_df_debug(snapshot, new_snapshot):
+    # Build the debug data frame out of the snapshot of the last successful interval and the
+    # values of the failed one (see ResultExtractor.get_debug_snapshot).
+    # Parameters:
+    #  snapshot: Snapshot of the last successful interval [dict].
+    #  new_snapshot: Snapshot of the interval the solver failed in [dict].
+
     # If no results were calculated yet, raise an exception
-    if df_results is None or results_dict is None:
+    if snapshot is None:
         raise TypeError
 
-    # Extract oemof tuple, fixed (bool), min/max flow or storage-level values
-    # scaled with the nominal value in case it is present
-    operation_vals = [
-        [
-            k,
-            x['scalars']['fixed'],
-            x['scalars']['min'] * x['scalars']['nominal_value'],
-            x['scalars']['max'] * x['scalars']['nominal_value'],
-        ] if 'nominal_value' in x['scalars'] else
-        [
-            k,
-            None,
-            x['scalars']['min_storage_level'] * x['scalars']['nominal_storage_capacity'],
-            x['scalars']['max_storage_level'] * x['scalars']['nominal_storage_capacity'],
-        ]
-        for k, x in results_dict.items() if 'nominal_value' in x['scalars'] or
-                                            'nominal_storage_capacity' in x['scalars']
-    ]
-
-    operation_vals = pd.DataFrame(operation_vals, columns=['oemof_tuple', 'fixed', 'min', 'max'])
-    operation_vals['oemof_tuple'] = [ot if ot[1] is not None else (ot[0],) for ot in
-                                     operation_vals['oemof_tuple']]
-    # Merge results DataFrame from last iteration with scalar values from results dictionary
-    df_debug = df_results[:][['value', 'variable_name', 'oemof_tuple']]
-    df_debug[['from', 'to']] = pd.DataFrame(df_debug['oemof_tuple'].tolist(), index=df_debug.index)
-    df_debug = pd.merge(left=df_debug, right=operation_vals, how='left', left_on='oemof_tuple',
-                        right_on='oemof_tuple')
-
-    # Concatenate debug Dataframe with results of unfinished oemof iteration
-    # (merging of different instances of oemof objects not working)
-    new_df_results[['from', 'to']] = pd.DataFrame(
-        new_df_results['oemof_tuple'].tolist(), index=new_df_results.index)
-    new_df_debug = pd.DataFrame(new_df_results[:][['value', 'from', 'to']], columns=[
-                                'value', 'from', 'to'])
+    # Values, min/max bounds and fixed flags of the flows and storage levels of the last interval
+    df_debug = get_df_snapshot(snapshot)
+    # Append the values of the unfinished oemof iteration
+    new_df_debug = get_df_snapshot(new_snapshot)[['from', 'to', 'value']]
     new_df_debug['variable_name'] = 'next'
-    df_debug = pd.concat([df_debug, new_df_debug], axis=0)
+    df_debug = pd.concat([df_debug, new_df_debug], axis=0, ignore_index=True)
 
     # Move columns for better readability
     sel_cols = ['from', 'to', 'variable_name', 'fixed', 'min', 'value', 'max']
@@ -51,6 +27,29 @@ def get_df_debug(df_results, results_dict, new_df_results):
     return df_debug
 
 
+def get_df_snapshot(snapshot):
+    # Convert a snapshot into a data frame with one row per variable and time step.
+    # Parameters:
+    #  snapshot: Snapshot of the flows and storage levels of an interval [dict].
+    dfs = []
+    # Flows are named by (from, to), storage levels only by the storage.
+    storage_keys = [(key, None) for key in snapshot['storage_keys']]
+    for variable_name, keys, values, bounds in [
+            ('flow', snapshot['flow_keys'], snapshot['flow_values'], snapshot['flow_bounds']),
+            ('capacity', storage_keys, snapshot['storage_values'], snapshot['storage_bounds'])]:
+        n_timesteps = values.shape[1]
+        dfs.append(pd.DataFrame({
+            'from': [key[0] for key in keys for _ in range(n_timesteps)],
+            'to': [key[1] for key in keys for _ in range(n_timesteps)],
+            'variable_name': variable_name,
+            'fixed': bounds['fixed'].ravel(),
+            'min': bounds['min'].ravel(),
+            'value': values.ravel(),
+            'max': bounds['max'].ravel(),
+        }))
+    return pd.concat(dfs, axis=0, ignore_index=True)
+
+
 def show_debug(df_debug, components):
     print("------------------------------------------------------------------------------")
     with pd.option_context(
@@ -60,7 +59,7 @@ def show_debug(df_debug, components):
         print(df_debug)
     print("------------------------------------------------------------------------------")
     # Save to csv file
-    df_debug.loc[:, df_debug.columns != 'oemof_tuple'].to_csv("debugDataframe.csv")
+    df_debug.to_csv("debugDataframe.csv")
     print("Saved to debugDataframe.csv")
 
     plot_smooth_results(components)
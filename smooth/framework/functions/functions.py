@@ -1,8 +1,13 @@
+import heapq
 import os
 import importlib
 import pandas as pd
 import re
 
+# Input data files that were parsed once and shared with this process (e.g. by
+# run_smooth_batch), by absolute file path and csv separator.
+shared_data_files = {}
+
 
 def read_data_file(path, filename, csv_separator, column_title):
     # Function to read the input data files.
@@ -10,11 +15,27 @@ def read_data_file(path, filename, csv_separator, column_title):
     #  path = path where the csv file is located [string].
     #  filename = name of csv file [string].
     file_path = os.path.join(path, filename)
+    shared_table = shared_data_files.get((os.path.abspath(file_path), csv_separator))
+    if shared_table is not None:
+        # The file was already parsed, so only the column is copied. Column titles given as
+        # numbers are column positions, as with read_csv.
+        if isinstance(column_title, int):
+            return shared_table.iloc[:, [column_title]].copy()
+        return shared_table[[column_title]].copy()
     # create specific string for chosen data type
     data = pd.read_csv(file_path, sep=csv_separator, usecols=[column_title])
     return data
 
 
+def set_shared_data_files(data_files):
+    # Share already parsed input data files with this process.
+    # Parameters:
+    #  data_files: Tables with all columns of each file by absolute file path and csv
+    #   separator [dict of pandas DataFrames].
+    shared_data_files.clear()
+    shared_data_files.update(data_files)
+
+
 def get_date_time_index(start_date, n_intervals, step_size):
     # Function defining the parameters for perfect/myopic foresight:
     # Parameters:
@@ -73,9 +94,80 @@ def create_component_obj(model, sim_params):
         # Add this component to the list containing all components.
         components.append(this_comp_obj)
 
+    # Resolve the foreign states of all components (fails if one of them is missing).
+    components_by_name = {this_comp.name: this_comp for this_comp in components}
+    for this_comp in components:
+        this_comp.bind_foreign_states(components_by_name)
+
     return components
 
 
+def get_prepare_order(components):
+    # Get the order in which the prepare simulation step of the components is done: each
+    # component comes after the components whose foreign states it reads. Otherwise (and for
+    # components that read each other's states) the order of the model is kept.
+    # Parameters:
+    #  components: List containing each component object (with bound foreign states).
+    # Returns the list of the component objects in this order.
+    index_by_name = {this_comp.name: i_comp for i_comp, this_comp in enumerate(components)}
+    # Indices of the components each component depends on and of those depending on it.
+    dependencies = [set(index_by_name[name] for name in this_comp.get_foreign_state_components())
+                    for this_comp in components]
+    dependents = [[] for _ in components]
+    for i_comp, this_dependencies in enumerate(dependencies):
+        for i_dependency in this_dependencies:
+            dependents[i_dependency].append(i_comp)
+
+    # Topological sort, of all ready components the first one in the model comes first.
+    n_open_dependencies = [len(this_dependencies) for this_dependencies in dependencies]
+    ready = [i_comp for i_comp, n_open in enumerate(n_open_dependencies) if n_open == 0]
+    heapq.heapify(ready)
+    order = []
+    while len(order) < len(components):
+        if not ready:
+            # The remaining components read each other's states (a cycle). The first component
+            # of a cycle goes first and reads the states of the last interval.
+            i_comp = get_cycle_start(dependencies, set(range(len(components))).difference(order))
+            n_open_dependencies[i_comp] = 0
+            ready.append(i_comp)
+        i_comp = heapq.heappop(ready)
+        order.append(i_comp)
+        for i_dependent in dependents[i_comp]:
+            n_open_dependencies[i_dependent] -= 1
+            if n_open_dependencies[i_dependent] == 0:
+                heapq.heappush(ready, i_dependent)
+    return [components[i_comp] for i_comp in order]
+
+
+def get_cycle_start(dependencies, remaining):
+    # Get the component that starts a cycle of foreign states. Of the cycles (strongly
+    # connected components of the dependency graph) that only wait for their own members, the
+    # one with the first component in the model is chosen. Components that read the states of
+    # a cycle without being part of it come after it.
+    # Parameters:
+    #  dependencies: Indices of the components each component depends on [list of sets].
+    #  remaining: Indices of the components that are not ordered yet, each of them waits for
+    #   at least one other remaining component [set].
+    # Returns the index of the first component of that cycle in the model.
+    def get_reachable(i_comp):
+        # Remaining components whose states this component reads, directly or indirectly.
+        reachable = set()
+        stack = [i_comp]
+        while stack:
+            for i_dependency in dependencies[stack.pop()] & remaining:
+                if i_dependency not in reachable:
+                    reachable.add(i_dependency)
+                    stack.append(i_dependency)
+        return reachable
+
+    reachable = {i_comp: get_reachable(i_comp) for i_comp in remaining}
+    for i_comp in sorted(remaining):
+        # The cycle of this component: the components it reads from that read from it.
+        cycle = set(i_other for i_other in reachable[i_comp] if i_comp in reachable[i_other])
+        if cycle and reachable[i_comp] <= cycle:
+            return i_comp
+
+
 def replace_at_idx(tup, i, val):
     # Replaces a value at index 'i' of a tuple 'tup' with value 'val'
     #  tup: Tuple to be updated
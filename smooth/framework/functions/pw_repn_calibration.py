@@ -0,0 +1,72 @@
+import time
+from smooth.components.component_functions.piecewise_transformer import PW_REPNS
+from smooth.framework.functions.update_oemof_model import rebuild_block
+
+
+def is_calibrating(sim_params):
+    # Check if the piecewise representations still have to be tried in this interval.
+    # Parameters:
+    #  sim_params: Simulation parameters defined by the user [object].
+    n_calibrated = len(sim_params.pw_repn_solve_times.get(PW_REPNS[0], []))
+    return n_calibrated < sim_params.pw_repn_calibration_intervals
+
+
+def get_calibration_nodes(components):
+    # Get the oemof nodes of the components with pw_repn 'auto' whose representation matters in
+    # this interval (their constraints are not an LP).
+    # Parameters:
+    #  components: List containing each component object.
+    return [this_comp.model for this_comp in components if this_comp.pw_repn == 'auto'
+            and getattr(this_comp.model, 'formulation', 'LP') != 'LP']
+
+
+def calibrate_pw_repn(model, components, solver, sim_params):
+    # Solve the model of this interval once with each piecewise representation for all
+    # components with pw_repn 'auto' and save the solve times in sim_params.pw_repn_solve_times.
+    # The representation with the shortest total solve time so far is set in the components and
+    # the model afterwards. A representation the solver does not support (e.g. SOS2) gets an
+    # infinite solve time.
+    # Parameters:
+    #  model: oemof model (solph.Model) of this interval [object].
+    #  components: List containing each component object.
+    #  solver: Solver backend of the simulation (see smooth/framework/solver.py) [object].
+    #  sim_params: Simulation parameters defined by the user [object].
+    nodes = get_calibration_nodes(components)
+    if not nodes or not is_calibrating(sim_params):
+        return
+
+    for pw_repn in PW_REPNS:
+        set_pw_repn(model, nodes, pw_repn)
+        time_start = time.perf_counter()
+        try:
+            _, termination_condition = solver.solve(model)
+            is_solved = termination_condition == 'optimal'
+        except Exception:
+            # The solver backends raise different errors for unsupported constraints.
+            is_solved = False
+        solve_time = time.perf_counter() - time_start if is_solved else float('inf')
+        sim_params.pw_repn_solve_times.setdefault(pw_repn, []).append(solve_time)
+
+    total_times = {pw_repn: sum(sim_params.pw_repn_solve_times[pw_repn])
+                   for pw_repn in PW_REPNS}
+    best_pw_repn = min(PW_REPNS, key=total_times.get)
+    for this_comp in components:
+        if this_comp.pw_repn == 'auto':
+            this_comp.pw_repn_auto = best_pw_repn
+    set_pw_repn(model, nodes, best_pw_repn)
+
+    if sim_params.print_progress and not is_calibrating(sim_params):
+        print('Piecewise representation solve times: {} -> {}'.format(', '.join(
+            '{} {:.3f} s'.format(pw_repn, total_times[pw_repn]) for pw_repn in PW_REPNS),
+            best_pw_repn))
+
+
+def set_pw_repn(model, nodes, pw_repn):
+    # Set the piecewise representation of nodes in a built model.
+    # Parameters:
+    #  model: oemof model (solph.Model) [object].
+    #  nodes: PiecewiseTransformer nodes of the model [list].
+    #  pw_repn: Piecewise representation, one of PW_REPNS [str].
+    for node in nodes:
+        node.set_pw_repn(pw_repn)
+    rebuild_block(model, nodes[0].constraint_group())
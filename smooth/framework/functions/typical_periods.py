@@ -0,0 +1,150 @@
+import numpy as np
+from smooth.framework.functions.functions import get_date_time_index
+
+
+def aggregate_typical_periods(components, sim_params):
+    # Replace the simulated time span by sim_params.typical_periods representative periods of
+    # sim_params.period_length intervals each. The periods are found by clustering the
+    # precomputed time series of all components (k-medoids), the medoid of each cluster is
+    # simulated and weighted with the number of periods it represents (see update_annuities).
+    # The typical periods are simulated one after the other, but they don't follow each other
+    # in the original time span, so each one starts from the initial states of the components
+    # (see reset_carried_states). The storage levels are therefore only meaningful within a
+    # period, the storage can't shift energy from one period to another.
+    # Parameters:
+    #  components: List containing each component object (after precompute).
+    #  sim_params: Simulation parameters defined by the user [object].
+    period_length = sim_params.period_length
+    n_periods = sim_params.n_intervals // period_length
+    if not 1 <= sim_params.typical_periods <= n_periods:
+        raise ValueError('The simulation of {} intervals has {} periods of {} intervals, so it '
+                         'can not be represented by {} typical periods'.format(
+                             sim_params.n_intervals, n_periods, period_length,
+                             sim_params.typical_periods))
+
+    # ------------------- CLUSTER THE PERIODS -------------------
+    features = get_period_features(components, n_periods, period_length)
+    medoids, labels = k_medoids(features, sim_params.typical_periods)
+    # Number of periods represented by each typical period.
+    period_weights = np.bincount(labels, minlength=len(medoids))
+    # Keep the typical periods in chronological order.
+    order = np.argsort(medoids)
+    medoids = medoids[order]
+    period_weights = period_weights[order]
+
+    # ------------------- REDUCE THE TIME SERIES -------------------
+    interval_indices = (medoids[:, np.newaxis] * period_length +
+                        np.arange(period_length)).ravel()
+    for this_comp in components:
+        for name, values in this_comp.time_series.items():
+            this_comp.time_series[name] = np.ascontiguousarray(values[interval_indices])
+
+    # ------------------- UPDATE THE SIMULATION PARAMETERS -------------------
+    sim_params.typical_period_indices = medoids
+    sim_params.typical_period_weights = period_weights
+    sim_params.interval_weights = np.repeat(period_weights, period_length).astype(float)
+    # The simulation still represents all full periods of the original time span.
+    sim_params.sim_time_span = n_periods * period_length * sim_params.interval_time
+    sim_params.n_intervals = len(interval_indices)
+    sim_params.n_solve_intervals = min(sim_params.horizon, sim_params.n_intervals)
+    sim_params.date_time_index = get_date_time_index(
+        sim_params.start_date, sim_params.n_intervals, sim_params.interval_time)
+    sim_params.solver_iterations = [None] * sim_params.n_intervals
+
+
+def get_carried_states(components):
+    # Get the current values of the states the components carry from one interval to the next
+    # (see Component.carried_states).
+    # Parameters:
+    #  components: List containing each component object.
+    # Returns the values by attribute name for each component [list of dicts].
+    return [{name: getattr(this_comp, name) for name in this_comp.carried_states}
+            for this_comp in components]
+
+
+def reset_carried_states(components, carried_states):
+    # Set the states the components carry from one interval to the next back to the given
+    # values, e.g. to their initial values at the start of each typical period.
+    # Parameters:
+    #  components: List containing each component object.
+    #  carried_states: Values by attribute name for each component (see get_carried_states).
+    for this_comp, states in zip(components, carried_states):
+        for name, value in states.items():
+            setattr(this_comp, name, value)
+
+
+def get_period_features(components, n_periods, period_length):
+    # Get one row per period with the values of all time series of all components, each time
+    # series scaled to the range of 0 to 1 so that all of them have the same influence.
+    # Parameters:
+    #  components: List containing each component object (after precompute).
+    #  n_periods: Number of periods [-].
+    #  period_length: Number of intervals per period [-].
+    n_values = n_periods * period_length
+    features = []
+    for this_comp in components:
+        for values in this_comp.time_series.values():
+            values = values[:n_values]
+            value_range = values.max() - values.min()
+            if value_range > 0:
+                # Constant time series don't distinguish the periods.
+                features.append(((values - values.min()) / value_range).reshape(
+                    n_periods, period_length))
+    if not features:
+        return np.zeros((n_periods, 1))
+    return np.hstack(features)
+
+
+def k_medoids(features, n_clusters, max_iterations=100):
+    # Cluster the rows of a feature matrix with the k-medoids algorithm (alternating assignment
+    # and medoid update, started with k-medoids++ seeding). The seeding is deterministic, it
+    # always starts with the row closest to all other rows.
+    # Parameters:
+    #  features: Feature matrix with one row per element [2d array].
+    #  n_clusters: Number of clusters [-].
+    #  max_iterations: Max. number of iterations [-].
+    # Returns the row indices of the medoids and the cluster index of each row [arrays].
+    squared_norms = np.sum(features ** 2, axis=1)
+    distances = np.sqrt(np.maximum(
+        squared_norms[:, np.newaxis] + squared_norms - 2 * features @ features.T, 0))
+
+    # Seeding: the next medoid is the row farthest away from the medoids chosen so far
+    # (deterministic version of k-medoids++).
+    medoids = [int(np.argmin(distances.sum(axis=1)))]
+    while len(medoids) < n_clusters:
+        medoids.append(int(np.argmax(distances[:, medoids].min(axis=1))))
+    medoids = np.array(medoids)
+
+    for _ in range(max_iterations):
+        labels = np.argmin(distances[:, medoids], axis=1)
+        new_medoids = medoids.copy()
+        for i_cluster in range(n_clusters):
+            members = np.flatnonzero(labels == i_cluster)
+            if members.size == 0:
+                # Happens if two medoids are identical, the first one gets all members.
+                continue
+            # The new medoid is the member with the smallest distance to all other members.
+            new_medoids[i_cluster] = members[
+                np.argmin(distances[np.ix_(members, members)].sum(axis=1))]
+        if np.array_equal(new_medoids, medoids):
+            break
+        medoids = new_medoids
+    labels = np.argmin(distances[:, medoids], axis=1)
+    return medoids, labels
+
+
+def get_aggregation_error(reference_components, components):
+    # Compare the results of a simulation with typical periods to the results of the full
+    # simulation.
+    # Parameters:
+    #  reference_components: Components of the full simulation [list].
+    #  components: Components of the simulation with typical periods [list].
+    # Returns the relative error of the annual results summed over all components [dict].
+    errors = {}
+    for key in ['annuity_variable_costs', 'annuity_total', 'annual_variable_emissions',
+                'annual_total_emissions']:
+        reference = sum(this_comp.results.get(key, 0) for this_comp in reference_components)
+        value = sum(this_comp.results.get(key, 0) for this_comp in components)
+        errors[key] = (value - reference) / abs(reference) if reference != 0 else \
+            float(value != 0)
+    return errors
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def update_annuities(component):
     # Convert the CAPEX and variable costs to annuities.
     # Parameter:
@@ -31,13 +34,16 @@ def update_annuities(component):
 
     # Calculate the ratio of simulation time to one year (sim_time_span is in minutes) [-].
     time_ratio = component.sim_params.sim_time_span / (365 * 24 * 60)
-    # Get the total amount of variable costs [EUR].
-    variable_cost_tot = sum(component.results['variable_costs'])
+    # Get the total amount of variable costs [EUR]. If typical periods are simulated, each
+    # interval stands for as many intervals as its period represents.
+    interval_weights = component.sim_params.interval_weights
+    variable_cost_tot = get_weighted_sum(component.results['variable_costs'], interval_weights)
     # Get the annuity of the variable cost [EUR/a].
     variable_cost_annuity = variable_cost_tot / time_ratio
 
     # Get the total amount of variable emissions [kg].
-    variable_emissions_tot = sum(component.results['variable_emissions'])
+    variable_emissions_tot = get_weighted_sum(
+        component.results['variable_emissions'], interval_weights)
     # Get the annual emissions out of the variable emissions [kg/a].
     variable_emissions_annual = variable_emissions_tot / time_ratio
 
@@ -54,6 +60,16 @@ def update_annuities(component):
         op_emissions + variable_emissions_annual
 
 
+def get_weighted_sum(values, weights):
+    # Sum up the values of all intervals, weighted if weights are given.
+    # Parameters:
+    #  values: Value of each interval [list].
+    #  weights: Weight of each interval (no weighting if None) [array].
+    if weights is None:
+        return sum(values)
+    return float(np.dot(values, weights))
+
+
 def calc_annuity(component, target):
     # When the target dict is empty, the annuity is zero, otherwise it has to be calculated.
     if not target:
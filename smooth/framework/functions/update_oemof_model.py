@@ -0,0 +1,142 @@
+import pyomo.environ as po
+from oemof.solph.plumbing import sequence
+
+
+def prepare_persistent_model(model):
+    # Prepare an oemof model that is built once and then reused for all intervals. The variable
+    # costs of all flows are replaced by mutable pyomo parameters, so that they can be changed
+    # without rebuilding the objective function in each interval.
+    # Parameters:
+    #  model: oemof model (solph.Model) that will be reused [object].
+
+    def _initial_variable_costs(m, i, o, t):
+        return m.flows[i, o].variable_costs[t]
+
+    model.variable_costs = po.Param(
+        model.FLOWS, model.TIMESTEPS, mutable=True, initialize=_initial_variable_costs)
+
+    # Let each flow point to its mutable cost parameters and build the objective with them.
+    for (i, o) in model.FLOWS:
+        model.flows[i, o].variable_costs = [
+            model.variable_costs[i, o, t] for t in model.TIMESTEPS]
+    model._add_objective(update=True)
+
+    # Blocks (e.g. all transformers or storages) that have to be rebuilt before the next solve
+    # because parameters changed that are part of their constraints.
+    model.outdated_blocks = set()
+
+
+def set_variable_costs(model, node_from, node_to, costs):
+    # Set the variable costs of a flow in a persistent oemof model.
+    # Parameters:
+    #  model: oemof model (solph.Model) prepared with prepare_persistent_model [object].
+    #  node_from: oemof node the flow starts at [object].
+    #  node_to: oemof node the flow ends at [object].
+    #  costs: Variable costs of this flow, e.g. [EUR/Wh], [EUR/kg].
+    for t in model.TIMESTEPS:
+        model.variable_costs[node_from, node_to, t] = costs
+
+
+def set_fixed_flow(model, node_from, node_to, values):
+    # Fix a flow in a persistent oemof model to new values.
+    # Parameters:
+    #  model: oemof model (solph.Model) [object].
+    #  node_from: oemof node the flow starts at [object].
+    #  node_to: oemof node the flow ends at [object].
+    #  values: Absolute values of the flow (actual value times nominal value) for each time step
+    #  of the model, e.g. [Wh], [kg].
+    for t in model.TIMESTEPS:
+        model.flow[node_from, node_to, t].fix(values[t])
+
+
+def set_nominal_value(model, node_from, node_to, nominal_value):
+    # Update the bounds of a flow in a persistent oemof model to a new nominal value.
+    # Parameters:
+    #  model: oemof model (solph.Model) [object].
+    #  node_from: oemof node the flow starts at [object].
+    #  node_to: oemof node the flow ends at [object].
+    #  nominal_value: New nominal value of the flow, e.g. [Wh], [kg].
+    flow = model.flows[node_from, node_to]
+    flow.nominal_value = nominal_value
+    for t in model.TIMESTEPS:
+        model.flow[node_from, node_to, t].setub(flow.max[t] * nominal_value)
+        model.flow[node_from, node_to, t].setlb(flow.min[t] * nominal_value)
+
+
+def set_initial_storage_level(model, node, initial_storage_level):
+    # Set the storage level at the beginning of the interval of a storage in a persistent oemof
+    # model.
+    # Parameters:
+    #  model: oemof model (solph.Model) [object].
+    #  node: oemof storage node (solph.components.GenericStorage) [object].
+    #  initial_storage_level: Storage level as a factor of the nominal storage capacity [-].
+
+    # The node is updated as well, in case the storage block has to be rebuilt.
+    node.initial_storage_level = initial_storage_level
+    model.GenericStorageBlock.init_cap[node].fix(
+        initial_storage_level * node.nominal_storage_capacity)
+
+
+def is_sequence_changed(model, old_values, new_values):
+    # Check if a parameter of a node that is part of its constraints (e.g. a conversion factor)
+    # changed in any time step of the model, so that its block has to be rebuilt.
+    # Parameters:
+    #  model: oemof model (solph.Model) [object].
+    #  old_values: Current value or values of the parameter in the node.
+    #  new_values: New value or values of the parameter.
+    old_values = sequence(old_values)
+    new_values = sequence(new_values)
+    return any(old_values[t] != new_values[t] for t in model.TIMESTEPS)
+
+
+def mark_block_outdated(model, node):
+    # Mark the constraint block of a node to be rebuilt before the next solve. This is needed when
+    # parameters changed that are part of the constraints (e.g. conversion factors, breakpoints
+    # or storage losses). The changed parameters have to be set in the node itself beforehand.
+    # Only call it if the parameters actually changed (see is_sequence_changed), rebuilding a
+    # block takes about as long as building it.
+    # Parameters:
+    #  model: oemof model (solph.Model) prepared with prepare_persistent_model [object].
+    #  node: oemof node whose parameters changed [object].
+    model.outdated_blocks.add(node.constraint_group())
+
+
+def rebuild_outdated_blocks(model):
+    # Rebuild all constraint blocks that were marked as outdated since the last solve.
+    # Parameters:
+    #  model: oemof model (solph.Model) prepared with prepare_persistent_model [object].
+    is_objective_outdated = False
+    for block_class in model.outdated_blocks:
+        block = rebuild_block(model, block_class, update_objective=False)
+        is_objective_outdated |= hasattr(block, '_objective_expression')
+    if is_objective_outdated:
+        rebuild_objective(model)
+
+    model.outdated_blocks = set()
+
+
+def rebuild_block(model, block_class, update_objective=True):
+    # Rebuild the constraint block of all nodes of a class with their current parameters.
+    # Parameters:
+    #  model: oemof model (solph.Model) [object].
+    #  block_class: Class of the block, as returned by the constraint_group of the nodes.
+    #  update_objective: Decide if the objective is built again if the block has cost terms,
+    #  which still refer to the variables of the old block otherwise [bool].
+    # Returns the new block.
+    # oemof names each block after its class.
+    block_name = block_class.__name__
+    model.del_component(block_name)
+    block = block_class()
+    model.add_component(block_name, block)
+    block._create(group=model.es.groups.get(block_class))
+    if update_objective and hasattr(block, '_objective_expression'):
+        rebuild_objective(model)
+    return block
+
+
+def rebuild_objective(model):
+    # Build the objective of a model again from the cost terms of all its blocks (the variable
+    # costs of the flows stay mutable parameters, see prepare_persistent_model).
+    # Parameters:
+    #  model: oemof model (solph.Model) [object].
+    model._add_objective(sense=model.objective.sense, update=True)
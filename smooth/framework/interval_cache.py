@@ -0,0 +1,90 @@
+from collections import OrderedDict
+import numpy as np
+
+
+def get_interval_key(components, sim_params):
+    # Get the key of the interval problem that is about to be solved. It is made up of the number
+    # of optimized (or merged) intervals and the parameters of each component that enter the
+    # oemof model (see Component.get_interval_key), so two intervals with the same key have the
+    # same LP.
+    # Parameters:
+    #  components: List containing each component object (after prepare_simulation).
+    #  sim_params: Simulation parameters defined by the user [object].
+    return (sim_params.n_solve_intervals, sim_params.step_length) + tuple(
+        get_canonical_value(this_comp.get_interval_key()) for this_comp in components)
+
+
+def get_canonical_value(value):
+    # Convert a parameter value to a hashable value that is equal for equal parameters (arrays
+    # are compared by their data, lists like tuples).
+    # Parameters:
+    #  value: Parameter value, e.g. a number, list or numpy array.
+    if isinstance(value, np.ndarray):
+        return value.dtype.str, value.shape, value.tobytes()
+    elif isinstance(value, (list, tuple)):
+        return tuple(get_canonical_value(this_value) for this_value in value)
+    elif isinstance(value, dict):
+        return tuple(sorted((key, get_canonical_value(this_value))
+                            for key, this_value in value.items()))
+    elif isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class IntervalCache:
+    # Cache of the results of solved intervals by the key of their interval problem (see
+    # get_interval_key). If the same problem has to be solved again, e.g. at night or with full
+    # storages, the stored results are used instead. The cache holds at most max_size results,
+    # the least recently used one is evicted first.
+
+    def __init__(self, max_size):
+        # Parameters:
+        #  max_size: Max. number of stored interval results [-].
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        # Statistics of the cache usage.
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        # Get the stored results of an interval problem (None if it is not in the cache).
+        # Parameters:
+        #  key: Key of the interval problem [tuple].
+        results = self.entries.get(key)
+        if results is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return results
+
+    def add(self, key, results):
+        # Store the results of a solved interval problem.
+        # Parameters:
+        #  key: Key of the interval problem [tuple].
+        #  results: Stored results of the solve (see ResultExtractor.get_stored_results).
+        if self.max_size <= 0:
+            return
+        self.entries[key] = results
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    @property
+    def hit_rate(self):
+        # Share of the lookups that were found in the cache [-].
+        n_lookups = self.hits + self.misses
+        return self.hits / n_lookups if n_lookups > 0 else 0
+
+    def get_statistics(self):
+        # Get the usage statistics of the cache.
+        return {
+            'size': len(self.entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate,
+        }
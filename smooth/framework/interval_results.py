@@ -0,0 +1,154 @@
+import numpy as np
+
+
+class ResultExtractor:
+    # Reads the results of a solved oemof model directly from its pyomo variables. The flows and
+    # storage levels are mapped to their pyomo variables once when the model is built, after each
+    # solve their values are only copied into preallocated arrays.
+
+    def __init__(self, model):
+        # Parameters:
+        #  model: oemof model (solph.Model) the results are read from [object].
+        self.model = model
+        n_timesteps = len(model.TIMESTEPS)
+
+        # ------------------- FLOWS -------------------
+        # Labels of the start and end node of each flow, e.g. ('bel', 'electrolyzer').
+        self.flow_keys = [(str(i), str(o)) for (i, o) in model.FLOWS]
+        self.flow_index = {key: i_flow for i_flow, key in enumerate(self.flow_keys)}
+        # Indices of the flows going in or out of each node, by node label.
+        self.node_flows = {}
+        for i_flow, (label_from, label_to) in enumerate(self.flow_keys):
+            self.node_flows.setdefault(label_from, []).append(i_flow)
+            if label_to != label_from:
+                self.node_flows.setdefault(label_to, []).append(i_flow)
+        # The pyomo variables of all flows (row by row) and the array for their values.
+        self.flow_vars = [model.flow[i, o, t] for (i, o) in model.FLOWS for t in model.TIMESTEPS]
+        self.flow_values = np.zeros((len(self.flow_keys), n_timesteps))
+
+        # ------------------- STORAGE LEVELS -------------------
+        self.storage_block = None
+        self.map_storages()
+
+    def map_storages(self):
+        # Map the storage levels to their pyomo variables. This has to be done again if the
+        # storage block was rebuilt (e.g. in a persistent model).
+        model = self.model
+        self.storage_block = getattr(model, 'GenericStorageBlock', None)
+        storages = [] if self.storage_block is None else list(self.storage_block.STORAGES)
+        self.storage_index = {str(n): i_storage for i_storage, n in enumerate(storages)}
+        self.storage_vars = [self.storage_block.capacity[n, t]
+                             for n in storages for t in model.TIMESTEPS]
+        self.storage_values = np.zeros((len(storages), len(model.TIMESTEPS)))
+
+    def extract(self):
+        # Read the values of the solved model and return them as results of its first time step.
+        if getattr(self.model, 'GenericStorageBlock', None) is not self.storage_block:
+            self.map_storages()
+        # Variables without a value (not part of any constraint) become NaN.
+        self.flow_values[:] = np.array(
+            [var.value for var in self.flow_vars], dtype=float).reshape(self.flow_values.shape)
+        self.storage_values[:] = np.array(
+            [var.value for var in self.storage_vars], dtype=float).reshape(
+                self.storage_values.shape)
+        return IntervalResults(self, 0)
+
+    def get_stored_results(self):
+        # Get a copy of the last extracted values that does not depend on the oemof model, e.g.
+        # to reuse the results of this solve for a later interval with the same problem.
+        return StoredResults(self)
+
+    def get_debug_snapshot(self):
+        # Get a copy of the last extracted values together with the bounds of the variables, to
+        # be able to show them if a later solve fails (see get_df_debug).
+        return {
+            'flow_keys': self.flow_keys,
+            'flow_values': self.flow_values.copy(),
+            'flow_bounds': get_bounds(self.flow_vars, self.flow_values.shape),
+            'storage_keys': list(self.storage_index),
+            'storage_values': self.storage_values.copy(),
+            'storage_bounds': get_bounds(self.storage_vars, self.storage_values.shape),
+        }
+
+
+def get_bounds(variables, shape):
+    # Get the lower and upper bounds and the fixed flags of pyomo variables as arrays (NaN if
+    # there is no bound).
+    # Parameters:
+    #  variables: pyomo variables [list].
+    #  shape: Shape of the returned arrays [tuple].
+    bounds = np.array([(var.lb, var.ub, var.fixed) for var in variables], dtype=float)
+    bounds = bounds.reshape(shape + (3,))
+    return {'min': bounds[..., 0], 'max': bounds[..., 1], 'fixed': bounds[..., 2] > 0}
+
+
+class StoredResults:
+    # Copy of the values read by a result extractor. It holds the same mappings as the extractor,
+    # but no reference to the oemof model, so IntervalResults can be created from it later on.
+
+    def __init__(self, extractor):
+        # Parameters:
+        #  extractor: Result extractor holding the values of the solved model [object].
+        self.flow_keys = extractor.flow_keys
+        self.flow_index = extractor.flow_index
+        self.node_flows = extractor.node_flows
+        self.storage_index = extractor.storage_index
+        self.flow_values = extractor.flow_values.copy()
+        self.storage_values = extractor.storage_values.copy()
+
+    def extract(self):
+        # Return the stored values as results of their first time step.
+        return IntervalResults(self, 0)
+
+
+class IntervalResults:
+    # Results of one time step of a solved oemof model, as handed to the components. Nodes are
+    # referred to by their labels.
+
+    def __init__(self, extractor, i_step, flow_scale=1):
+        # Parameters:
+        #  extractor: Result extractor or stored results holding the values of the solved
+        #   model [object].
+        #  i_step: Index of the time step within the solved model [-].
+        #  flow_scale: Factor the flows are scaled with [-].
+        self.extractor = extractor
+        self.i_step = i_step
+        self.flow_scale = flow_scale
+
+    def step(self, i_step):
+        # Get the results of another time step of the same solve.
+        # Parameters:
+        #  i_step: Index of the time step within the solved model [-].
+        return IntervalResults(self.extractor, i_step, self.flow_scale)
+
+    def split(self, n_intervals):
+        # Get the results of one of the intervals merged into this time step. Each of them gets
+        # the same share of the flows, the storage levels are the ones at the end of the step.
+        # Parameters:
+        #  n_intervals: Number of intervals merged into this time step [-].
+        return IntervalResults(self.extractor, self.i_step, self.flow_scale / n_intervals)
+
+    def get_flows(self, label):
+        # Get all flows going in or out of a node.
+        # Parameters:
+        #  label: Label of the node [str].
+        # Returns a dict with the flow values by (label_from, label_to).
+        extractor = self.extractor
+        return {extractor.flow_keys[i_flow]:
+                float(extractor.flow_values[i_flow, self.i_step]) * self.flow_scale
+                for i_flow in extractor.node_flows.get(label, [])}
+
+    def get_flow(self, label_from, label_to):
+        # Get the value of the flow between two nodes.
+        # Parameters:
+        #  label_from: Label of the node the flow starts at [str].
+        #  label_to: Label of the node the flow ends at [str].
+        i_flow = self.extractor.flow_index[(label_from, label_to)]
+        return float(self.extractor.flow_values[i_flow, self.i_step]) * self.flow_scale
+
+    def get_storage_level(self, label):
+        # Get the storage level at the end of the time step (the oemof storage capacity).
+        # Parameters:
+        #  label: Label of the storage node [str].
+        i_storage = self.extractor.storage_index[label]
+        return float(self.extractor.storage_values[i_storage, self.i_step])
@@ -0,0 +1,148 @@
+import json
+import sys
+import time
+
+
+def notify_observers(observers, event_name, *args):
+    # Call the function of all observers that handles this event.
+    # Parameters:
+    #  observers: Observers of the simulation (sim_params.observers) [list].
+    #  event_name: Name of the observer function, e.g. 'interval_done' [str].
+    for this_observer in observers:
+        getattr(this_observer, event_name)(*args)
+
+
+class Observer:
+    # Base class of the observers of run_smooth (sim_params.observers). They are notified at the
+    # start of the simulation, after each solve and at the end of the simulation. Each interval
+    # event is a dict with:
+    #  'i_interval': Index of the first interval of this solve [-].
+    #  'n_intervals': Number of simulated intervals [-].
+    #  'n_solve_intervals': Number of intervals optimized in this solve [-].
+    #  'n_commit_intervals': Number of intervals of this solve whose results are kept [-].
+    #  'status', 'termination_condition': Solver status and termination condition [str].
+    #  'iterations': Number of solver iterations (None if the solver does not report it) [-].
+    #  'cache_hit': Decide if the results were taken from the interval cache [bool].
+    #  'time_build': Time to prepare and build (or update) the oemof model, including the
+    #  calibration of the piecewise representations (see pw_repn_calibration.py) [s].
+    #  'time_solve': Time to solve the model [s].
+    #  'time_extract': Time to read the results of the model [s].
+    #  'time_update': Time to update the flows, states and costs of the components [s].
+    #  'pwl_formulations': Formulation of the piecewise linear constraints ('LP' or the
+    #  piecewise representation, e.g. 'CC') by the name of the component (empty if the results
+    #  were taken from the interval cache) [dict].
+
+    def start(self, sim_params):
+        # Called before the first interval is simulated.
+        # Parameters:
+        #  sim_params: Simulation parameters defined by the user [object].
+        pass
+
+    def interval_done(self, event):
+        # Called after the results of a solve are handed to the components (or before the
+        # simulation is stopped because the solver failed).
+        # Parameters:
+        #  event: Data of this interval (see above) [dict].
+        pass
+
+    def finish(self, sim_params):
+        # Called after the last interval, or when the simulation is stopped by an error (e.g.
+        # if the solver failed).
+        # Parameters:
+        #  sim_params: Simulation parameters defined by the user [object].
+        pass
+
+
+class ProgressBar(Observer):
+    # Show the progress of the simulation in one line that is updated at most every update_time
+    # seconds, together with the number of simulated intervals per second.
+
+    def __init__(self, update_time=1, width=40, stream=None):
+        # Parameters:
+        #  update_time: Min. time between two updates of the progress bar [s].
+        #  width: Number of characters of the bar [-].
+        #  stream: Stream the progress bar is written to (sys.stdout if None) [object].
+        self.update_time = update_time
+        self.width = width
+        self.stream = stream
+        self.time_start = None
+        self.time_last_update = None
+
+    def start(self, sim_params):
+        self.time_start = time.perf_counter()
+        self.time_last_update = None
+
+    def interval_done(self, event):
+        now = time.perf_counter()
+        n_done = event['i_interval'] + event['n_commit_intervals']
+        is_last = n_done >= event['n_intervals']
+        if not is_last and self.time_last_update is not None \
+                and now - self.time_last_update < self.update_time:
+            return
+        self.time_last_update = now
+        share_done = n_done / event['n_intervals']
+        n_filled = int(round(share_done * self.width))
+        intervals_per_second = n_done / max(now - self.time_start, 1e-9)
+        stream = sys.stdout if self.stream is None else self.stream
+        stream.write('\r[{}{}] {}/{} intervals ({:.1f}/s)'.format(
+            '#' * n_filled, ' ' * (self.width - n_filled), n_done, event['n_intervals'],
+            intervals_per_second))
+        stream.flush()
+
+    def finish(self, sim_params):
+        stream = sys.stdout if self.stream is None else self.stream
+        stream.write('\n')
+        stream.flush()
+
+
+class JsonLinesWriter(Observer):
+    # Write each interval event as one JSON object per line to a file, e.g. to monitor the
+    # throughput of simulations running in production.
+
+    def __init__(self, file_path, append=False):
+        # Parameters:
+        #  file_path: Path of the JSON lines file [str].
+        #  append: Decide if the events are appended to an existing file [bool].
+        self.file_path = file_path
+        self.append = append
+        self.file = None
+
+    def start(self, sim_params):
+        self.file = open(self.file_path, 'a' if self.append else 'w')
+
+    def interval_done(self, event):
+        self.file.write(json.dumps(event) + '\n')
+
+    def finish(self, sim_params):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class TimingCollector(Observer):
+    # Keep all interval events in memory to evaluate the timings after the simulation.
+
+    def __init__(self):
+        self.events = []
+
+    def start(self, sim_params):
+        self.events = []
+
+    def interval_done(self, event):
+        self.events.append(event)
+
+    def get_summary(self):
+        # Get the total time of each simulation step over all solves [s], the number of solves,
+        # the number of cache hits and how often each component used each formulation of its
+        # piecewise linear constraints.
+        summary = {'n_solves': len(self.events),
+                   'n_cache_hits': sum(event['cache_hit'] for event in self.events)}
+        for key in ['time_build', 'time_solve', 'time_extract', 'time_update']:
+            summary[key] = sum(event[key] for event in self.events)
+        pwl_formulations = {}
+        for event in self.events:
+            for name, formulation in event['pwl_formulations'].items():
+                counts = pwl_formulations.setdefault(name, {})
+                counts[formulation] = counts.get(formulation, 0) + 1
+        summary['pwl_formulations'] = pwl_formulations
+        return summary
@@ -0,0 +1,112 @@
+import copy
+from concurrent.futures import ThreadPoolExecutor
+from smooth.framework.functions.update_oemof_model import prepare_persistent_model
+
+
+class ModelPipeline:
+    # Builds the oemof model of the next solve on a worker thread while the solver is busy with
+    # the current one (sim_params.pipelined). The solver runs outside of Python (e.g. the cbc
+    # process), so the model construction is not slowed down by it. The state dependent
+    # parameters of the components (e.g. storage levels or breakpoints) are not known yet when
+    # the model is built, so they are patched in with Component.update_oemof_model once the
+    # states of the current solve are updated, the same way a persistent model is updated.
+    # The worker thread never changes the simulation parameters or the components: the model is
+    # built from shallow copies of them, and the attributes the components set while their
+    # oemof model is created (e.g. Component.model) are only copied to the components on the
+    # main thread when the model is taken (get_model). Components must therefore only assign
+    # their attributes in create_oemof_model and update_constraints, not change objects they
+    # share with other intervals in place.
+
+    def __init__(self, bus_names, components, sim_params):
+        # Parameters:
+        #  bus_names: List of the bus names of the smooth model.
+        #  components: List containing each component object.
+        #  sim_params: Simulation parameters defined by the user [object].
+        self.bus_names = bus_names
+        self.components = components
+        self.sim_params = sim_params
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        # Model that is being built (future) and the model built last, with the index of the
+        # interval they start at.
+        self.future = None
+        self.i_interval_future = None
+        self.prebuilt_model = None
+        self.i_interval_prebuilt = None
+
+    def build(self, i_interval):
+        # Start to build the oemof model of the solve starting at the given interval. The
+        # components are read while the model is built, so they must not be changed until wait
+        # is called.
+        # Parameters:
+        #  i_interval: Index of the first interval of the next solve [-].
+        self.future = self.executor.submit(self.create_model, i_interval)
+        self.i_interval_future = i_interval
+
+    def wait(self):
+        # Wait until the model started with build is finished.
+        if self.future is None:
+            return
+        try:
+            self.prebuilt_model = self.future.result()
+            self.i_interval_prebuilt = self.i_interval_future
+        finally:
+            self.future = None
+
+    def get_model(self, i_interval):
+        # Get the prebuilt model of the solve starting at the given interval. It still has to be
+        # updated with Component.update_oemof_model. The prebuilt model is only used once.
+        # Parameters:
+        #  i_interval: Index of the first interval of the solve [-].
+        # Returns the oemof model (solph.Model) and the dict of its busses, or None if no
+        # matching model was built (e.g. because the results of the interval before were taken
+        # from the interval cache).
+        prebuilt_model = self.prebuilt_model
+        is_matching = self.i_interval_prebuilt == i_interval
+        self.prebuilt_model = None
+        self.i_interval_prebuilt = None
+        if not is_matching:
+            return None
+        model_to_solve, busses, component_attributes = prebuilt_model
+        # The components now belong to the prebuilt model.
+        for this_comp, attributes in zip(self.components, component_attributes):
+            for name, value in attributes.items():
+                setattr(this_comp, name, value)
+        return model_to_solve, busses
+
+    def create_model(self, i_interval):
+        # Create the oemof model of the solve starting at the given interval (on the worker
+        # thread) and prepare it to be updated like a persistent model.
+        # Parameters:
+        #  i_interval: Index of the first interval of the solve [-].
+        # Returns the oemof model (solph.Model), the dict of its busses and the attributes each
+        # component set while the model was created [list of dicts].
+        # Imported here, because run_smooth imports this module.
+        from smooth.framework.run_smooth import create_oemof_model
+
+        # The components read the interval from their simulation parameters, so they get a copy
+        # with the interval of the next solve.
+        sim_params = copy.copy(self.sim_params)
+        sim_params.i_interval = i_interval
+        sim_params.n_solve_intervals = min(sim_params.horizon, sim_params.n_intervals - i_interval)
+        build_components = []
+        initial_attributes = []
+        for this_comp in self.components:
+            build_comp = copy.copy(this_comp)
+            build_comp.sim_params = sim_params
+            build_components.append(build_comp)
+            initial_attributes.append(dict(vars(build_comp)))
+
+        model_to_solve, busses = create_oemof_model(self.bus_names, build_components, sim_params)
+        prepare_persistent_model(model_to_solve)
+
+        # Attributes the components assigned while the model was created.
+        component_attributes = [
+            {name: value for name, value in vars(build_comp).items()
+             if name != 'sim_params' and (name not in attributes or value is not attributes[name])}
+            for build_comp, attributes in zip(build_components, initial_attributes)]
+        return model_to_solve, busses, component_attributes
+
+    def shutdown(self):
+        # Stop the worker thread (after waiting for a running build).
+        self.wait()
+        self.executor.shutdown()
@@ -1,9 +1,21 @@
+import time
 from oemof import solph
-from oemof.outputlib import processing
 from smooth.framework.simulation_parameters import SimulationParameters as sp
 from smooth.framework.functions.debug import get_df_debug, show_debug
 from smooth.framework.exceptions import SolverNonOptimalError
-from smooth.framework.functions.functions import create_component_obj
+from smooth.framework.functions.functions import create_component_obj, get_prepare_order
+from smooth.framework.functions.typical_periods import \
+    aggregate_typical_periods, get_carried_states, reset_carried_states
+from smooth.framework.functions.adaptive_steps import get_step_lengths
+from smooth.framework.solver import get_solver, get_solution, set_start_values
+from smooth.framework.interval_results import ResultExtractor
+from smooth.framework.interval_cache import IntervalCache, get_interval_key
+from smooth.framework.observers import notify_observers
+from smooth.framework.pipeline import ModelPipeline
+from smooth.framework.checkpoint import load_checkpoint, restore_checkpoint, write_checkpoint
+from smooth.framework.functions.update_oemof_model import \
+    prepare_persistent_model, rebuild_outdated_blocks
+from smooth.framework.functions.pw_repn_calibration import calibrate_pw_repn
 
 
 def run_smooth(model):
@@ -12,6 +24,275 @@ def run_smooth(model):
     #  model: smooth model object containing parameters for components, simulation and busses.
 
     # ------------------- INITIALIZATION -------------------
+    sim_params, components = create_simulation(model)
+    # Components are prepared after the components whose foreign states they read.
+    prepare_order = get_prepare_order(components)
+
+    # Initial states of the components, each typical period starts from them (only if typical
+    # periods are simulated).
+    initial_states = None
+    if sim_params.typical_periods is not None:
+        initial_states = get_carried_states(components)
+
+    # RESUME FROM A CHECKPOINT
+    # The component states are taken from the checkpoint and the simulation continues with its
+    # next interval.
+    i_interval_start = 0
+    if sim_params.resume_from is not None:
+        i_interval_start = restore_checkpoint(
+            load_checkpoint(sim_params.resume_from), components, sim_params)
+    # Index of the interval following the last written checkpoint.
+    i_interval_checkpoint = i_interval_start
+
+    # CREATE THE SOLVER
+    # The solver backend is kept over all intervals.
+    solver = get_solver(sim_params)
+
+    # There are no results yet. The snapshot of the last successful interval is only kept to
+    # show it if the solver fails later on (if show_debug_flag is set).
+    debug_snapshot = None
+    # There is no oemof model yet. If the model is persistent, it is only
+    # created in the first interval and updated in place afterwards.
+    model_to_solve = None
+    busses = None
+    # Reads the results of the oemof model into arrays after each solve.
+    result_extractor = None
+    # Solution of the last interval, used to warm start the next one.
+    last_solution = None
+    # Results of solved intervals by their interval problem (if the cache is used).
+    interval_cache = None
+    if sim_params.interval_cache_size > 0:
+        interval_cache = IntervalCache(sim_params.interval_cache_size)
+
+    # Number of intervals that can be merged into one step, starting at each interval (only if
+    # intervals are merged).
+    step_lengths = None
+    if sim_params.merge_tolerance is not None:
+        step_lengths = get_step_lengths(components, sim_params)
+    # Builds the oemof model of the next solve while the solver runs (only if pipelined).
+    pipeline = None
+    if sim_params.pipelined:
+        pipeline = ModelPipeline(model['busses'], components, sim_params)
+
+    notify_observers(sim_params.observers, 'start', sim_params)
+
+    # ------------------- SIMULATION -------------------
+    # The observers are notified of the end and the pipeline is shut down however the
+    # simulation ends (e.g. if the solver fails).
+    try:
+        # Each solve optimizes the next sim_params.horizon intervals, the results of the first
+        # sim_params.commit_steps intervals are kept before the next solve. If intervals are
+        # merged, each solve optimizes one step of sim_params.step_length intervals instead.
+        i_interval = i_interval_start
+        while i_interval < sim_params.n_intervals:
+            # Save the interval index of this run to the sim_params to make it usable later on.
+            sim_params.i_interval = i_interval
+            # Number of intervals optimized in this solve and how many of them are kept.
+            sim_params.n_solve_intervals = min(sim_params.horizon,
+                                               sim_params.n_intervals - i_interval)
+            n_commit_intervals = min(sim_params.commit_steps, sim_params.n_solve_intervals)
+            if step_lengths is not None:
+                sim_params.step_length = int(step_lengths[i_interval])
+                n_commit_intervals = sim_params.step_length
+            if sim_params.print_progress:
+                print('Simulating interval {}/{}'.format(i_interval+1, sim_params.n_intervals))
+
+            # ------------------- PREPARE THE SIMULATION -------------------
+            time_start = time.perf_counter()
+            if initial_states is not None and i_interval > 0 and \
+                    i_interval % sim_params.period_length == 0:
+                # The typical period before this one is not its real predecessor.
+                reset_carried_states(components, initial_states)
+            for this_comp in prepare_order:
+                # Execute the prepare simulation step (if this component has one).
+                this_comp.prepare_simulation(components)
+
+            # Check if the same interval problem was already solved.
+            stored_results = None
+            if interval_cache is not None:
+                interval_key = get_interval_key(components, sim_params)
+                stored_results = interval_cache.get(interval_key)
+
+            if stored_results is not None:
+                # ------------------- REUSE THE CACHED RESULTS -------------------
+                # The oemof model is neither built nor solved for this interval.
+                results = stored_results.extract()
+                status, termination_condition = 'ok', 'optimal'
+                sim_params.solver_iterations[i_interval] = 0
+                time_built = time_solved = time.perf_counter()
+                pwl_formulations = {}
+            else:
+                # A persistent model can only be reused if it has the same number of time steps.
+                is_persistent = sim_params.persistent_model and model_to_solve is not None \
+                    and len(model_to_solve.TIMESTEPS) == sim_params.n_solve_intervals
+                prebuilt_model = pipeline.get_model(i_interval) if pipeline is not None else None
+                if is_persistent or prebuilt_model is not None:
+                    if prebuilt_model is not None:
+                        # The model was built while the last interval was solved.
+                        model_to_solve, busses = prebuilt_model
+                        result_extractor = ResultExtractor(model_to_solve)
+                        if sim_params.warm_start and last_solution is not None:
+                            set_start_values(model_to_solve, last_solution)
+                    # ------------------- UPDATE THE PERSISTENT OEMOF MODEL -------------------
+                    for this_comp in components:
+                        # Update the parameters of this component that changed since the last
+                        # interval.
+                        this_comp.update_oemof_model(busses, model_to_solve)
+                    # Rebuild the constraint blocks whose parameters changed.
+                    rebuild_outdated_blocks(model_to_solve)
+                else:
+                    # ----------------- CREATE THE OEMOF MODEL FOR THIS INTERVAL -----------------
+                    model_to_solve, busses = create_oemof_model(
+                        model['busses'], components, sim_params)
+                    result_extractor = ResultExtractor(model_to_solve)
+                    if sim_params.warm_start and last_solution is not None:
+                        # Start from the solution of the last interval (a persistent model still
+                        # holds it in its variables).
+                        set_start_values(model_to_solve, last_solution)
+
+                # Try all piecewise representations for the components with pw_repn 'auto' in the
+                # first intervals (counted as build time).
+                calibrate_pw_repn(model_to_solve, components, solver, sim_params)
+
+                if i_interval == 0:
+                    # Save the set of linear equations for the first interval.
+                    model_to_solve.write('./oemof_model.lp',
+                                         io_options={'symbolic_solver_labels': True})
+
+                # ------------------- RUN THE SIMULATION -------------------
+                # Do the simulation for this time step.
+                time_built = time.perf_counter()
+                pwl_formulations = get_pwl_formulations(components)
+                i_interval_next = i_interval + n_commit_intervals
+                if pipeline is not None and i_interval_next < sim_params.n_intervals:
+                    # Build the model of the next solve while this one is solved.
+                    pipeline.build(i_interval_next)
+                # Only models with start values are warm started: a persistent model holds the
+                # solution of its last solve, a new model gets the last solution (if there is one,
+                # e.g. not in the first interval after resuming from a checkpoint).
+                warm_start = sim_params.warm_start and (is_persistent or last_solution is not None)
+                try:
+                    status, termination_condition = solver.solve(
+                        model_to_solve, warm_start=warm_start)
+                finally:
+                    if pipeline is not None:
+                        pipeline.wait()
+                sim_params.solver_iterations[i_interval] = solver.iterations
+                time_solved = time.perf_counter()
+                if sim_params.print_progress and solver.iterations is not None:
+                    print('Solver iterations: {}'.format(solver.iterations))
+
+                # ------------------- CHECK IF SOLVING WAS SUCCESSFUL -------------------
+                # If the status and temination condition is not ok/optimal, get and
+                # print the current flows and status
+                if status != "ok" and termination_condition != "optimal":
+                    event = get_interval_event(
+                        sim_params, n_commit_intervals, status, termination_condition, False,
+                        [time_start, time_built, time_solved, time_solved, time_solved],
+                        pwl_formulations)
+                    notify_observers(sim_params.observers, 'interval_done', event)
+                    if sim_params.checkpoint_file is not None:
+                        # Keep the states before this interval, so that it can be replayed
+                        # (see replay_interval).
+                        write_checkpoint(sim_params.checkpoint_file, components, sim_params,
+                                         i_interval)
+                    if sim_params.show_debug_flag:
+                        result_extractor.extract()
+                        df_debug = get_df_debug(
+                            debug_snapshot, result_extractor.get_debug_snapshot())
+                        show_debug(df_debug, components)
+                    raise SolverNonOptimalError(
+                        'solver status: ' + status +
+                        " / termination condition: " + termination_condition)
+
+                # ------------------- HANDLE RESULTS -------------------
+                # Get the results of this oemof run.
+                results = result_extractor.extract()
+                if sim_params.show_debug_flag:
+                    debug_snapshot = result_extractor.get_debug_snapshot()
+                if sim_params.warm_start and not sim_params.persistent_model:
+                    last_solution = get_solution(model_to_solve)
+                if interval_cache is not None:
+                    interval_cache.add(interval_key, result_extractor.get_stored_results())
+
+            time_extracted = time.perf_counter()
+            for i_step in range(n_commit_intervals):
+                # Handle the results of each kept interval like the results of a single interval.
+                sim_params.i_interval = i_interval + i_step
+                if sim_params.step_length > 1:
+                    # The flows of a merged step are split up evenly between its intervals.
+                    step_results = results.split(sim_params.step_length)
+                else:
+                    step_results = results.step(i_step)
+
+                # Loop through every component and call the result handling functions
+                for this_comp in components:
+                    # Update the flows
+                    this_comp.update_flows(step_results, sim_params)
+                    # Update the states.
+                    this_comp.update_states(step_results, sim_params)
+                    # Update the costs and artificial costs.
+                    this_comp.update_var_costs(step_results, sim_params)
+                    # Update the costs and artificial costs.
+                    this_comp.update_var_emissions(step_results, sim_params)
+
+            sim_params.i_interval = i_interval
+            event = get_interval_event(
+                sim_params, n_commit_intervals, status, termination_condition,
+                stored_results is not None,
+                [time_start, time_built, time_solved, time_extracted, time.perf_counter()],
+                pwl_formulations)
+            notify_observers(sim_params.observers, 'interval_done', event)
+
+            # ------------------- WRITE A CHECKPOINT -------------------
+            i_interval_next = i_interval + n_commit_intervals
+            if sim_params.checkpoint_file is not None and i_interval_next < sim_params.n_intervals \
+                    and i_interval_next - i_interval_checkpoint >= sim_params.checkpoint_interval:
+                write_checkpoint(sim_params.checkpoint_file, components, sim_params,
+                                 i_interval_next)
+                i_interval_checkpoint = i_interval_next
+            i_interval = i_interval_next
+
+        if interval_cache is not None:
+            sim_params.interval_cache_stats = interval_cache.get_statistics()
+            if sim_params.print_progress:
+                print('Interval cache: {hits} hits, {misses} misses, {evictions} evictions, '
+                      'hit rate {hit_rate:.1%}'.format(**sim_params.interval_cache_stats))
+    finally:
+        notify_observers(sim_params.observers, 'finish', sim_params)
+        if pipeline is not None:
+            pipeline.shutdown()
+
+    # Calculate the annuity for each component.
+    for this_comp in components:
+        this_comp.generate_results()
+
+    return components, status
+
+
+def replay_interval(model, checkpoint_file):
+    # Build and solve the interval a checkpoint was written for (e.g. the interval the solver
+    # failed at) without simulating the intervals before it.
+    # Parameters:
+    #  model: smooth model object the checkpoint was written for.
+    #  checkpoint_file: Path of the checkpoint file [str].
+    # Returns the solved oemof model (solph.Model), the solver status and the termination
+    # condition.
+    sim_params, components = create_simulation(model)
+    i_interval = restore_checkpoint(load_checkpoint(checkpoint_file), components, sim_params)
+    sim_params.n_solve_intervals = min(sim_params.horizon, sim_params.n_intervals - i_interval)
+    for this_comp in get_prepare_order(components):
+        this_comp.prepare_simulation(components)
+    model_to_solve, _ = create_oemof_model(model['busses'], components, sim_params)
+    status, termination_condition = get_solver(sim_params).solve(model_to_solve)
+    return model_to_solve, status, termination_condition
+
+
+def create_simulation(model):
+    # Create the simulation parameters and the component objects of a smooth model.
+    # Parameters:
+    #  model: smooth model object containing parameters for components, simulation and busses.
+
     # legacy: components may be list. Convert to dict.
     if isinstance(model["components"], list):
         names = [c.pop("name") for c in model["components"]]
@@ -23,91 +304,98 @@ def run_smooth(model):
 
     # CREATE COMPONENT OBJECTS
     components = create_component_obj(model, sim_params)
+    # Precompute the state independent inputs of the components.
+    for this_comp in components:
+        this_comp.precompute(sim_params)
+    if sim_params.typical_periods is not None:
+        # Only simulate representative periods of the time series.
+        aggregate_typical_periods(components, sim_params)
 
-    # There are no results yet.
-    df_results = None
-    results_dict = None
+    return sim_params, components
 
-    # ------------------- SIMULATION -------------------
-    for i_interval in range(sim_params.n_intervals):
-        # Save the interval index of this run to the sim_params to make it usable later on.
-        sim_params.i_interval = i_interval
-        if sim_params.print_progress:
-            print('Simulating interval {}/{}'.format(i_interval+1, sim_params.n_intervals))
-
-        # Initialize the oemof energy system for this time step.
-        this_time_index = sim_params.date_time_index[i_interval: (i_interval + 1)]
-        oemof_model = solph.EnergySystem(timeindex=this_time_index,
-                                         freq='{}min'.format(sim_params.interval_time))
-
-        # ------------------- CREATE THE OEMOF MODEL FOR THIS INTERVAL -------------------
-        # Create all busses and save them to a dict for later use in the components.
-        busses = {}
-
-        for i_bus in model['busses']:
-            # Create this bus and append it to the "busses" dict.
-            busses[i_bus] = solph.Bus(label=i_bus)
-            # Add the bus to the simulation model.
-            oemof_model.add(busses[i_bus])
-
-        # Prepare the simulation.
-        for this_comp in components:
-            # Execute the prepare simulation step (if this component has one).
-            this_comp.prepare_simulation(components)
-            # Get the oemof representation of this component.
-            this_oemof_model = this_comp.create_oemof_model(busses, oemof_model)
-            if this_oemof_model is not None:
-                # Add the component to the oemof model.
-                oemof_model.add(this_oemof_model)
-            else:
-                # If None is given back, no model is supposed to be added.
-                pass
-
-        # ------------------- RUN THE SIMULATION -------------------
-        # Do the simulation for this time step.
-        model_to_solve = solph.Model(oemof_model)
-
-        for this_comp in components:
-            this_comp.update_constraints(busses, model_to_solve)
-
-        if i_interval == 0:
-            # Save the set of linear equations for the first interval.
-            model_to_solve.write('./oemof_model.lp', io_options={'symbolic_solver_labels': True})
-
-        oemof_results = model_to_solve.solve(solver='cbc', solve_kwargs={'tee': False})
-
-        # ------------------- CHECK IF SOLVING WAS SUCCESSFUL -------------------
-        # If the status and temination condition is not ok/optimal, get and
-        # print the current flows and status
-        status = oemof_results["Solver"][0]["Status"].key
-        termination_condition = oemof_results["Solver"][0]["Termination condition"].key
-        if status != "ok" and termination_condition != "optimal":
-            if sim_params.show_debug_flag:
-                new_df_results = processing.create_dataframe(model_to_solve)
-                df_debug = get_df_debug(df_results, results_dict, new_df_results)
-                show_debug(df_debug, components)
-            raise SolverNonOptimalError('solver status: ' + status +
-                                        " / termination condition: " + termination_condition)
-
-        # ------------------- HANDLE RESULTS -------------------
-        # Get the results of this oemof run.
-        results = processing.results(model_to_solve)
-        results_dict = processing.parameter_as_dict(model_to_solve)
-        df_results = processing.create_dataframe(model_to_solve)
-
-        # Loop through every component and call the result handling functions
-        for this_comp in components:
-            # Update the flows
-            this_comp.update_flows(results, sim_params)
-            # Update the states.
-            this_comp.update_states(results, sim_params)
-            # Update the costs and artificial costs.
-            this_comp.update_var_costs(results, sim_params)
-            # Update the costs and artificial costs.
-            this_comp.update_var_emissions(results, sim_params)
 
-    # Calculate the annuity for each component.
+def get_pwl_formulations(components):
+    # Get the formulation of the piecewise linear constraints ('LP' or the piecewise
+    # representation) of the components modelled by a PiecewiseTransformer, by the name of the
+    # component.
+    # Parameters:
+    #  components: List containing each component object.
+    return {this_comp.name: this_comp.model.formulation for this_comp in components
+            if hasattr(this_comp.model, 'formulation')}
+
+
+def get_interval_event(sim_params, n_commit_intervals, status, termination_condition,
+                       cache_hit, times, pwl_formulations):
+    # Get the data of the solve starting at the interval sim_params.i_interval that is passed to
+    # the observers (see smooth/framework/observers.py).
+    # Parameters:
+    #  sim_params: Simulation parameters defined by the user.
+    #  n_commit_intervals: Number of intervals of this solve whose results are kept [-].
+    #  status, termination_condition: Solver status and termination condition [str].
+    #  cache_hit: Decide if the results were taken from the interval cache [bool].
+    #  times: Start time, and times after building, solving, extracting and updating [s].
+    #  pwl_formulations: Formulation of the piecewise linear constraints of each component
+    #  (see get_pwl_formulations) [dict].
+    return {
+        'i_interval': sim_params.i_interval,
+        'n_intervals': sim_params.n_intervals,
+        'n_solve_intervals': sim_params.n_solve_intervals,
+        'n_commit_intervals': n_commit_intervals,
+        'status': str(status),
+        'termination_condition': str(termination_condition),
+        'iterations': sim_params.solver_iterations[sim_params.i_interval],
+        'cache_hit': cache_hit,
+        'time_build': times[1] - times[0],
+        'time_solve': times[2] - times[1],
+        'time_extract': times[3] - times[2],
+        'time_update': times[4] - times[3],
+        'pwl_formulations': pwl_formulations,
+    }
+
+
+def create_oemof_model(bus_names, components, sim_params):
+    # Create the oemof model for the sim_params.n_solve_intervals intervals starting at the
+    # interval sim_params.i_interval.
+    # Parameters:
+    #  bus_names: List of the bus names of the smooth model.
+    #  components: List containing each component object.
+    #  sim_params: Simulation parameters defined by the user.
+
+    # Initialize the oemof energy system for this time step.
+    i_interval = sim_params.i_interval
+    this_time_index = \
+        sim_params.date_time_index[i_interval: (i_interval + sim_params.n_solve_intervals)]
+    oemof_model = solph.EnergySystem(timeindex=this_time_index,
+                                     freq='{}min'.format(sim_params.interval_time))
+
+    # Create all busses and save them to a dict for later use in the components.
+    busses = {}
+
+    for i_bus in bus_names:
+        # Create this bus and append it to the "busses" dict.
+        busses[i_bus] = solph.Bus(label=i_bus)
+        # Add the bus to the simulation model.
+        oemof_model.add(busses[i_bus])
+
+    # Add the components (their prepare simulation step is already done).
     for this_comp in components:
-        this_comp.generate_results()
+        # Get the oemof representation of this component.
+        this_oemof_model = this_comp.create_oemof_model(busses, oemof_model)
+        if this_oemof_model is not None:
+            # Add the component to the oemof model.
+            oemof_model.add(this_oemof_model)
+        else:
+            # If None is given back, no model is supposed to be added.
+            pass
 
-    return components, status
+    model_to_solve = solph.Model(oemof_model)
+
+    for this_comp in components:
+        this_comp.update_constraints(busses, model_to_solve)
+
+    if sim_params.persistent_model:
+        # The model is reused in the following intervals, so its changing
+        # parameters have to be made mutable.
+        prepare_persistent_model(model_to_solve)
+
+    return model_to_solve, busses
@@ -0,0 +1,124 @@
+import csv
+import multiprocessing as mp
+import os
+import traceback
+import pandas as pd
+from smooth.framework.run_smooth import run_smooth
+from smooth.framework.functions.functions import set_shared_data_files
+
+# Path the components look for their csv files in, if the model does not set one.
+DEFAULT_DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'components')
+# Separators of the csv files that are detected if a model does not set one.
+CSV_SEPARATORS = (',', ';', '\t')
+# Size of the start of a csv file its separator is detected from [bytes].
+DETECT_SEPARATOR_BYTES = 4096
+
+
+def run_smooth_batch(models, n_core=None, result_function=None):
+    # Run several smooth models in parallel, e.g. site variants or scenarios of the same model.
+    # The csv files used by the models are parsed once and shared with all worker processes. The
+    # results are yielded as soon as a model is finished, so their order can differ from the
+    # order of the models. If a model fails, the error is returned as its result and the other
+    # models keep running.
+    # Parameters:
+    #  models: smooth models, either as list or as dict by model name.
+    #  n_core: Number of worker processes, all cores are used if None or 'max' [-].
+    #  result_function: Function that gets the components of a finished model and returns the
+    #   results to send back. It has to be defined at module level to be picklable. By default
+    #   the results dict of each component is returned (see get_compact_results).
+    # Yields a dict for each model with:
+    #  'name': Name of the model (its index if models is a list).
+    #  'status': Solver status of the last interval (None if the model failed).
+    #  'results': Results of the model (None if the model failed).
+    #  'error': Error message and traceback (None if the model was successful) [str].
+    if isinstance(models, dict):
+        named_models = list(models.items())
+    else:
+        named_models = list(enumerate(models))
+    if n_core is None or n_core == 'max':
+        n_core = mp.cpu_count()
+    n_core = max(1, min(n_core, len(named_models)))
+    if result_function is None:
+        result_function = get_compact_results
+
+    data_files = load_data_files([this_model for _, this_model in named_models])
+    tasks = [(name, this_model, result_function) for name, this_model in named_models]
+    with mp.Pool(processes=n_core, initializer=set_shared_data_files,
+                 initargs=(data_files,)) as pool:
+        for batch_result in pool.imap_unordered(run_batch_model, tasks):
+            yield batch_result
+
+
+def run_batch_model(task):
+    # Run one model of the batch in a worker process.
+    # Parameters:
+    #  task: Name of the model, the smooth model and the result function [tuple].
+    name, model, result_function = task
+    try:
+        components, status = run_smooth(model)
+        return {'name': name, 'status': status, 'results': result_function(components),
+                'error': None}
+    except Exception as e:
+        return {'name': name, 'status': None, 'results': None,
+                'error': '{}: {}\n{}'.format(type(e).__name__, e, traceback.format_exc())}
+
+
+def get_compact_results(components):
+    # Get the results of the components without the component objects themselves (default
+    # result function of run_smooth_batch).
+    # Parameters:
+    #  components: List containing each component object of a finished simulation.
+    return {this_comp.name: this_comp.results for this_comp in components}
+
+
+def load_data_files(models):
+    # Parse each csv file referenced by the components of the models once, so that the worker
+    # processes get the parsed tables instead of parsing the files again.
+    # Parameters:
+    #  models: smooth models [list].
+    # Returns the tables with all columns of each file by absolute file path and csv separator
+    # [dict of pandas DataFrames].
+    data_files = {}
+    for this_model in models:
+        this_components = this_model['components']
+        if isinstance(this_components, dict):
+            this_components = this_components.values()
+        for this_comp in this_components:
+            if this_comp.get('csv_filename') is None:
+                continue
+            file_path = os.path.abspath(os.path.join(
+                this_comp.get('path', DEFAULT_DATA_PATH), this_comp['csv_filename']))
+            if not os.path.isfile(file_path):
+                continue
+            # The default separator depends on the component, so it is detected from the file
+            # if the model does not set it. Components with another separator read the file
+            # themselves.
+            if this_comp.get('csv_separator') is not None:
+                csv_separators = [this_comp['csv_separator']]
+            else:
+                csv_separators = detect_csv_separators(file_path)
+            csv_separators = [this_sep for this_sep in csv_separators
+                              if (file_path, this_sep) not in data_files]
+            if csv_separators:
+                table = pd.read_csv(file_path, sep=csv_separators[0])
+                for this_sep in csv_separators:
+                    data_files[file_path, this_sep] = table
+    return data_files
+
+
+def detect_csv_separators(file_path):
+    # Detect the separator of a csv file from its first lines.
+    # Parameters:
+    #  file_path: Path of the csv file [str].
+    # Returns the separators the file can be parsed with, all of CSV_SEPARATORS if the file
+    # contains none of them (a single column), none if the separator could not be detected
+    # [list].
+    with open(file_path, newline='') as data_file:
+        content = data_file.read()
+    if not any(this_sep in content for this_sep in CSV_SEPARATORS):
+        return list(CSV_SEPARATORS)
+    try:
+        return [csv.Sniffer().sniff(content[:DETECT_SEPARATOR_BYTES],
+                                    delimiters=''.join(CSV_SEPARATORS)).delimiter]
+    except csv.Error:
+        return []
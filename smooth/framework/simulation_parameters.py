@@ -13,17 +13,102 @@ class SimulationParameters:
         self.interest_rate = 0.03
         # Decide if the running progress should be printed out.
         self.print_progress = False
+        # Objects that are notified of the progress and the timings of each interval, e.g. the
+        # ProgressBar, JsonLinesWriter and TimingCollector of smooth/framework/observers.py.
+        self.observers = []
         # Decide if last result values should be shown in case solver was not successful
         self.show_debug_flag = True
+        # Decide if the oemof model is only built in the first interval and then
+        # updated in place, instead of being rebuilt for every interval.
+        self.persistent_model = False
+        # Decide if the oemof model of the next interval is built on a worker thread while the
+        # solver is running. Its state dependent parameters are updated like those of a
+        # persistent model once the states are known (can't be combined with persistent_model
+        # or merge_tolerance).
+        self.pipelined = False
+        # Solver backend: 'cbc' (LP file and cbc process), 'highs' (in-process HiGHS via scipy)
+        # or 'pyomo_persistent' (pyomo persistent solver named in persistent_solver_name).
+        self.solver = 'cbc'
+        self.persistent_solver_name = 'appsi_highs'
+        # Decide if each interval is warm started with the solution of the last interval.
+        self.warm_start = False
+        # Number of intervals that are optimized in one solve (rolling horizon). With horizon
+        # equal to n_intervals the whole simulation is solved at once (perfect foresight).
+        self.horizon = 1
+        # Number of intervals of each solve whose results are kept before the next solve starts
+        # (the horizon is used if None).
+        self.commit_steps = None
+        # Max. number of interval solutions kept in the interval cache. If an interval has the
+        # same problem as an interval in the cache, its stored results are used instead of
+        # building and solving the model again (the cache is not used if 0).
+        self.interval_cache_size = 0
+        # Relative tolerance (share of the range of each time series) within which the inputs of
+        # consecutive intervals have to stay so that they are merged into one longer step, and
+        # the max. number of intervals per step (intervals are not merged if None). Needs a
+        # horizon of 1 and a model that is not persistent.
+        self.merge_tolerance = None
+        self.max_step_length = 24
+        # Number of typical periods that are simulated instead of the whole time span (e.g. 8
+        # typical days for a year) and the number of intervals of each period. The periods are
+        # found by clustering the input time series of all components, the costs and emissions
+        # of each period are weighted with the number of periods it represents and each period
+        # starts from the initial storage levels (all intervals are simulated if None).
+        self.typical_periods = None
+        self.period_length = 24
+        # Path of the checkpoint file the states of all components are written to every
+        # checkpoint_interval intervals and when the solver fails (no checkpoints if None).
+        self.checkpoint_file = None
+        self.checkpoint_interval = 1000
+        # Path of a checkpoint the simulation is resumed from (started from the beginning if
+        # None).
+        self.resume_from = None
+        # Number of intervals in which each piecewise representation is tried for the components
+        # with pw_repn 'auto', the fastest one is used afterwards.
+        self.pw_repn_calibration_intervals = 3
 
         # ------------------- UPDATE PARAMETER DEFAULT VALUES -------------------
         self.set_parameters(params)
+        if self.commit_steps is None:
+            self.commit_steps = self.horizon
+        if self.merge_tolerance is not None and (self.horizon != 1 or self.persistent_model):
+            raise ValueError('Intervals can only be merged (merge_tolerance) with a horizon of 1 '
+                             'and without a persistent model')
+        if self.pipelined and (self.persistent_model or self.merge_tolerance is not None):
+            raise ValueError('A pipelined simulation can not be combined with a persistent model '
+                             'or merged intervals (merge_tolerance)')
+        if not 1 <= self.commit_steps <= self.horizon:
+            raise ValueError('The simulation parameters need 1 <= commit_steps <= horizon, '
+                             'but commit_steps is {} and horizon is {}'
+                             .format(self.commit_steps, self.horizon))
+        if self.typical_periods is not None and self.period_length % self.commit_steps != 0:
+            raise ValueError('Each typical period has to start with a new solve, so the '
+                             'period_length ({}) has to be a multiple of commit_steps ({})'
+                             .format(self.period_length, self.commit_steps))
+        # Number of intervals optimized in the current solve (it is smaller than the horizon at
+        # the end of the simulation).
+        self.n_solve_intervals = min(self.horizon, self.n_intervals)
+        # Number of intervals merged into the current step (see merge_tolerance).
+        self.step_length = 1
 
         # Date time index.
         self.date_time_index = func.get_date_time_index(
             self.start_date, self.n_intervals, self.interval_time)
         # Time span of the simulation [min].
         self.sim_time_span = func.get_sim_time_span(self.n_intervals, self.interval_time)
+        # Number of solver iterations of each interval, filled during the simulation (None if the
+        # solver does not report it).
+        self.solver_iterations = [None] * self.n_intervals
+        # Usage statistics of the interval cache (hits, misses, evictions, hit rate), filled at
+        # the end of the simulation if the cache is used.
+        self.interval_cache_stats = None
+        # Weight of each interval, the original periods represented by each typical period and
+        # their number (set if typical_periods is used).
+        self.interval_weights = None
+        self.typical_period_indices = None
+        self.typical_period_weights = None
+        # Solve times of each piecewise representation in the calibration intervals [s], by
+        # the representation (filled if a component has pw_repn 'auto').
+        self.pw_repn_solve_times = {}
 
     def set_parameters(self, params):
         for this_param in params:
@@ -0,0 +1,291 @@
+import warnings
+import numpy as np
+import pyomo.environ as po
+from pyomo.opt import SolverResults, SolverStatus, TerminationCondition
+from pyomo.repn import generate_standard_repn
+
+
+def get_solution(model):
+    # Get the values of all free variables of a solved model by variable name, e.g. to warm start
+    # the model of the next interval.
+    # Parameters:
+    #  model: oemof model (solph.Model) [object].
+    return {var.name: var.value for var in model.component_data_objects(po.Var)
+            if not var.fixed and var.value is not None}
+
+
+def set_start_values(model, solution):
+    # Set the values of the free variables of a model as start values for the solver. The models
+    # of all intervals have the same structure, so the variables can be matched by name.
+    # Parameters:
+    #  model: oemof model (solph.Model) [object].
+    #  solution: Variable values by variable name (see get_solution) [dict].
+    for var in model.component_data_objects(po.Var):
+        if not var.fixed and var.name in solution:
+            set_value_unchecked(var, solution[var.name])
+
+
+def set_value_unchecked(var, value):
+    # Set the value of a variable without checking its domain (solver values can be slightly out
+    # of bounds). The keyword was renamed from "valid" (pyomo 5.6, used by oemof 0.3) to
+    # "skip_validation" (pyomo 5.7).
+    # Parameters:
+    #  var: Pyomo variable [object].
+    #  value: New value of the variable.
+    try:
+        var.set_value(value, skip_validation=True)
+    except TypeError:
+        var.set_value(value, valid=True)
+
+
+def get_solver(sim_params):
+    # Create the solver backend chosen in the simulation parameters.
+    # Parameters:
+    #  sim_params: Simulation parameters defined by the user [object].
+    if sim_params.solver == 'cbc':
+        solver = CbcSolver()
+    elif sim_params.solver == 'highs':
+        solver = HighsSolver()
+    elif sim_params.solver == 'pyomo_persistent':
+        solver = PyomoPersistentSolver(sim_params.persistent_solver_name)
+    else:
+        raise ValueError('The solver "{}" is not supported, choose between "cbc", "highs" and '
+                         '"pyomo_persistent"'.format(sim_params.solver))
+    if sim_params.warm_start and not solver.supports_warm_start:
+        warnings.warn('The solver "{}" can\'t be warm started, the simulation parameter '
+                      'warm_start has no effect'.format(sim_params.solver))
+    return solver
+
+
+class Solver:
+    # Base class of the solver backends used by run_smooth. Each backend solves an oemof model
+    # (solph.Model), loads the solution into its variables and returns the solver status and the
+    # termination condition (e.g. 'ok' and 'optimal').
+
+    # Decide if the backend passes start values to the solver (see warm_start of solve).
+    supports_warm_start = True
+
+    def __init__(self):
+        # Number of iterations of the last solve (None if the backend does not report it).
+        self.iterations = None
+
+    def solve(self, model, warm_start=False):
+        # Solve the model and load the solution.
+        # Parameters:
+        #  model: oemof model (solph.Model) [object].
+        #  warm_start: Decide if the current variable values are passed to the solver as start
+        #   solution (MIP start) [bool].
+        raise NotImplementedError
+
+
+class CbcSolver(Solver):
+    # Solve each interval with cbc, using an LP file and a cbc subprocess (oemof default). If
+    # warm started, cbc gets the current variable values as MIP start.
+
+    def solve(self, model, warm_start=False):
+        oemof_results = model.solve(
+            solver='cbc', solve_kwargs={'tee': False, 'warmstart': warm_start})
+        status = oemof_results["Solver"][0]["Status"].key
+        termination_condition = oemof_results["Solver"][0]["Termination condition"].key
+        iterations = oemof_results.solver.statistics.black_box.number_of_iterations
+        # Pyomo 5.6 stores the number itself, newer versions a result entry.
+        iterations = getattr(iterations, 'value', iterations)
+        self.iterations = iterations if isinstance(iterations, int) else None
+        return status, termination_condition
+
+
+class HighsSolver(Solver):
+    # Solve each interval in-process with HiGHS via scipy (scipy.optimize.linprog for linear and
+    # scipy.optimize.milp for mixed integer problems). The pyomo model is converted to sparse
+    # matrices directly, no problem file is written and no process is started. scipy does not
+    # accept start solutions, so warm_start has no effect. scipy is only imported when this
+    # backend is chosen, since scipy.optimize.milp needs scipy 1.9 (Python 3.8) or newer.
+
+    supports_warm_start = False
+
+    # Mapping of the scipy.optimize.milp/linprog status to the pyomo solver status and termination
+    # condition.
+    STATUS = {
+        0: (SolverStatus.ok, TerminationCondition.optimal),
+        1: (SolverStatus.aborted, TerminationCondition.maxIterations),
+        2: (SolverStatus.warning, TerminationCondition.infeasible),
+        3: (SolverStatus.warning, TerminationCondition.unbounded),
+        4: (SolverStatus.error, TerminationCondition.error),
+    }
+
+    def __init__(self, time_limit=None):
+        super().__init__()
+        # Maximum time per interval [s] (no limit if None).
+        self.time_limit = time_limit
+        try:
+            from scipy.optimize import milp  # noqa: F401
+        except ImportError:
+            raise ImportError('The solver "highs" needs scipy 1.9 or newer '
+                              '(scipy.optimize.milp), choose another solver or update scipy')
+
+    def solve(self, model, warm_start=False):
+        from scipy.optimize import milp, Bounds, LinearConstraint
+        from scipy.sparse import coo_matrix
+
+        # ------------------- CONVERT THE MODEL TO MATRICES -------------------
+        # Columns of the problem, fixed variables are treated as constants by pyomo.
+        variables = []
+        column = {}
+
+        def get_column(var):
+            if id(var) not in column:
+                column[id(var)] = len(variables)
+                variables.append(var)
+            return column[id(var)]
+
+        # Objective.
+        objective = next(model.component_data_objects(po.Objective, active=True))
+        repn = generate_standard_repn(objective.expr, quadratic=False)
+        if not repn.is_linear():
+            raise ValueError('The HiGHS backend only supports linear objectives')
+        sense = 1 if objective.sense == po.minimize else -1
+        cost_columns = [get_column(var) for var in repn.linear_vars]
+        cost_values = [sense * coef for coef in repn.linear_coefs]
+
+        # Constraints.
+        if next(model.component_data_objects(po.SOSConstraint, active=True), None) is not None:
+            raise ValueError('The HiGHS backend does not support SOS constraints')
+        rows, cols, coefs, row_lb, row_ub = [], [], [], [], []
+        for constraint in model.component_data_objects(
+                po.Constraint, active=True, descend_into=True):
+            repn = generate_standard_repn(constraint.body, quadratic=False)
+            if not repn.is_linear():
+                raise ValueError('The HiGHS backend only supports linear constraints, "{}" is '
+                                 'nonlinear'.format(constraint.name))
+            lower = -np.inf if constraint.lower is None else \
+                po.value(constraint.lower) - repn.constant
+            upper = np.inf if constraint.upper is None else \
+                po.value(constraint.upper) - repn.constant
+            if len(repn.linear_vars) == 0:
+                # Constraints without free variables only have to be checked.
+                if lower > 1e-9 or upper < -1e-9:
+                    return self.set_results(model, 2)
+                continue
+            i_row = len(row_lb)
+            for var, coef in zip(repn.linear_vars, repn.linear_coefs):
+                rows.append(i_row)
+                cols.append(get_column(var))
+                coefs.append(coef)
+            row_lb.append(lower)
+            row_ub.append(upper)
+
+        # Variable bounds and integrality.
+        n_vars = len(variables)
+        c = np.zeros(n_vars)
+        np.add.at(c, cost_columns, cost_values)
+        var_lb = np.array([-np.inf if var.lb is None else var.lb for var in variables])
+        var_ub = np.array([np.inf if var.ub is None else var.ub for var in variables])
+        # Binaries are no integers in pyomo 5.6.
+        integrality = np.array([var.is_integer() or var.is_binary() for var in variables],
+                               dtype=int)
+
+        constraints = None
+        if row_lb:
+            matrix = coo_matrix((coefs, (rows, cols)), shape=(len(row_lb), n_vars)).tocsr()
+            constraints = LinearConstraint(matrix, np.array(row_lb), np.array(row_ub))
+
+        # ------------------- SOLVE AND LOAD THE SOLUTION -------------------
+        options = {}
+        if self.time_limit is not None:
+            options['time_limit'] = self.time_limit
+        if integrality.any():
+            res = milp(c, integrality=integrality, bounds=Bounds(var_lb, var_ub),
+                       constraints=constraints, options=options)
+            # scipy only reports the branch and bound nodes of mixed integer problems.
+            self.iterations = None
+        else:
+            res = self.solve_lp(c, var_lb, var_ub, constraints, options)
+            self.iterations = res.nit
+        if res.x is not None:
+            for var, var_value, is_integer in zip(variables, res.x, integrality):
+                set_value_unchecked(var, round(var_value) if is_integer else var_value)
+        return self.set_results(model, res.status)
+
+    @staticmethod
+    def solve_lp(c, var_lb, var_ub, constraints, options):
+        # Solve a linear problem with scipy.optimize.linprog, which also reports the number of
+        # simplex iterations. The rows with lower and upper bounds are split up into equality
+        # and upper bound constraints.
+        from scipy.optimize import linprog
+        from scipy.sparse import vstack
+
+        a_eq = b_eq = a_ub = b_ub = None
+        if constraints is not None:
+            matrix, lower, upper = constraints.A, constraints.lb, constraints.ub
+            is_eq = lower == upper
+            is_ub = ~is_eq & np.isfinite(upper)
+            is_lb = ~is_eq & np.isfinite(lower)
+            if is_eq.any():
+                a_eq, b_eq = matrix[is_eq], upper[is_eq]
+            if is_ub.any() or is_lb.any():
+                a_ub = vstack([matrix[is_ub], -matrix[is_lb]])
+                b_ub = np.concatenate([upper[is_ub], -lower[is_lb]])
+        res = linprog(c, A_ub=a_ub, b_ub=b_ub, A_eq=a_eq, b_eq=b_eq,
+                      bounds=np.column_stack([var_lb, var_ub]), method='highs',
+                      options=options)
+        return res
+
+    def set_results(self, model, scipy_status):
+        # Save the solver results to the model like oemof does and return the solver status and
+        # the termination condition.
+        # Parameters:
+        #  model: oemof model (solph.Model) [object].
+        #  scipy_status: Status returned by scipy.optimize.milp/linprog [int].
+        status, termination_condition = self.STATUS[scipy_status]
+        results = SolverResults()
+        results.solver.name = 'highs'
+        results.solver.status = status
+        results.solver.termination_condition = termination_condition
+        model.es.results = results
+        model.solver_results = results
+        return str(status), str(termination_condition)
+
+
+class PyomoPersistentSolver(Solver):
+    # Solve each interval with a pyomo persistent solver (e.g. 'appsi_highs', 'gurobi_persistent'),
+    # which is kept in memory over the whole simulation. The appsi solvers detect changed
+    # parameters, bounds and constraints of a persistent oemof model (sim_params.persistent_model)
+    # themselves and only update those. The older persistent interfaces are loaded with the
+    # model in every interval.
+
+    def __init__(self, solver_name):
+        super().__init__()
+        # Name of the pyomo solver [str].
+        self.solver_name = solver_name
+        self.solver = po.SolverFactory(solver_name)
+        if not self.solver.available(exception_flag=False):
+            raise ValueError('The pyomo solver "{}" is not available'.format(solver_name))
+        # The appsi solvers can be recognized by their update configuration.
+        self.is_appsi = hasattr(self.solver, 'update_config')
+
+    def solve(self, model, warm_start=False):
+        if not self.is_appsi:
+            self.solver.set_instance(model)
+        results = self.solver.solve(model, load_solutions=False, warmstart=warm_start)
+        self.iterations = self.get_iterations(results)
+        status = str(results.solver.status)
+        termination_condition = str(results.solver.termination_condition)
+        if termination_condition == 'optimal':
+            if self.is_appsi:
+                model.solutions.load_from(results)
+            else:
+                self.solver.load_vars()
+        model.es.results = results
+        model.solver_results = results
+        return status, termination_condition
+
+    def get_iterations(self, results):
+        # Get the number of iterations of the last solve, if the solver reports it.
+        # Parameters:
+        #  results: pyomo solver results [object].
+        solver_model = getattr(self.solver, '_solver_model', None)
+        if hasattr(solver_model, 'getInfo'):
+            # HiGHS (appsi_highs)
+            return solver_model.getInfo().simplex_iteration_count
+        iterations = results.solver.statistics.black_box.number_of_iterations.value
+        return iterations if isinstance(iterations, int) else None
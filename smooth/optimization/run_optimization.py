@@ -167,10 +167,7 @@ This blocks the process, so no new data is received, but user events are still p
 """
 
 import multiprocessing as mp
-from tkinter import TclError
 import random
-import matplotlib.pyplot as plt  # only needed when plot_progress is set
-import dill
 
 from smooth import run_smooth
 
@@ -450,6 +447,9 @@ def fitness_function(
     for i, av in enumerate(attribute_variation):
         model['components'][av.comp_name][av.comp_attribute] = individual[i]
 
+    # Imported here, so that it is only loaded when the optimization runs.
+    import dill
+
     # Now that the model is updated according to the genes given by the GA, run smooth
     try:
         smooth_result = run_smooth(model)[0]
@@ -496,6 +496,9 @@ class PlottingProcess(mp.Process):
         Loops while exit_flag is not set and user has not closed window.
         Checks periodically for new data to be displayed.
         """
+        # only needed when plot_progress is set, so imported here
+        from tkinter import TclError
+        import matplotlib.pyplot as plt
 
         # start of main loop: no results yet
         plt.title("Waiting for first results...")
@@ -613,6 +616,8 @@ class PlottingProcess(mp.Process):
         self.pipe = pipe
         self.attribute_variation = attribute_variation
         self.objective_names = objective_names
+        # only needed when plot_progress is set, so imported here
+        import matplotlib.pyplot as plt
         self.fig, self.ax = plt.subplots()
         self.points = None
         self.annot = None
@@ -758,6 +763,9 @@ class Optimization:
         """Compute fitness of every individual in `population` with `n_core` worker threads.
         Remove invalid indivuals from `population`
         """
+        # Imported here, so that it is only loaded when the optimization runs.
+        import dill
+
         # open n_core worker threads
         pool = mp.Pool(processes=self.n_core)
         # set objective functions for each worker
@@ -0,0 +1,47 @@
+"""
+Tests of the simplification of piecewise linear curves.
+"""
+import numpy as np
+import pytest
+
+from smooth.components.component_functions.breakpoints import \
+    apply_tolerance, simplify_breakpoints
+
+
+def test_linear_curve():
+    x = np.linspace(0, 10, 101)
+    indices, report = simplify_breakpoints(x, {'y': 3 * x + 1}, 1e-6)
+    assert indices == [0, 100]
+    assert report['n_breakpoints'] == 2
+    assert report['n_binaries'] == 1
+    assert report['max_error'] == pytest.approx(0, abs=1e-12)
+
+
+def test_tolerance():
+    x = np.linspace(0, 1, 1001)
+    curves = {'sqrt': np.sqrt(x), 'square': 1000 * x ** 2}
+    n_breakpoints = []
+    for tolerance in [1e-1, 1e-2, 1e-3]:
+        indices, report = simplify_breakpoints(x, curves, tolerance)
+        assert report['max_error'] <= tolerance
+        assert report['n_samples'] == 1001
+        # Check the error of both curves, each relative to its range.
+        for y in curves.values():
+            error = np.abs(np.interp(x, x[indices], y[indices]) - y) / np.ptp(y)
+            assert np.max(error) <= report['max_error'] + 1e-12
+        n_breakpoints.append(report['n_breakpoints'])
+    # A smaller tolerance needs more breakpoints.
+    assert n_breakpoints == sorted(n_breakpoints)
+    assert n_breakpoints[0] < n_breakpoints[-1]
+
+
+def test_apply_tolerance():
+    in_values = [0, 1, 2, 3]
+    out_values = {'y': [0, 1, 2, 5]}
+    # Without a tolerance all breakpoints are kept.
+    assert apply_tolerance(in_values, out_values, None) == (in_values, out_values, None)
+    # The breakpoint on the straight line between its neighbours is dropped.
+    in_kept, out_kept, report = apply_tolerance(in_values, out_values, 1e-9)
+    assert in_kept == [0, 2, 3]
+    assert out_kept == {'y': [0, 2, 5]}
+    assert report['n_breakpoints'] == 3
@@ -0,0 +1,30 @@
+"""
+Tests of the component states written to checkpoints.
+"""
+import pickle
+
+from smooth.components.component import Component
+
+
+class Node:
+    # Stands in for the oemof node of the current model.
+    pass
+
+
+def test_checkpoint_state_without_model():
+    this_comp = Component()
+    this_comp.name = 'comp'
+    this_comp.model = Node()
+    this_comp.states['storage_level'] = [1.0, 2.0]
+    state = this_comp.get_checkpoint_state()
+    # The node of the model is created again when the simulation is resumed.
+    assert 'model' not in state
+    assert state['states'] == {'storage_level': [1.0, 2.0]}
+    assert pickle.loads(pickle.dumps(state))['states'] == state['states']
+
+    # Checkpoints with the node don't replace the node of the resumed simulation.
+    resumed = Component()
+    resumed.model = None
+    resumed.set_checkpoint_state(dict(state, model=Node()))
+    assert resumed.model is None
+    assert resumed.states == {'storage_level': [1.0, 2.0]}
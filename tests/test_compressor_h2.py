@@ -0,0 +1,47 @@
+"""
+Tests of the hydrogen compressor and the compressibility factor of hydrogen.
+"""
+import numpy as np
+import pytest
+
+from smooth.components.component_functions.component_functions import \
+    COMPRESSIBILITY_FACTORS, COMPRESSIBILITY_PRESSURES, COMPRESSIBILITY_TEMPERATURES, \
+    calculate_compressibility_factor, get_compressibility_factor
+
+
+def test_compressibility_factor():
+    # The table values are met at the grid points.
+    temperature, pressure = np.meshgrid(COMPRESSIBILITY_TEMPERATURES, COMPRESSIBILITY_PRESSURES,
+                                        indexing='ij')
+    assert get_compressibility_factor(pressure, temperature) == pytest.approx(
+        COMPRESSIBILITY_FACTORS)
+    # Linear between them, the closest edge outside of the table.
+    assert get_compressibility_factor(30, 300) == pytest.approx((1.0117 + 1.0236) / 2)
+    assert get_compressibility_factor(2000, 100) == pytest.approx(1.936)
+    assert isinstance(get_compressibility_factor(30, 300), float)
+    # Arrays of pressures and temperatures give the same values as single calls.
+    pressures = np.array([5, 350, 700])
+    assert get_compressibility_factor(pressures, 293.15) == pytest.approx(
+        [get_compressibility_factor(p, 293.15) for p in pressures])
+    z_in, z_out = calculate_compressibility_factor(40, 700, 293.15, 353.15)
+    assert z_in == pytest.approx(get_compressibility_factor(40, 293.15))
+    assert z_out == pytest.approx(get_compressibility_factor(700, 353.15))
+
+
+def test_spec_compression_energy():
+    pytest.importorskip('oemof.solph')
+    from smooth.components.component_compressor_h2 import CompressorH2
+    from smooth.framework.simulation_parameters import SimulationParameters
+    compressor = CompressorH2({
+        'name': 'compressor', 'bus_h2_in': 'bh2_lp', 'bus_h2_out': 'bh2_hp', 'bus_el': 'bel',
+        'fs_component_name': [None, None], 'fs_attribute_name': [40, 700],
+        'sim_params': SimulationParameters({})})
+    compressor.prepare_simulation([])
+    assert compressor.spec_compression_energy == pytest.approx(
+        compressor.get_spec_compression_energy(40, 700))
+    assert compressor.spec_compression_energy > 0
+    # The energy of the same (rounded) pressures is reused.
+    compressor.spec_compression_energies[(40000, 700000)] = 1.0
+    compressor.prepare_simulation([])
+    assert compressor.spec_compression_energy == 1.0
+    assert compressor.get_spec_compression_energy(40, 40.005) == 0
@@ -0,0 +1,156 @@
+"""
+Tests of the vectorized electrolyzer model against the scalar fixed point iteration.
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip('oemof.solph')
+
+from smooth.components.component_electrolyzer import Electrolyzer  # noqa: E402
+from smooth.components.component_electrolyzer_waste_heat import \
+    ElectrolyzerWasteHeat  # noqa: E402
+from smooth.components.component_functions import electrolyzer_surface  # noqa: E402
+from smooth.components.component_functions.piecewise_transformer import \
+    get_formulation  # noqa: E402
+from smooth.framework.simulation_parameters import SimulationParameters  # noqa: E402
+
+
+def create_electrolyzer(component_class=Electrolyzer, **params):
+    params = dict(name='ely', bus_el='bel', bus_h2='bh2',
+                  sim_params=SimulationParameters({}), **params)
+    return component_class(params)
+
+
+def get_reference_breakpoints(ely):
+    # Breakpoints calculated one by one with the scalar fixed point iteration.
+    energies = [i / 10 * ely.energy_max for i in range(11)]
+    h2_produced = []
+    temperatures = []
+    for this_energy in energies:
+        power = this_energy / 1000 / (ely.interval_time / 60)
+        cur_dens = min(ely.get_electricity_by_power(power), ely.cur_dens_max)
+        h2_produced.append(ely.get_mass_produced_by_current_state(cur_dens))
+        temperatures.append(ely.get_cell_temp(cur_dens))
+    return energies, h2_produced, temperatures
+
+
+@pytest.mark.parametrize('temperature', [293.15, 318.15, 353.15])
+def test_cur_dens_by_power(temperature):
+    ely = create_electrolyzer()
+    ely.temperature = temperature
+    powers = np.linspace(0, ely.power_max / 1000, 21)
+    reference = [ely.get_electricity_by_power(this_power) for this_power in powers]
+    # Newton's method finds the current densities of the fixed point iteration within its
+    # tolerance, for arrays and single values.
+    assert ely.get_cur_dens_by_power(powers) == pytest.approx(reference, rel=1e-6, abs=1e-12)
+    assert ely.get_cur_dens_by_power(powers[5]) == pytest.approx(reference[5], rel=1e-6)
+
+
+def test_cur_dens_not_found():
+    ely = create_electrolyzer()
+    # The voltage model is not defined at this temperature.
+    with pytest.raises(ValueError, match='"ely".* 60.0 kW .* 10000.0 K'):
+        ely.get_cur_dens_by_power(np.array([0, 60]), 1e4)
+
+
+@pytest.mark.parametrize('component_class, params', [
+    (Electrolyzer, {}), (ElectrolyzerWasteHeat, {'bus_th': 'bth'})])
+def test_breakpoints(component_class, params):
+    ely = create_electrolyzer(component_class, **params)
+    ely.temperature = 330
+    ely.update_nonlinear_behaviour()
+    energies, h2_produced, temperatures = get_reference_breakpoints(ely)
+    # The energy breakpoints have to be exactly the same, they are used to look up the
+    # production in the conversion function.
+    assert ely.supporting_points['energy'] == energies
+    assert ely.supporting_points['h2_produced'] == pytest.approx(h2_produced, rel=1e-6)
+    assert ely.supporting_points['temperature'] == pytest.approx(temperatures, rel=1e-6)
+    if component_class is ElectrolyzerWasteHeat:
+        waste_heat = [ely.get_waste_heat(energy / 1000, mass, temp) * 1000
+                      for energy, mass, temp in zip(energies, h2_produced, temperatures)]
+        assert ely.supporting_points['thermal_energy'] == pytest.approx(
+            waste_heat, rel=1e-5, abs=1e-6)
+
+
+def test_surface_cache(tmp_path):
+    ely = create_electrolyzer(surface_cache_dir=str(tmp_path))
+    electrolyzer_surface.surfaces.clear()
+    ely.update_nonlinear_behaviour()
+    assert len(list(tmp_path.glob('*.npz'))) == 1
+    # Another process (simulated by clearing the memory) loads the surface from the disk.
+    electrolyzer_surface.surfaces.clear()
+    other_ely = create_electrolyzer(ElectrolyzerWasteHeat, bus_th='bth',
+                                    surface_cache_dir=str(tmp_path))
+    other_ely.update_nonlinear_behaviour()
+    assert len(electrolyzer_surface.surfaces) == 1
+    assert other_ely.supporting_points['h2_produced'] == ely.supporting_points['h2_produced']
+
+
+def test_invalid_surface_not_cached(tmp_path, monkeypatch):
+    ely = create_electrolyzer(surface_cache_dir=str(tmp_path))
+    electrolyzer_surface.surfaces.clear()
+    ely.update_nonlinear_behaviour()
+    file_path, = tmp_path.glob('*.npz')
+    surface = dict(np.load(str(file_path)))
+    # A surface with a current density that was not found is not used from the disk cache.
+    electrolyzer_surface.surfaces.clear()
+    invalid_surface = dict(surface, cur_dens=surface['cur_dens'].copy())
+    invalid_surface['cur_dens'][3, 5] = np.nan
+    np.savez(str(file_path), **invalid_surface)
+    ely.update_nonlinear_behaviour()
+    assert np.array_equal(dict(np.load(str(file_path)))['cur_dens'], surface['cur_dens'])
+    # Nor is it cached at all.
+    electrolyzer_surface.surfaces.clear()
+    file_path.unlink()
+    monkeypatch.setattr(electrolyzer_surface, 'build_surface', lambda *args: invalid_surface)
+    with pytest.raises(ValueError, match='"ely"'):
+        ely.update_nonlinear_behaviour()
+    assert not electrolyzer_surface.surfaces
+    assert not list(tmp_path.glob('*.npz'))
+
+
+@pytest.mark.parametrize('temperature', [293.15, 301.337, 353.15, 360])
+def test_surface_interpolation(temperature):
+    ely = create_electrolyzer()
+    ely.temperature = temperature
+    powers = np.arange(11) / 10 * ely.power_max / 1000
+    # Within the surface the current densities are interpolated, outside they are calculated.
+    assert ely.get_breakpoint_cur_dens(10) == pytest.approx(
+        ely.get_cur_dens_by_power(powers), rel=1e-6)
+
+
+@pytest.mark.parametrize('power_max', [1e4, 1e5, 3.7e5, 2e6])
+def test_z_cell(power_max):
+    ely = create_electrolyzer(power_max=power_max)
+    z_cell = ely.z_cell
+    # The estimated number of cells is the smallest one found by counting up from one cell.
+    for ely.z_cell in [z_cell - 1, z_cell]:
+        cur_dens = ely.get_electricity_by_power(ely.power_max / 1000, ely.temp_max)
+        is_valid = cur_dens is not None and cur_dens < ely.cur_dens_max
+        assert is_valid == (ely.z_cell == z_cell)
+
+
+def test_pwl_tolerance():
+    # The breakpoints are chosen from the densely sampled curve and stay within the tolerance.
+    ely = create_electrolyzer(power_max=1000000, pwl_tolerance=1e-3)
+    ely.update_nonlinear_behaviour()
+    assert ely.pwl_report['n_samples'] == 101
+    assert ely.pwl_report['n_breakpoints'] == len(ely.supporting_points['energy'])
+    assert ely.pwl_report['max_error'] <= 1e-3
+
+    dense = create_electrolyzer(power_max=1000000, pwl_tolerance=0)
+    dense.update_nonlinear_behaviour()
+    h2_produced = np.interp(dense.supporting_points['energy'], ely.supporting_points['energy'],
+                            ely.supporting_points['h2_produced'])
+    error = np.abs(h2_produced - dense.supporting_points['h2_produced'])
+    assert np.max(error) <= 1e-3 * np.ptp(dense.supporting_points['h2_produced'])
+
+
+@pytest.mark.parametrize('temperature', [293.15, 330, 353.15])
+def test_formulation(temperature):
+    # The hydrogen production is a concave function of the energy, so no binaries are needed.
+    ely = create_electrolyzer()
+    ely.temperature = temperature
+    ely.update_nonlinear_behaviour()
+    assert get_formulation(ely.supporting_points['energy'],
+                           {'h2': ely.supporting_points['h2_produced']}) == 'LP'
@@ -0,0 +1,46 @@
+"""
+Tests that importing smooth does not load the plotting and optimization packages.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+import smooth
+
+HEAVY_PACKAGES = ['matplotlib', 'tkinter', 'bokeh', 'seaborn', 'plotly', 'dill']
+
+
+def get_loaded_packages(statement, packages=HEAVY_PACKAGES):
+    # Run the statement in a new process and return the packages of the list it loaded.
+    code = '{}\nimport sys\nprint(",".join(name for name in {!r} if name in sys.modules))'.format(
+        statement, packages)
+    repo_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', code], cwd=repo_path,
+                            stdout=subprocess.PIPE, universal_newlines=True,
+                            check=True).stdout
+    return [name for name in output.strip().split(',') if name]
+
+
+def test_import_smooth_is_lazy():
+    assert get_loaded_packages('import smooth') == []
+
+
+def test_public_functions():
+    # All public functions are still available from the package.
+    for name in smooth.__all__:
+        assert name in dir(smooth)
+    assert smooth.print_smooth_results.__name__ == 'print_smooth_results'
+
+
+def test_solver_imports_scipy_lazily(monkeypatch):
+    pytest.importorskip('pyomo.environ')
+    # The solver backends can be imported without scipy.optimize (e.g. for cbc).
+    assert get_loaded_packages('import smooth.framework.solver', ['scipy.optimize']) == []
+    # Only the HiGHS backend needs scipy.optimize.milp (scipy 1.9 or newer).
+    scipy_optimize = pytest.importorskip('scipy.optimize')
+    from smooth.framework.solver import HighsSolver
+    monkeypatch.delattr(scipy_optimize, 'milp', raising=False)
+    with pytest.raises(ImportError, match='scipy 1.9'):
+        HighsSolver()
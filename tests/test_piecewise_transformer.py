@@ -0,0 +1,134 @@
+"""
+Tests of the breakpoints of the components modelled with a PiecewiseTransformer.
+"""
+import numpy as np
+import pytest
+
+solph = pytest.importorskip('oemof.solph')
+
+from smooth.components.component_fuel_cell_chp import FuelCellChp  # noqa: E402
+from smooth.components.component_pem_electrolyzer import PemElectrolyzer  # noqa: E402
+from smooth.components.component_functions.piecewise_transformer import \
+    PiecewiseTransformer, get_common_breakpoints, get_formulation, get_n_bits, \
+    get_part_flows  # noqa: E402
+from smooth.framework.simulation_parameters import SimulationParameters  # noqa: E402
+
+
+def test_common_breakpoints():
+    in_breakpoints, out_breakpoints = get_common_breakpoints(
+        {'a': [0, 2, 4], 'b': [1, 3, 5]}, {'a': [0, 4, 6], 'b': [1, 2, 3]})
+    # Only the range both curves have in common is kept.
+    assert in_breakpoints == [1, 2, 3, 4]
+    assert out_breakpoints['a'] == [2, 4, 5, 6]
+    assert out_breakpoints['b'] == [1, 1.5, 2, 2.5]
+
+    with pytest.raises(ValueError):
+        get_common_breakpoints({'a': [0, 1], 'b': [2, 3]}, {'a': [0, 1], 'b': [0, 1]})
+
+
+def test_component_curves():
+    # The common breakpoints describe exactly the curves of the separate outputs.
+    fuel_cell = FuelCellChp({'name': 'chp', 'bus_h2': 'bh2', 'bus_el': 'bel', 'bus_th': 'bth',
+                             'power_max': 100000, 'sim_params': SimulationParameters({})})
+    h2_consumed = np.linspace(0, fuel_cell.h2_input_max, 1000)
+    assert np.interp(h2_consumed, fuel_cell.bp_h2_consumed, fuel_cell.bp_energy_electric_common) \
+        == pytest.approx(np.interp(h2_consumed, fuel_cell.bp_h2_consumed_electric,
+                                   fuel_cell.bp_energy_electric))
+    assert np.interp(h2_consumed, fuel_cell.bp_h2_consumed, fuel_cell.bp_energy_thermal_common) \
+        == pytest.approx(np.interp(h2_consumed, fuel_cell.bp_h2_consumed_thermal,
+                                   fuel_cell.bp_energy_thermal))
+
+    # The PEM electrolyzer can only run in the load range of both curves.
+    pem = PemElectrolyzer({'name': 'pem', 'bus_el': 'bel', 'bus_h2': 'bh2', 'bus_th': 'bth',
+                           'sim_params': SimulationParameters({})})
+    assert pem.bp_elec_consumed[0] == pytest.approx(pem.bp_elec_consumed_waste_heat[0])
+    assert pem.bp_elec_consumed[-1] == pytest.approx(pem.power_max)
+
+
+def test_pwl_tolerance():
+    params = {'name': 'chp', 'bus_h2': 'bh2', 'bus_el': 'bel', 'bus_th': 'bth',
+              'power_max': 100000, 'sim_params': SimulationParameters({})}
+    fuel_cell = FuelCellChp(params)
+    simplified = FuelCellChp(dict(params, pwl_tolerance=0.05))
+    assert fuel_cell.pwl_report is None
+    assert simplified.pwl_report['n_breakpoints'] == len(simplified.bp_h2_consumed)
+    assert len(simplified.bp_h2_consumed) < len(fuel_cell.bp_h2_consumed)
+    assert simplified.pwl_report['max_error'] <= 0.05
+
+
+def test_formulation():
+    x = [0, 1, 2, 3]
+    # Concave curves (also linear ones) can be modelled as an LP.
+    assert get_formulation(x, {'a': [0, 2, 3, 3.5], 'b': [0, 1, 2, 3]}) == 'LP'
+    # A single convex section needs the convex combination formulation.
+    assert get_formulation(x, {'a': [0, 2, 3, 3.5], 'b': [0, 1, 2, 4]}) == 'CC'
+
+    # The efficiency of the fuel cell rises with the load at first, so it is not concave.
+    fuel_cell = FuelCellChp({'name': 'chp', 'bus_h2': 'bh2', 'bus_el': 'bel', 'bus_th': 'bth',
+                             'power_max': 100000, 'sim_params': SimulationParameters({})})
+    assert get_formulation(fuel_cell.bp_h2_consumed, {
+        'electric': fuel_cell.bp_energy_electric_common}) == 'CC'
+
+
+def test_pw_repn():
+    x = [0, 1, 2, 3]
+    # The representation is only used if the curves are not concave.
+    assert get_formulation(x, {'a': [0, 1, 2, 4]}, 'LOG') == 'LOG'
+    assert get_formulation(x, {'a': [0, 2, 3, 3.5]}, 'LOG') == 'LP'
+    # The log. representation numbers the segments with as few bits as possible.
+    assert [get_n_bits(n_segments) for n_segments in [1, 2, 3, 4, 5, 11]] == [1, 1, 2, 2, 3, 4]
+
+    bus_in, bus_out = solph.Bus(label='b_in'), solph.Bus(label='b_out')
+    with pytest.raises(ValueError, match='piecewise representation'):
+        PiecewiseTransformer(label='pt', inputs={bus_in: solph.Flow()},
+                             outputs={bus_out: solph.Flow()}, in_breakpoints=x,
+                             out_breakpoints={bus_out: [0, 1, 2, 4]}, pw_repn='XY')
+
+
+def solve_wasting_outputs(allow_lp):
+    # Solve a model of a transformer with a concave curve whose outputs are minimized at fixed
+    # inputs, so the optimizer benefits from taking the input without producing the output.
+    po = pytest.importorskip('pyomo.environ')
+    solver_names = [name for name in ['cbc', 'appsi_highs', 'glpk']
+                    if po.SolverFactory(name).available(exception_flag=False)]
+    if not solver_names:
+        pytest.skip('No MILP solver is available')
+    bus_in, bus_out = solph.Bus(label='b_in'), solph.Bus(label='b_out')
+    x = [0, 1, 2, 3]
+    y = [0, 2, 3, 3.5]
+    node = PiecewiseTransformer(label='pt', inputs={bus_in: solph.Flow()},
+                                outputs={bus_out: solph.Flow()}, in_breakpoints=x,
+                                out_breakpoints={bus_out: y}, allow_lp=allow_lp)
+    model = po.ConcreteModel()
+    model.TIMESTEPS = po.Set(initialize=[0, 1, 2])
+    model.FLOWS = po.Set(dimen=2, initialize=[(bus_in, node), (node, bus_out)])
+    model.flow = po.Var(model.FLOWS, model.TIMESTEPS, within=po.NonNegativeReals)
+    block = node.constraint_group()()
+    model.add_component('PiecewiseTransformerBlock', block)
+    block._create(group=[node])
+    inputs = [0.5, 1.5, 3]
+    for t, value in enumerate(inputs):
+        model.flow[bus_in, node, t].fix(value)
+    model.objective = po.Objective(expr=sum(model.flow[node, bus_out, t]
+                                            for t in model.TIMESTEPS))
+    po.SolverFactory(solver_names[0]).solve(model)
+    return node, [model.flow[node, bus_out, t].value for t in model.TIMESTEPS], \
+        np.interp(inputs, x, y)
+
+
+def test_outputs_on_curve():
+    # By default, the outputs stay on their curve even if the curve is concave.
+    node, outputs, curve = solve_wasting_outputs(allow_lp=False)
+    assert node.formulation == 'CC'
+    assert outputs == pytest.approx(curve)
+    # With the LP formulation, the outputs are only limited by the curve.
+    node, outputs, curve = solve_wasting_outputs(allow_lp=True)
+    assert node.formulation == 'LP'
+    assert outputs == pytest.approx([0, 0, 0], abs=1e-9)
+
+
+def test_part_flows():
+    flows = {('bh2', 'chp'): 2.0, ('chp', 'bel'): 1.0, ('chp', 'bth'): 0.5}
+    part_flows = get_part_flows(flows, 'chp', {'bel': 'chp_electric', 'bth': 'chp_thermal'})
+    assert part_flows == {('bh2', 'chp_electric'): 1.0, ('bh2', 'chp_thermal'): 1.0,
+                          ('chp_electric', 'bel'): 1.0, ('chp_thermal', 'bth'): 0.5}
@@ -0,0 +1,37 @@
+"""
+Tests of the order of the prepare simulation step of the components.
+"""
+from smooth.framework.functions.functions import get_prepare_order
+
+
+class Component:
+    # Stands in for a component that reads the states of the given components.
+    def __init__(self, name, foreign_state_components=()):
+        self.name = name
+        self.foreign_state_components = list(foreign_state_components)
+
+    def get_foreign_state_components(self):
+        return self.foreign_state_components
+
+
+def get_names(components):
+    return [this_comp.name for this_comp in get_prepare_order(components)]
+
+
+def test_dependencies_first():
+    components = [Component('compressor', ['storage']), Component('storage'),
+                  Component('grid', ['storage'])]
+    assert get_names(components) == ['storage', 'compressor', 'grid']
+
+
+def test_component_after_cycle():
+    # The first component reads the states of a 2-cycle without being part of it.
+    components = [Component('reader', ['storage']), Component('ely', ['storage']),
+                  Component('storage', ['ely'])]
+    assert get_names(components) == ['ely', 'storage', 'reader']
+
+
+def test_cycle_after_dependency():
+    # Both components of the cycle read from a component after them in the model.
+    components = [Component('a', ['b', 'c']), Component('b', ['a']), Component('c')]
+    assert get_names(components) == ['c', 'a', 'b']
@@ -0,0 +1,317 @@
+"""
+Tests of the simulation modes of run_smooth.
+"""
+import copy
+import os
+import numpy as np
+import pytest
+
+pytest.importorskip('oemof.solph')
+po = pytest.importorskip('pyomo.environ')
+
+from smooth import run_smooth, run_smooth_batch, replay_interval  # noqa: E402
+from smooth.framework.exceptions import SolverNonOptimalError  # noqa: E402
+from smooth.examples.example_model import mymodel  # noqa: E402
+from smooth.examples.example_model_emissions import mymodel as mymodel_emissions  # noqa: E402
+from smooth.examples.example_model_infeasable import mymodel as mymodel_infeasible  # noqa: E402
+from smooth.framework.functions.typical_periods import get_aggregation_error  # noqa: E402
+from smooth.framework.observers import JsonLinesWriter, Observer, TimingCollector  # noqa: E402
+from smooth.framework.simulation_parameters import SimulationParameters  # noqa: E402
+from smooth.framework.run_smooth import create_simulation  # noqa: E402
+from smooth.framework.functions.functions import get_prepare_order, read_data_file, \
+    set_shared_data_files  # noqa: E402
+from smooth.framework.run_smooth_batch import load_data_files  # noqa: E402
+from smooth.framework.pipeline import ModelPipeline  # noqa: E402
+
+
+def get_long_model(n_intervals):
+    # Get a copy of example_model for the given number of intervals. Its electrolyzer only
+    # covers the hydrogen demand for a few hours, a larger one keeps the model feasible.
+    model = copy.deepcopy(mymodel)
+    model['sim_params']['n_intervals'] = n_intervals
+    for this_comp in model['components']:
+        if this_comp['name'] == 'this_ely':
+            this_comp['power_max'] = 3e6
+    return model
+
+
+def test_commit_steps_larger_than_horizon():
+    with pytest.raises(ValueError):
+        SimulationParameters({'horizon': 2, 'commit_steps': 3})
+
+
+@pytest.mark.parametrize('horizon, commit_steps', [(3, 1), (4, None), (10, None)])
+def test_rolling_horizon(horizon, commit_steps):
+    if not po.SolverFactory('cbc').available(exception_flag=False):
+        pytest.skip('cbc is not available')
+    model = copy.deepcopy(mymodel)
+    model['sim_params']['horizon'] = horizon
+    model['sim_params']['commit_steps'] = commit_steps
+    components, status = run_smooth(model)
+    # The results of every interval have to be kept exactly once.
+    for this_comp in components:
+        for flow in this_comp.flows.values():
+            assert len(flow) == model['sim_params']['n_intervals']
+            assert None not in flow
+
+
+def test_interval_cache():
+    if not po.SolverFactory('cbc').available(exception_flag=False):
+        pytest.skip('cbc is not available')
+    model = copy.deepcopy(mymodel)
+    reference, _ = run_smooth(copy.deepcopy(model))
+    model['sim_params']['interval_cache_size'] = 24
+    components, status = run_smooth(model)
+    # Reusing the results of identical intervals must not change the results.
+    for this_comp, ref_comp in zip(components, reference):
+        for key in ['variable_costs', 'art_costs']:
+            if key in ref_comp.results:
+                assert this_comp.results[key] == pytest.approx(ref_comp.results[key])
+    stats = this_comp.sim_params.interval_cache_stats
+    assert stats['hits'] + stats['misses'] == model['sim_params']['n_intervals']
+    assert stats['size'] <= 24
+
+
+def test_run_smooth_batch():
+    if not po.SolverFactory('cbc').available(exception_flag=False):
+        pytest.skip('cbc is not available')
+    models = {'feasible': mymodel, 'infeasible': mymodel_infeasible}
+    batch_results = {r['name']: r for r in run_smooth_batch(copy.deepcopy(models), n_core=2)}
+    # The failing model is reported without stopping the other one.
+    assert batch_results['feasible']['error'] is None
+    assert set(batch_results['feasible']['results']) == \
+        set(this_comp['name'] for this_comp in mymodel['components'])
+    assert batch_results['infeasible']['results'] is None
+    assert 'SolverNonOptimalError' in batch_results['infeasible']['error']
+
+
+def test_shared_data_files():
+    data_files = load_data_files([mymodel])
+    csv_components = [this_comp for this_comp in mymodel['components']
+                      if this_comp.get('csv_filename') is not None]
+    # Files with one column can be parsed with any separator, the others only with their own.
+    for this_comp in csv_components:
+        file_path = os.path.abspath(os.path.join(this_comp['path'], this_comp['csv_filename']))
+        separators = [key[1] for key in data_files if key[0] == file_path]
+        if this_comp['csv_filename'] == 'ts_pv.csv':
+            assert separators == [';']
+        else:
+            assert sorted(separators) == sorted([',', ';', '\t'])
+    # The shared tables give the same columns as the files.
+    try:
+        for (file_path, csv_separator), table in data_files.items():
+            for column_title in [0, table.columns[-1]]:
+                set_shared_data_files({})
+                expected = read_data_file(os.path.dirname(file_path),
+                                          os.path.basename(file_path), csv_separator,
+                                          column_title)
+                set_shared_data_files(data_files)
+                data = read_data_file(os.path.dirname(file_path), os.path.basename(file_path),
+                                      csv_separator, column_title)
+                assert data.equals(expected)
+    finally:
+        set_shared_data_files({})
+
+
+def test_observers(tmp_path):
+    if not po.SolverFactory('cbc').available(exception_flag=False):
+        pytest.skip('cbc is not available')
+    # The emissions example has a fuel cell besides the electrolyzer.
+    model = copy.deepcopy(mymodel_emissions)
+    timing_collector = TimingCollector()
+    file_path = tmp_path / 'metrics.jsonl'
+    model['sim_params']['observers'] = [timing_collector, JsonLinesWriter(str(file_path))]
+    run_smooth(model)
+    # One event per solve, each with all timings.
+    n_intervals = model['sim_params']['n_intervals']
+    assert [event['i_interval'] for event in timing_collector.events] == list(range(n_intervals))
+    summary = timing_collector.get_summary()
+    assert summary['time_solve'] > 0
+    # The LP formulation is only used if it is switched on.
+    assert summary['pwl_formulations']['this_ely'] == {'CC': n_intervals}
+    assert summary['pwl_formulations']['fuel_cell_chp'] == {'CC': n_intervals}
+    assert len(file_path.read_text().splitlines()) == n_intervals
+
+
+class StoppingObserver(Observer):
+    # Stops the simulation after its second interval and records if the end was announced.
+
+    def __init__(self):
+        self.is_finished = False
+
+    def interval_done(self, event):
+        if event['i_interval'] == 1:
+            raise RuntimeError('Simulation stopped')
+
+    def finish(self, sim_params):
+        self.is_finished = True
+
+
+def test_observers_finish_on_error():
+    if not po.SolverFactory('cbc').available(exception_flag=False):
+        pytest.skip('cbc is not available')
+    model = copy.deepcopy(mymodel)
+    model['sim_params']['pipelined'] = True
+    observer = StoppingObserver()
+    model['sim_params']['observers'] = [observer]
+    with pytest.raises(RuntimeError, match='Simulation stopped'):
+        run_smooth(model)
+    assert observer.is_finished
+
+
+def test_pw_repn_auto():
+    if not po.SolverFactory('cbc').available(exception_flag=False):
+        pytest.skip('cbc is not available')
+    model = copy.deepcopy(mymodel_emissions)
+    reference, _ = run_smooth(copy.deepcopy(model))
+    for this_comp in model['components']:
+        if this_comp['name'] == 'fuel_cell_chp':
+            this_comp['pw_repn'] = 'auto'
+    model['sim_params']['pw_repn_calibration_intervals'] = 2
+    timing_collector = TimingCollector()
+    model['sim_params']['observers'] = [timing_collector]
+    components, _ = run_smooth(model)
+    # All representations are exact, so the chosen one must not change the results.
+    for this_comp, ref_comp in zip(components, reference):
+        for key in ['variable_costs', 'art_costs']:
+            if key in ref_comp.results:
+                assert this_comp.results[key] == pytest.approx(ref_comp.results[key])
+    formulations = timing_collector.get_summary()['pwl_formulations']['fuel_cell_chp']
+    assert sum(formulations.values()) == model['sim_params']['n_intervals']
+
+
+def test_checkpoint_resume(tmp_path):
+    if not po.SolverFactory('cbc').available(exception_flag=False):
+        pytest.skip('cbc is not available')
+    checkpoint_file = str(tmp_path / 'checkpoint.pkl.gz')
+    model = copy.deepcopy(mymodel)
+    model['sim_params']['checkpoint_file'] = checkpoint_file
+    model['sim_params']['checkpoint_interval'] = 5
+    reference, _ = run_smooth(model)
+    # Resuming from the last checkpoint has to give the same results.
+    model = copy.deepcopy(mymodel)
+    model['sim_params']['resume_from'] = checkpoint_file
+    components, _ = run_smooth(model)
+    for this_comp, ref_comp in zip(components, reference):
+        assert this_comp.flows == ref_comp.flows
+        assert this_comp.states == ref_comp.states
+
+
+def test_replay_failed_interval(tmp_path):
+    if not po.SolverFactory('cbc').available(exception_flag=False):
+        pytest.skip('cbc is not available')
+    checkpoint_file = str(tmp_path / 'checkpoint.pkl.gz')
+    model = copy.deepcopy(mymodel_infeasible)
+    model['sim_params']['checkpoint_file'] = checkpoint_file
+    model['sim_params']['show_debug_flag'] = False
+    with pytest.raises(SolverNonOptimalError):
+        run_smooth(model)
+    # The failed interval is solved again from the checkpoint alone.
+    model = copy.deepcopy(mymodel_infeasible)
+    _, status, termination_condition = replay_interval(model, checkpoint_file)
+    assert termination_condition != 'optimal'
+
+
+def test_typical_periods():
+    if not po.SolverFactory('cbc').available(exception_flag=False):
+        pytest.skip('cbc is not available')
+    model = get_long_model(24 * 7)
+    for this_comp in model['components']:
+        if this_comp['name'] == 'from_grid':
+            this_comp['variable_emissions'] = 0.341
+            this_comp['dependency_flow_emissions'] = ('from_grid', 'bel')
+    reference, _ = run_smooth(copy.deepcopy(model))
+    # Three typical days simulate fewer intervals, weighted to the same time span.
+    model['sim_params']['typical_periods'] = 3
+    components, _ = run_smooth(model)
+    sim_params = components[0].sim_params
+    assert sim_params.n_intervals == 3 * 24
+    assert sim_params.interval_weights.sum() == 24 * 7
+    # The costs and emissions differ by 2.5 % from the full simulation (measured with cbc).
+    errors = get_aggregation_error(reference, components)
+    for key in ['annuity_variable_costs', 'annual_variable_emissions']:
+        assert abs(errors[key]) < 0.05
+    # Each typical day starts from the initial storage level.
+    storage = next(this_comp for this_comp in components if this_comp.name == 'h2_storage')
+    for i_interval in range(0, sim_params.n_intervals, sim_params.period_length):
+        assert storage.states['storage_level'][i_interval] == pytest.approx(
+            storage.storage_level_init + storage.flows[('bh2_lp', 'h2_storage')][i_interval] -
+            storage.flows[('h2_storage', 'bh2_lp')][i_interval])
+
+
+def test_typical_periods_start_with_a_solve():
+    with pytest.raises(ValueError):
+        SimulationParameters({'typical_periods': 3, 'period_length': 24, 'horizon': 5})
+
+
+def test_merging_needs_single_interval_horizon():
+    with pytest.raises(ValueError):
+        SimulationParameters({'merge_tolerance': 0.1, 'horizon': 2})
+
+
+def test_merge_intervals():
+    if not po.SolverFactory('cbc').available(exception_flag=False):
+        pytest.skip('cbc is not available')
+    model = get_long_model(48)
+    model['sim_params']['merge_tolerance'] = 0.05
+    timing_collector = TimingCollector()
+    model['sim_params']['observers'] = [timing_collector]
+    components, status = run_smooth(model)
+    # Fewer solves are needed, but every interval still gets its results.
+    assert len(timing_collector.events) < 48
+    for this_comp in components:
+        for flow in this_comp.flows.values():
+            assert None not in flow
+
+
+def test_pipelined():
+    if not po.SolverFactory('cbc').available(exception_flag=False):
+        pytest.skip('cbc is not available')
+    model = get_long_model(48)
+    reference, _ = run_smooth(copy.deepcopy(model))
+    model['sim_params']['pipelined'] = True
+    components, status = run_smooth(model)
+    # Building the next model during the solve must not change the results.
+    for this_comp, ref_comp in zip(components, reference):
+        for key in ['variable_costs', 'art_costs']:
+            if key in ref_comp.results:
+                assert this_comp.results[key] == pytest.approx(ref_comp.results[key])
+        # The states of each interval are the same as in the sequential run.
+        assert set(this_comp.states) == set(ref_comp.states)
+        for key, values in ref_comp.states.items():
+            assert np.array(this_comp.states[key], dtype=float) == pytest.approx(
+                np.array(values, dtype=float), nan_ok=True)
+
+
+def test_pipeline_leaves_components_unchanged():
+    model = copy.deepcopy(mymodel)
+    model['sim_params']['pipelined'] = True
+    sim_params, components = create_simulation(model)
+    sim_params.i_interval = 0
+    for this_comp in get_prepare_order(components):
+        this_comp.prepare_simulation(components)
+    pipeline = ModelPipeline(model['busses'], components, sim_params)
+    pipeline.build(1)
+    pipeline.wait()
+    # The model is built from copies, the components only get it when it is taken.
+    assert sim_params.i_interval == 0
+    assert all(this_comp.model is None for this_comp in components)
+    assert pipeline.get_model(2) is None
+    assert all(this_comp.model is None for this_comp in components)
+    pipeline.build(1)
+    pipeline.wait()
+    model_to_solve, _ = pipeline.get_model(1)
+    for this_comp in components:
+        if this_comp.model is not None:
+            assert this_comp.model in model_to_solve.es.nodes
+    pipeline.shutdown()
+
+
+def test_missing_foreign_state():
+    model = copy.deepcopy(mymodel)
+    for this_comp in model['components']:
+        if this_comp.get('fs_component_name') == 'h2_storage':
+            this_comp['fs_component_name'] = 'missing_storage'
+    # Missing foreign states are found when the components are created.
+    with pytest.raises(ValueError, match='missing_storage'):
+        run_smooth(model)
@@ -0,0 +1,130 @@
+"""
+Parity tests of the solver backends of run_smooth. The example models are simulated with the
+in-process backends, each interval problem is solved with cbc as well for reference.
+"""
+import copy
+import pytest
+
+pytest.importorskip('oemof.solph')
+po = pytest.importorskip('pyomo.environ')
+
+from smooth import run_smooth  # noqa: E402
+from smooth.framework.solver import CbcSolver, HighsSolver, PyomoPersistentSolver  # noqa: E402
+from smooth.examples.example_model import mymodel  # noqa: E402
+from smooth.examples.example_model_emissions import mymodel as mymodel_emissions  # noqa: E402
+
+if not po.SolverFactory('cbc').available(exception_flag=False):
+    pytest.skip('cbc is not available', allow_module_level=True)
+
+
+def run_with_solver(model, solver, persistent_model=False, warm_start=False):
+    # Run a copy of the model with the given solver backend and return the results of all
+    # components by component name.
+    model = copy.deepcopy(model)
+    model['sim_params']['solver'] = solver
+    model['sim_params']['persistent_model'] = persistent_model
+    model['sim_params']['warm_start'] = warm_start
+    model['sim_params']['show_debug_flag'] = False
+    components, status = run_smooth(model)
+    return {this_comp.name: this_comp for this_comp in components}
+
+
+def assert_same_results(reference, components):
+    # The optimal flows may differ if there are several optimal solutions, but the costs and
+    # emissions have to be the same.
+    for name, this_comp in reference.items():
+        for key in ['variable_costs', 'art_costs', 'variable_emissions']:
+            if key in this_comp.results:
+                assert components[name].results[key] == pytest.approx(
+                    this_comp.results[key], rel=1e-6, abs=1e-6)
+
+
+def record_objectives(monkeypatch, solver_class):
+    # Solve each interval problem with cbc before it is solved with the given backend and
+    # record both objective values. The runs can't be compared as a whole: if an interval has
+    # several optimal solutions, the backends may choose different ones and the states of the
+    # following intervals differ.
+    objectives = []
+    solve = solver_class.solve
+
+    def solve_and_compare(self, model, warm_start=False):
+        CbcSolver().solve(model)
+        reference = po.value(model.objective)
+        status, termination_condition = solve(self, model, warm_start=warm_start)
+        objectives.append((po.value(model.objective), reference))
+        return status, termination_condition
+    monkeypatch.setattr(solver_class, 'solve', solve_and_compare)
+    return objectives
+
+
+@pytest.mark.parametrize('model', [mymodel, mymodel_emissions])
+def test_highs_parity(model, monkeypatch):
+    objectives = record_objectives(monkeypatch, HighsSolver)
+    run_with_solver(model, 'highs')
+    assert len(objectives) == model['sim_params']['n_intervals']
+    for objective, reference in objectives:
+        assert objective == pytest.approx(reference, rel=1e-6, abs=1e-6)
+
+
+@pytest.mark.parametrize('model', [mymodel, mymodel_emissions])
+def test_pyomo_persistent_parity(model, monkeypatch):
+    if not po.SolverFactory('appsi_highs').available(exception_flag=False):
+        pytest.skip('appsi_highs is not available')
+    objectives = record_objectives(monkeypatch, PyomoPersistentSolver)
+    run_with_solver(model, 'pyomo_persistent', persistent_model=True)
+    assert len(objectives) == model['sim_params']['n_intervals']
+    for objective, reference in objectives:
+        assert objective == pytest.approx(reference, rel=1e-6, abs=1e-6)
+
+
+def record_warm_starts(monkeypatch):
+    # Record if cbc gets the start values in each solve.
+    warm_starts = []
+    solve = CbcSolver.solve
+
+    def solve_and_record(self, model, warm_start=False):
+        warm_starts.append(warm_start)
+        return solve(self, model, warm_start=warm_start)
+    monkeypatch.setattr(CbcSolver, 'solve', solve_and_record)
+    return warm_starts
+
+
+def test_warm_start_parity(monkeypatch):
+    warm_starts = record_warm_starts(monkeypatch)
+    reference = run_with_solver(mymodel, 'cbc')
+    assert not any(warm_starts)
+    warm_starts.clear()
+    components = run_with_solver(mymodel, 'cbc', warm_start=True)
+    sim_params = next(iter(components.values())).sim_params
+    # All intervals but the first one are started from the solution of the interval before.
+    assert warm_starts == [False] + [True] * (sim_params.n_intervals - 1)
+    assert len(sim_params.solver_iterations) == sim_params.n_intervals
+    # The warm start must not change the objective or the flows of the cold start.
+    assert_same_results(reference, components)
+    for name, this_comp in reference.items():
+        for flow_name, values in this_comp.flows.items():
+            assert components[name].flows[flow_name] == pytest.approx(values, abs=1e-6)
+
+
+@pytest.mark.parametrize('persistent_model', [False, True])
+def test_warm_start_after_resume(monkeypatch, tmp_path, persistent_model):
+    checkpoint_file = str(tmp_path / 'checkpoint.pkl.gz')
+    model = copy.deepcopy(mymodel)
+    model['sim_params']['checkpoint_file'] = checkpoint_file
+    model['sim_params']['checkpoint_interval'] = 5
+    run_with_solver(model, 'cbc')
+    warm_starts = record_warm_starts(monkeypatch)
+    model = copy.deepcopy(mymodel)
+    model['sim_params']['resume_from'] = checkpoint_file
+    run_with_solver(model, 'cbc', persistent_model=persistent_model, warm_start=True)
+    # The resumed simulation has no solution of the interval before its first one.
+    assert warm_starts == [False] + [True] * (len(warm_starts) - 1)
+    assert len(warm_starts) > 1
+
+
+def test_warm_start_not_supported():
+    # The HiGHS backend can't be warm started, which is shown as a warning.
+    reference = run_with_solver(mymodel, 'highs')
+    with pytest.warns(UserWarning, match='warm_start has no effect'):
+        components = run_with_solver(mymodel, 'highs', warm_start=True)
+    assert_same_results(reference, components)
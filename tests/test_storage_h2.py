@@ -0,0 +1,57 @@
+"""
+Tests of the hydrogen storage and the Redlich-Kwong equation of state.
+"""
+import numpy as np
+import pytest
+
+from smooth.components.component_functions.redlich_kwong import \
+    TABLE_PRESSURE_MAX, get_compressibility_rk, get_pressure_rk, get_spec_volume_rk
+
+# Parameters of hydrogen (see StorageH2).
+TEMPERATURE = 273.15 + 25
+RK_A = 0.1428
+RK_B = 1.8208e-5
+
+
+def test_spec_volume():
+    pressures = np.array([1, 10, 100, 450, 700, 2000]) * 1e5
+    v_spec = get_spec_volume_rk(pressures, TEMPERATURE, RK_A, RK_B)
+    # The solution meets the equation of state.
+    assert get_pressure_rk(v_spec, TEMPERATURE, RK_A, RK_B) == pytest.approx(pressures, rel=1e-12)
+    # The same as the fixed point iteration the storage used before.
+    for pressure, this_v_spec in zip(pressures, v_spec):
+        v_fixed_point = 10
+        for _ in range(10):
+            v_fixed_point = 8.314 * TEMPERATURE / (pressure + RK_A / (
+                TEMPERATURE ** 0.5 * v_fixed_point * (v_fixed_point + RK_B))) + RK_B
+        assert this_v_spec == pytest.approx(v_fixed_point, rel=1e-12)
+
+
+def test_compressibility():
+    pressures = np.linspace(0, TABLE_PRESSURE_MAX * 1.5, 777)
+    compressibility = get_compressibility_rk(pressures, TEMPERATURE, RK_A, RK_B)
+    # The table is monotone, zero pressure is the ideal gas.
+    assert compressibility[0] == 1
+    assert np.all(np.diff(compressibility) > 0)
+    # The interpolated values are close to the exact ones.
+    v_spec = get_spec_volume_rk(pressures[1:] * 1e5, TEMPERATURE, RK_A, RK_B)
+    assert compressibility[1:] == pytest.approx(
+        pressures[1:] * 1e5 * v_spec / (8.314 * TEMPERATURE), rel=1e-7)
+    assert np.shape(get_compressibility_rk(350, TEMPERATURE, RK_A, RK_B)) == ()
+
+
+def test_storage_mass_and_pressure():
+    pytest.importorskip('oemof.solph')
+    from smooth.components.component_storage_h2 import StorageH2
+    storage = StorageH2({'name': 'h2_storage', 'bus_in': 'bh2', 'bus_out': 'bh2', 'p_min': 5,
+                         'p_max': 450, 'storage_capacity': 500})
+    assert storage.get_mass(storage.p_max) == pytest.approx(storage.storage_capacity)
+    assert storage.get_pressure(storage.storage_level_min) == pytest.approx(storage.p_min)
+    assert storage.get_mass(0) == 0
+    assert storage.get_pressure(0) == 0
+    # The pressures of all storage levels in one call.
+    levels = np.linspace(0, storage.storage_capacity, 8761)
+    pressures = storage.get_pressure(levels)
+    assert pressures.shape == levels.shape
+    assert pressures[5000] == pytest.approx(storage.get_pressure(levels[5000]))
+    assert storage.get_mass(pressures) == pytest.approx(levels, rel=1e-6)
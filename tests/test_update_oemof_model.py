@@ -0,0 +1,53 @@
+"""
+Tests of the updates of a persistent oemof model.
+"""
+import copy
+import pytest
+
+pytest.importorskip('oemof.solph')
+po = pytest.importorskip('pyomo.environ')
+
+from pyomo.core.expr.visitor import identify_variables  # noqa: E402
+from smooth.examples.example_model import mymodel  # noqa: E402
+from smooth.framework.functions.functions import get_prepare_order  # noqa: E402
+from smooth.framework.functions.update_oemof_model import \
+    is_sequence_changed, rebuild_outdated_blocks  # noqa: E402
+from smooth.framework.run_smooth import create_oemof_model, create_simulation  # noqa: E402
+
+
+class Model:
+    # Stands in for an oemof model with three time steps.
+    TIMESTEPS = range(3)
+
+
+def test_is_sequence_changed():
+    assert not is_sequence_changed(Model(), [1, 2, 3], [1, 2, 3])
+    assert is_sequence_changed(Model(), [1, 2, 3], [1, 2, 4])
+    # Single values stand for all time steps.
+    assert not is_sequence_changed(Model(), 2, [2, 2, 2])
+    assert is_sequence_changed(Model(), 2, 3)
+
+
+def test_unchanged_parameters_keep_blocks():
+    model = copy.deepcopy(mymodel)
+    model['sim_params']['persistent_model'] = True
+    sim_params, components = create_simulation(model)
+    sim_params.i_interval = 0
+    for this_comp in get_prepare_order(components):
+        this_comp.prepare_simulation(components)
+    model_to_solve, busses = create_oemof_model(model['busses'], components, sim_params)
+    # Nothing changed since the model was built, so no block has to be rebuilt.
+    for this_comp in components:
+        this_comp.update_oemof_model(busses, model_to_solve)
+    assert model_to_solve.outdated_blocks == set()
+
+    # Rebuilt blocks are part of the objective again.
+    for this_comp in components:
+        if this_comp.model is not None and hasattr(this_comp.model, 'constraint_group'):
+            block_class = this_comp.model.constraint_group()
+            # Sources and sinks have no block of their own.
+            if block_class is not None:
+                model_to_solve.outdated_blocks.add(block_class)
+    rebuild_outdated_blocks(model_to_solve)
+    for var in identify_variables(model_to_solve.objective.expr):
+        assert var.model() is model_to_solve